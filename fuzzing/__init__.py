@@ -29,11 +29,21 @@ DEALINGS IN THE SOFTWARE.
 
 import logging
 from .log import LoggerFactory
-from .fuzzer import fuzzer, fuzz_string, FuzzExecutor, TestStatCounter, Status
+from .seeds import SeedCache
+from .rng import FuzzRandom, make_rng
+from .stats import MultiStatCounter
+from .crashes import CrashStore
+from .fuzzer import (fuzzer, fuzz_string, iter_fuzz_string, fuzz_batch,
+                     fuzz_in_place, revert_fuzz, FuzzExecutor,
+                     TestStatCounter, Status, RunResult)
+from .async_executor import AsyncFuzzExecutor
 
 # Symbols available when importing with *.
-__all__ = ['LoggerFactory', 'fuzzer', 'fuzz_string',
-           'FuzzExecutor', 'TestStatCounter', 'Status']
+__all__ = ['LoggerFactory', 'fuzzer', 'fuzz_string', 'iter_fuzz_string',
+           'fuzz_batch', 'fuzz_in_place', 'revert_fuzz',
+           'FuzzExecutor', 'AsyncFuzzExecutor', 'TestStatCounter', 'Status',
+           'RunResult', 'SeedCache', 'FuzzRandom', 'make_rng',
+           'MultiStatCounter', 'CrashStore']
 
 # Configure NullHandler to prevent warning in case logging is not configured.
 # See https://docs.python.org/2/howto/logging.html#library-config
@@ -0,0 +1,280 @@
+# coding=utf-8
+"""
+Asynchronous fuzz testing.
+
+Run multiple applications under test concurrently from a single process.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import asyncio
+import os
+import signal
+import subprocess
+import time
+
+from .fuzzer import (FuzzExecutor, TERMINATE_GRACE_PERIOD, POLL_INTERVAL,
+                     reap, collect_output, _feed, _pidfd_open)
+from .capture import drain
+
+DEFAULT_CONCURRENCY = 8
+
+
+class AsyncFuzzExecutor(FuzzExecutor):
+    """Run fuzz tests on applications, keeping several runs in flight.
+
+    While a run waits for its application, further applications are
+    started, up to concurrency runs at a time. Results are collected
+    in the same TestStatCounter as with FuzzExecutor.
+    """
+
+    def __init__(self, app_list, file_list, concurrency=DEFAULT_CONCURRENCY,
+                 delivery='file', rng=None):
+        """Take apps under test and test data.
+
+        :param app_list: list of applications.
+        :param file_list: list of files for testing.
+        :param concurrency: maximum number of concurrent runs.
+        :type concurrency: int
+        :param delivery: backend providing the input files.
+        :type delivery: str or Delivery
+        :param rng: random generator.
+        :type rng: random.Random
+        """
+        super(AsyncFuzzExecutor, self).__init__(app_list, file_list,
+                                                delivery, rng)
+        assert concurrency > 0, 'ENSURE: concurrency is positive.'
+        self.concurrency = concurrency
+        self._fork_server_locks = {}
+
+    def run_test(self, runs, deadline=None):
+        """Run tests and build up statistics.
+
+        :param runs: number of tests to run.
+        :param deadline: time.monotonic() value after which no further
+                         tests are started.
+        :type deadline: float
+        """
+        asyncio.run(self.run_test_async(runs, deadline))
+
+    async def run_test_async(self, runs, deadline=None):
+        """Run tests concurrently and build up statistics.
+
+        :param runs: number of tests to run.
+        :param deadline: time.monotonic() value after which no further
+                         tests are started.
+        :type deadline: float
+        """
+        self.logger.info('Start fuzzing ...')
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        for _ in range(runs):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            app = self.rng.choice(self.apps)
+            data_file = self._choose_seed()
+            if app in self._callables:
+                # Callables run within this process, so there is nothing
+                # to wait for. Just let other runs proceed.
+                self._execute_callable(app, data_file)
+                await asyncio.sleep(0)
+                continue
+            await semaphore.acquire()
+            slot = self._acquire_input(app, data_file)
+            task = asyncio.ensure_future(self._execute_async(app, slot))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            task.add_done_callback(lambda _: semaphore.release())
+        if tasks:
+            await asyncio.gather(*tasks)
+        self.logger.info('Fuzzing completed.')
+
+    async def _execute_async(self, app_, slot):
+        """Run app with file as input and release the input.
+
+        :param app_: application to run.
+        :param slot: input to run app with.
+        :type slot: InputSlot
+        :return: result of the run.
+        :rtype: RunResult
+        """
+        try:
+            if self.options[app_].get('mode') == 'forkserver':
+                return await self._execute_fork_server_async(app_, slot)
+            return await self._execute_process_async(app_, slot)
+        finally:
+            self._delivery(app_).release(slot)
+
+    async def _execute_process_async(self, app_, slot):
+        """Run app with file as input.
+
+        Same as FuzzExecutor._execute(), but waits asynchronously. The
+        process is reaped with reap() rather than by the child watcher
+        of asyncio, so its resource usage is known.
+
+        :param app_: application to run.
+        :param slot: input to run app with.
+        :type slot: InputSlot
+        :return: result of the run.
+        :rtype: RunResult
+        """
+        start = time.monotonic()
+        stdin = None if slot.data is None else subprocess.PIPE
+        output = self._output_target(app_)
+        process = subprocess.Popen(self._command(app_, slot.path),
+                                   stdin=stdin, stdout=output, stderr=output,
+                                   pass_fds=slot.pass_fds,
+                                   preexec_fn=self._limiter(app_))
+        outputs = None
+        if output == subprocess.PIPE:
+            outputs = {process.stdout: self._tail(app_),
+                       process.stderr: self._tail(app_)}
+
+        rusage = await _wait_for_exit(process, self._timeout(app_),
+                                      slot.data, outputs)
+        duration = time.monotonic() - start
+        returncode = process.returncode
+        if rusage is None:
+            # process did not crash, so just terminate it
+            rusage = await _terminate(process)
+            returncode = None
+        if outputs is not None:
+            collect_output(outputs)
+            outputs = (outputs[process.stdout], outputs[process.stderr])
+        return self._record(app_, returncode, duration, rusage=rusage,
+                            seed=slot.seed, mutator=slot.mutator,
+                            output=outputs, slot=slot)
+
+    async def _execute_fork_server_async(self, app_, slot):
+        """Run input through the fork server of app.
+
+        A fork server handles one test case at a time, so runs of the
+        same app are serialized. They are executed in a thread to keep
+        the event loop responsive.
+
+        :param app_: application to run.
+        :param slot: input to run app with.
+        :type slot: InputSlot
+        :return: result of the run.
+        :rtype: RunResult
+        """
+        lock = self._fork_server_locks.setdefault(app_, asyncio.Lock())
+        async with lock:
+            start = time.monotonic()
+            loop = asyncio.get_running_loop()
+            returncode = await loop.run_in_executor(
+                None, self._run_fork_server, app_, slot.shared_path)
+            # The next run of app clears the coverage bitmap.
+            return self._record(app_, returncode, time.monotonic() - start,
+                                seed=slot.seed, mutator=slot.mutator,
+                                slot=slot,
+                                bitmap=self._fork_server_bitmap(app_))
+
+
+async def _wait_for_exit(process, timeout, input_data=None, outputs=None):
+    """Wait for process to exit, feeding and reading its pipes meanwhile.
+
+    Same as fuzzing.fuzzer.wait_for_exit(), but the pipes are served by
+    the event loop.
+
+    :param process: the process to wait for.
+    :type process: subprocess.Popen
+    :param timeout: maximum time to wait in seconds.
+    :type timeout: float
+    :param input_data: data for the standard input of process.
+    :type input_data: bytes-like object
+    :param outputs: tail buffers keyed by the output pipes of process.
+    :type outputs: dict
+    :return: resource usage if the process exited, else None.
+    :rtype: resource.struct_rusage
+    """
+    loop = asyncio.get_running_loop()
+    deadline = time.monotonic() + timeout
+    exited = asyncio.Event()
+    pidfd = _pidfd_open(process.pid)
+    pending = None
+
+    def read(pipe):
+        """Drain pipe, stop watching it at its end."""
+        if not drain(pipe.fileno(), outputs[pipe]):
+            loop.remove_reader(pipe.fileno())
+
+    def write():
+        """Feed pending data, close standard input when done."""
+        nonlocal pending
+        pending = _feed(process.stdin, pending)
+        if not pending:
+            loop.remove_writer(process.stdin.fileno())
+            process.stdin.close()
+
+    if pidfd is not None:
+        loop.add_reader(pidfd, exited.set)
+    for pipe in outputs or ():
+        os.set_blocking(pipe.fileno(), False)
+        loop.add_reader(pipe.fileno(), read, pipe)
+    if input_data is not None:
+        pending = memoryview(input_data)
+        os.set_blocking(process.stdin.fileno(), False)
+        loop.add_writer(process.stdin.fileno(), write)
+    try:
+        while True:
+            rusage = reap(process)
+            if rusage is not None:
+                return rusage
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if pidfd is None:
+                remaining = min(remaining, POLL_INTERVAL)
+            exited.clear()
+            try:
+                await asyncio.wait_for(exited.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if pidfd is not None:
+            loop.remove_reader(pidfd)
+            os.close(pidfd)
+        for pipe in outputs or ():
+            loop.remove_reader(pipe.fileno())
+        if pending is not None:
+            pending.release()
+        if process.stdin is not None and not process.stdin.closed:
+            loop.remove_writer(process.stdin.fileno())
+            process.stdin.close()
+
+
+async def _terminate(process):
+    """Terminate process and reap it.
+
+    The process gets killed if it does not exit within
+    TERMINATE_GRACE_PERIOD.
+
+    :param process: process to terminate.
+    :type process: subprocess.Popen
+    :return: resource usage of the process.
+    :rtype: resource.struct_rusage
+    """
+    os.kill(process.pid, signal.SIGTERM)
+    rusage = await _wait_for_exit(process, TERMINATE_GRACE_PERIOD)
+    if rusage is None:
+        os.kill(process.pid, signal.SIGKILL)
+        rusage = reap(process, block=True)
+    return rusage
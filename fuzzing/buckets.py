@@ -0,0 +1,266 @@
+# coding=utf-8
+"""
+Buckets of failed runs.
+
+Group failures by a signature, so frequent failures do not hide rare ones.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import re
+import signal
+import hashlib
+
+# Non-empty lines at the end of the output the signature is built from.
+SIGNATURE_LINES = 8
+
+# Hex digits of the hash of the output within a signature.
+HASH_DIGITS = 12
+
+# Parts of the output varying between runs of the same failure.
+_VOLATILE = [(re.compile(rb'0x[0-9a-fA-F]+'), b'0x?'),
+             (re.compile(rb'fuzz(?:ing|ed)_\w+'), b'INPUT'),
+             (re.compile(rb'\d+'), b'N')]
+
+
+def normalize(text):
+    """Reduce output to the parts identifying a failure.
+
+    The last SIGNATURE_LINES non-empty lines are kept. Addresses,
+    numbers and names of input files are replaced by placeholders.
+
+    :param text: standard error or traceback of a run.
+    :type text: bytes or str
+    :return: normalized output.
+    :rtype: bytes
+    """
+    if isinstance(text, str):
+        text = text.encode('utf-8', 'replace')
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    text = b'\n'.join(lines[-SIGNATURE_LINES:])
+    for pattern, placeholder in _VOLATILE:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+def signature(result, app=None):
+    """Build the signature of a failed run.
+
+    It consists of the status, the signal or exit code, a hash of the
+    normalized traceback or standard error, if captured, and the name
+    of the application, if given.
+
+    :param result: result of the run.
+    :type result: RunResult
+    :param app: name of the application run.
+    :type app: str
+    :return: signature, e.g. 'SIGNAL SIGSEGV 3f2a9c01be47 parser'.
+    :rtype: str
+    """
+    if result.signal is not None:
+        try:
+            cause = signal.Signals(result.signal).name
+        except ValueError:
+            cause = 'signal {}'.format(result.signal)
+    elif result.exit_code is not None:
+        cause = 'exit {}'.format(result.exit_code)
+    else:
+        cause = 'running'
+    text = result.error if result.error is not None else result.stderr
+    output_hash = '-'
+    if text:
+        output_hash = hashlib.sha1(normalize(text)).hexdigest()[:HASH_DIGITS]
+    signature_ = '{} {} {}'.format(result.status.name, cause, output_hash)
+    if app is not None:
+        signature_ += ' {}'.format(app)
+    return signature_
+
+
+class Bucket():
+    """Failures of the same signature and the first of them."""
+
+    __slots__ = ('signature', 'count', 'app', 'seed', 'crash', 'excerpt')
+
+    def __init__(self, signature_, app, seed=None, crash=None, excerpt=''):
+        """Create bucket for the first failure of a signature.
+
+        :param signature_: signature of the failures.
+        :type signature_: str
+        :param app: name of the failing application.
+        :type app: str
+        :param seed: seed file of the first failure.
+        :type seed: str
+        :param crash: digest of the first failing input in a CrashStore.
+        :type crash: str
+        :param excerpt: last line of the output of the first failure.
+        :type excerpt: str
+        """
+        self.signature = signature_
+        self.count = 0
+        self.app = app
+        self.seed = seed
+        self.crash = crash
+        self.excerpt = excerpt
+
+    def __repr__(self):
+        """Create printable representation.
+
+        :return: printable bucket.
+        :rtype: str
+        """
+        first = self.crash or self.seed
+        info = '{}\t{} first: {}'.format(self.count, self.signature, first)
+        if self.excerpt:
+            info += '\n\t\t{}'.format(self.excerpt)
+        return info
+
+
+class CrashBuckets():
+    """Failed runs grouped by signature.
+
+    The signature includes the application, so the same failure of
+    different applications is kept apart. Buckets are kept in a dict
+    keyed by signature, so adding a run takes constant time however
+    many buckets there are.
+    """
+
+    __slots__ = ('buckets_',)
+
+    def __init__(self):
+        """Create empty buckets."""
+        self.buckets_ = {}
+
+    def add(self, key, result, seed=None):
+        """Add a failed run to its bucket.
+
+        :param key: name of the application run.
+        :type key: str
+        :param result: result of the run.
+        :type result: RunResult
+        :param seed: seed file the input was derived from.
+        :type seed: str
+        :return: signature of the run.
+        :rtype: str
+        """
+        signature_ = signature(result, key)
+        bucket = self.buckets_.get(signature_)
+        if bucket is None:
+            bucket = self.buckets_[signature_] = Bucket(
+                signature_, key, seed, result.crash,
+                _excerpt(result))
+        bucket.count += 1
+        return signature_
+
+    def __getitem__(self, signature_):
+        """Retrieve bucket of given signature.
+
+        :param signature_: signature of failures.
+        :type signature_: str
+        :return: the bucket.
+        :rtype: Bucket
+        """
+        return self.buckets_[signature_]
+
+    def __contains__(self, signature_):
+        """Check if failures of given signature occurred.
+
+        :param signature_: signature of failures.
+        :type signature_: str
+        :return: True if there is a bucket.
+        :rtype: bool
+        """
+        return signature_ in self.buckets_
+
+    def __len__(self):
+        """Retrieve the number of buckets.
+
+        :return: number of distinct signatures.
+        :rtype: int
+        """
+        return len(self.buckets_)
+
+    def largest(self, limit=None):
+        """Retrieve the buckets by descending number of failures.
+
+        :param limit: maximum number of buckets.
+        :type limit: int
+        :return: buckets.
+        :rtype: [Bucket]
+        """
+        buckets = sorted(self.buckets_.values(),
+                         key=lambda bucket: (-bucket.count, bucket.signature))
+        return buckets[:limit]
+
+    def __add__(self, other):
+        """Merge buckets into new buckets.
+
+        :param other: buckets to merge with self.
+        :type other: CrashBuckets
+        :return: the merged buckets.
+        :rtype: CrashBuckets
+        """
+        merged = CrashBuckets()
+        merged += self
+        merged += other
+        return merged
+
+    def __iadd__(self, other):
+        """Merge other buckets into these.
+
+        The first failure of a signature is taken from self if known.
+
+        :param other: buckets to merge.
+        :type other: CrashBuckets
+        :return: the merged buckets.
+        :rtype: CrashBuckets
+        """
+        for signature_, other_bucket in other.buckets_.items():
+            bucket = self.buckets_.get(signature_)
+            if bucket is None:
+                bucket = self.buckets_[signature_] = Bucket(
+                    signature_, other_bucket.app, other_bucket.seed,
+                    other_bucket.crash, other_bucket.excerpt)
+            bucket.count += other_bucket.count
+        return self
+
+    def __repr__(self):
+        """Create printable representation.
+
+        :return: one line per bucket, largest first.
+        :rtype: str
+        """
+        return ''.join('\t{!r}\n'.format(bucket) for bucket in self.largest())
+
+
+def _excerpt(result):
+    """Extract the last line of the output of a run.
+
+    :param result: result of the run.
+    :type result: RunResult
+    :return: last non-empty line or ''.
+    :rtype: str
+    """
+    text = result.error if result.error is not None else result.stderr
+    if not text:
+        return ''
+    if isinstance(text, bytes):
+        text = text.decode('utf-8', 'replace')
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return lines[-1] if lines else ''
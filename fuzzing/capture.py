@@ -0,0 +1,132 @@
+# coding=utf-8
+"""
+Capture of the output of applications under test.
+
+Keep the last bytes written by an application in a buffer of fixed size.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+
+# Bytes kept per output stream of a run.
+DEFAULT_TAIL_SIZE = 64 * 1024
+
+# Bytes read from a pipe at once.
+READ_SIZE = 64 * 1024
+
+
+class TailBuffer():
+    """Ring buffer keeping the last bytes written to it.
+
+    Memory is allocated as data arrives, up to limit bytes. Older data
+    is overwritten, so an application may write any amount of output.
+    """
+
+    __slots__ = ('limit', 'buffer_', 'position_', 'total')
+
+    def __init__(self, limit=DEFAULT_TAIL_SIZE):
+        """Create empty buffer.
+
+        :param limit: number of bytes kept.
+        :type limit: int
+        """
+        assert limit > 0, 'ENSURE: limit is positive.'
+        self.limit = limit
+        self.buffer_ = bytearray()
+        # Start of the oldest data once the buffer is full.
+        self.position_ = 0
+        self.total = 0
+
+    def write(self, data):
+        """Append data, dropping the oldest bytes beyond the limit.
+
+        :param data: data to append.
+        :type data: bytes-like object
+        """
+        data = memoryview(data).cast('B')
+        size = len(data)
+        self.total += size
+        if size >= self.limit:
+            self.buffer_[:] = data[size - self.limit:]
+            self.position_ = 0
+            return
+        room = self.limit - len(self.buffer_)
+        if room > 0:
+            self.buffer_ += data[:room]
+            data = data[room:]
+            size = len(data)
+        end = self.position_ + size
+        if end <= self.limit:
+            self.buffer_[self.position_:end] = data
+        else:
+            first = self.limit - self.position_
+            self.buffer_[self.position_:] = data[:first]
+            self.buffer_[:size - first] = data[first:]
+        self.position_ = end % self.limit
+
+    def getvalue(self):
+        """Retrieve the data kept in order of writing.
+
+        :return: up to limit bytes written last.
+        :rtype: bytes
+        """
+        return bytes(self.buffer_[self.position_:] +
+                     self.buffer_[:self.position_])
+
+    @property
+    def truncated(self):
+        """Check if data was dropped.
+
+        :return: True if more than limit bytes were written.
+        :rtype: bool
+        """
+        return self.total > self.limit
+
+    def __len__(self):
+        """Retrieve number of bytes kept.
+
+        :return: number of bytes.
+        :rtype: int
+        """
+        return len(self.buffer_)
+
+
+def drain(fd, tail):
+    """Read the data available from a non-blocking pipe into tail.
+
+    :param fd: file descriptor of the pipe.
+    :type fd: int
+    :param tail: buffer to keep the data.
+    :type tail: TailBuffer
+    :return: False if the pipe is closed, else True.
+    :rtype: bool
+    """
+    while True:
+        try:
+            data = os.read(fd, READ_SIZE)
+        except BlockingIOError:
+            return True
+        if not data:
+            return False
+        tail.write(data)
+        if len(data) < READ_SIZE:
+            # Drained; do not chase a process writing continuously.
+            return True
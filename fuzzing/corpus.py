@@ -0,0 +1,223 @@
+# coding=utf-8
+"""
+Corpus minimization.
+
+Select a small subset of seed files showing all behaviors of the whole set.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+import math
+import heapq
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+from .fuzzer import FuzzExecutor, app_name
+
+# Runs shorter than this many seconds fall into the first runtime bucket.
+RUNTIME_RESOLUTION = 0.001
+
+# Seed files sent to a worker at once.
+SEEDS_PER_TASK = 8
+
+# Executor of a worker process, see _init_worker().
+_executor = None
+
+
+def runtime_bucket(duration):
+    """Map a run time to a power of two bucket.
+
+    Runs of about the same time share a bucket, so timing noise does
+    not make each seed unique.
+
+    :param duration: wall clock time of a run in seconds.
+    :type duration: float
+    :return: number of the bucket.
+    :rtype: int
+    """
+    if duration < RUNTIME_RESOLUTION:
+        return 0
+    return 1 + int(math.log2(duration / RUNTIME_RESOLUTION))
+
+
+def result_features(result):
+    """Extract the features of a run.
+
+    Features are the outcome (the signature of a failure), the
+    runtime bucket and, for applications with option coverage=true,
+    the edges reached, each per application.
+
+    :param result: result of the run.
+    :type result: RunResult
+    :return: features of the run.
+    :rtype: set
+    """
+    name = app_name(result.app)
+    outcome = result.bucket or result.status.name
+    features = {(name, 'outcome', outcome),
+                (name, 'runtime', runtime_bucket(result.duration))}
+    if result.edges is not None:
+        features.update((name, 'edge', edge) for edge in result.edges)
+    return features
+
+
+def seed_features(executor, path):
+    """Run a seed file unmodified through all applications of executor.
+
+    :param executor: executor running the applications.
+    :type executor: FuzzExecutor
+    :param path: path of the seed file.
+    :type path: str
+    :return: features of all runs.
+    :rtype: frozenset
+    """
+    with open(path, 'rb') as f_seed:
+        data = f_seed.read()
+    features = set()
+    for app in executor.apps:
+        features |= result_features(executor.run_input(app, data))
+    return frozenset(features)
+
+
+def greedy_cover(features, sizes=None):
+    """Select seeds covering all features with the greedy set cover.
+
+    Repeatedly the seed adding most uncovered features is taken; among
+    equal ones the smallest. Gains only shrink as features get covered,
+    so a seed whose recomputed entry still ranks first in the heap is
+    the best one (lazy greedy).
+
+    :param features: features per seed.
+    :type features: {str: frozenset}
+    :param sizes: size per seed in bytes, used to break ties.
+    :type sizes: {str: int}
+    :return: selected seeds in order of selection.
+    :rtype: [str]
+    """
+    sizes = sizes or {}
+    heap = [(-len(seed_features_), sizes.get(seed, 0), seed)
+            for seed, seed_features_ in features.items()]
+    heapq.heapify(heap)
+    covered = set()
+    selected = []
+    while heap:
+        _, size, seed = heapq.heappop(heap)
+        gain = len(features[seed] - covered)
+        if gain == 0:
+            continue
+        entry = (-gain, size, seed)
+        if heap and entry > heap[0]:
+            # Another seed may be better now.
+            heapq.heappush(heap, entry)
+            continue
+        selected.append(seed)
+        covered |= features[seed]
+    return selected
+
+
+class CorpusMinimizer():
+    """Reduce a set of seed files to a subset of equal features.
+
+    Each seed file is run unmodified through all applications. Seeds
+    are compared by the features of their runs, see result_features().
+    The runs are spread over a pool of processes.
+    """
+
+    def __init__(self, app_list, processes=1):
+        """Take the applications under test.
+
+        :param app_list: applications as given to FuzzExecutor.
+        :param processes: number of seeds run in parallel.
+        :type processes: int
+        """
+        assert processes > 0, 'ENSURE: processes is positive.'
+        self.logger = logging.getLogger('fuzzing.corpus.CorpusMinimizer')
+        self.app_list = app_list
+        self.processes = processes
+        # Features per seed file of the last call of features().
+        self.features_ = {}
+
+    def features(self, seed_files):
+        """Run all seed files and collect their features.
+
+        :param seed_files: paths of the seed files.
+        :type seed_files: [str]
+        :return: features per seed file.
+        :rtype: {str: frozenset}
+        """
+        seed_files = list(seed_files)
+        if self.processes == 1:
+            with FuzzExecutor(self.app_list, []) as executor:
+                executor.keep_edges = True
+                features = [seed_features(executor, path)
+                            for path in seed_files]
+        else:
+            tasks = [seed_files[start:start + SEEDS_PER_TASK]
+                     for start in range(0, len(seed_files), SEEDS_PER_TASK)]
+            with ProcessPoolExecutor(self.processes,
+                                     initializer=_init_worker,
+                                     initargs=(self.app_list,)) as pool:
+                features = [seed_features_
+                            for task_features in pool.map(_run_seeds, tasks)
+                            for seed_features_ in task_features]
+        self.features_ = dict(zip(seed_files, features))
+        return self.features_
+
+    def minimize(self, seed_files):
+        """Select a minimal subset of seed files covering all features.
+
+        :param seed_files: paths of the seed files.
+        :type seed_files: [str]
+        :return: selected seed files, in the order given.
+        :rtype: [str]
+        """
+        features = self.features(seed_files)
+        sizes = {path: os.path.getsize(path) for path in features}
+        selected = set(greedy_cover(features, sizes))
+        self.logger.info('Selected %d of %d seed files', len(selected),
+                         len(features))
+        return [path for path in features if path in selected]
+
+
+def _init_worker(app_list):
+    """Create the executor of a worker process.
+
+    :param app_list: applications as given to FuzzExecutor.
+    """
+    global _executor
+    _executor = FuzzExecutor(app_list, [])
+    _executor.keep_edges = True
+    Finalize(_executor, _executor.close, exitpriority=10)
+
+
+def _run_seeds(seed_files):
+    """Collect the features of seed files in a worker process.
+
+    :param seed_files: paths of the seed files.
+    :type seed_files: [str]
+    :return: features per seed file.
+    :rtype: [frozenset]
+    """
+    features = [seed_features(_executor, path) for path in seed_files]
+    # Statistics of the runs are not needed.
+    _executor.reset_stats()
+    return features
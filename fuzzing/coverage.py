@@ -0,0 +1,418 @@
+# coding=utf-8
+"""
+Coverage feedback for Python applications.
+
+Record the edges between executed lines in a bitmap of fixed size and keep
+inputs reaching new edges for further fuzzing.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+import sys
+import mmap
+import zlib
+import tempfile
+import sysconfig
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is optional
+    numpy = None
+
+# Size of the coverage bitmap in bytes; a power of two.
+MAP_SIZE = 1 << 16
+MAP_MASK = MAP_SIZE - 1
+
+# Odd multiplier spreading line numbers over the bitmap.
+LINE_MULTIPLIER = 2654435761
+
+# Preferred tool id for sys.monitoring (Python 3.12+).
+TOOL_NAME = 'fuzzing'
+
+# Budget of the inputs kept in a corpus in bytes.
+DEFAULT_CORPUS_BYTES = 64 * 1024 * 1024
+
+# Prefix of the names of corpus entries, see Corpus.add().
+CORPUS_PREFIX = 'corpus:'
+
+# Environment variable passing the path of a SharedBitmap to a fork server.
+ENV_COVERAGE = 'FUZZING_COVERAGE'
+
+# Directory backed by memory on most Linux systems.
+TMPFS_DIR = '/dev/shm'
+
+_EMPTY_MAP = bytes(MAP_SIZE)
+
+# Code of the standard library and of this package is not traced, while
+# installed packages are.
+_INCLUDED = tuple({sysconfig.get_paths()[name]
+                   for name in ('purelib', 'platlib')})
+_EXCLUDED = tuple({sysconfig.get_paths()[name]
+                   for name in ('stdlib', 'platstdlib')} |
+                  {os.path.dirname(os.path.abspath(__file__))})
+
+
+def is_traced(filename):
+    """Check if code of given file is traced.
+
+    :param filename: file name of a code object.
+    :type filename: str
+    :return: False for the standard library and the fuzzing package.
+    :rtype: bool
+    """
+    if filename.startswith('<'):
+        return False
+    if filename.startswith(_INCLUDED):
+        return True
+    return not filename.startswith(_EXCLUDED)
+
+
+class CoverageTracer():
+    """Record the edges between executed lines in a bitmap.
+
+    Each line is mapped to a location in the bitmap. An edge is the
+    pair of the previous and the current location, mapped to a byte
+    set to 1, as AFL does for basic blocks. Uses sys.monitoring if
+    available (Python 3.12+), else sys.settrace(). Only the thread
+    calling start() is traced.
+    """
+
+    def __init__(self, bitmap=None):
+        """Take bitmap to record into.
+
+        :param bitmap: writable buffer of MAP_SIZE bytes, e.g. shared
+                       memory; a new bytearray if None.
+        """
+        self.bitmap = bytearray(MAP_SIZE) if bitmap is None else bitmap
+        self.prev_ = 0
+        # Location base per code object; None if not traced.
+        self.bases_ = {}
+        self._tool_id = None
+        self._previous_trace = None
+
+    def __enter__(self):
+        """Start tracing.
+
+        :return: this tracer.
+        :rtype: CoverageTracer
+        """
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop tracing."""
+        self.stop()
+
+    def start(self):
+        """Start recording edges."""
+        self.prev_ = 0
+        monitoring = getattr(sys, 'monitoring', None)
+        if monitoring is None:
+            self._previous_trace = sys.gettrace()
+            sys.settrace(self._trace_call)
+            return
+        self._tool_id = _free_tool_id(monitoring)
+        monitoring.use_tool_id(self._tool_id, TOOL_NAME)
+        monitoring.register_callback(self._tool_id, monitoring.events.LINE,
+                                     self._line)
+        monitoring.set_events(self._tool_id, monitoring.events.LINE)
+
+    def stop(self):
+        """Stop recording edges."""
+        if self._tool_id is None:
+            sys.settrace(self._previous_trace)
+            self._previous_trace = None
+            return
+        monitoring = sys.monitoring
+        monitoring.set_events(self._tool_id, 0)
+        monitoring.register_callback(self._tool_id, monitoring.events.LINE,
+                                     None)
+        monitoring.free_tool_id(self._tool_id)
+        self._tool_id = None
+
+    def reset(self):
+        """Clear the bitmap."""
+        self.bitmap[:] = _EMPTY_MAP
+
+    def _base(self, code):
+        """Retrieve the location base of a code object.
+
+        It is derived from file, name and first line of the code, so it
+        is the same in every process.
+
+        :param code: code object.
+        :return: base or None if the code is not traced.
+        :rtype: int
+        """
+        try:
+            return self.bases_[code]
+        except KeyError:
+            pass
+        base = None
+        if is_traced(code.co_filename):
+            base = zlib.crc32('{}:{}:{}'.format(
+                code.co_filename, code.co_name,
+                code.co_firstlineno).encode('utf8'))
+        self.bases_[code] = base
+        return base
+
+    def _record(self, base, line):
+        """Record the edge to given line.
+
+        :param base: location base of the code.
+        :param line: line number.
+        """
+        location = (base + line * LINE_MULTIPLIER) & MAP_MASK
+        self.bitmap[location ^ self.prev_] = 1
+        self.prev_ = location >> 1
+
+    def _line(self, code, line):
+        """Handle a LINE event of sys.monitoring.
+
+        :param code: code object executed.
+        :param line: line number.
+        :return: DISABLE for code not traced.
+        """
+        base = self._base(code)
+        if base is None:
+            return sys.monitoring.DISABLE
+        self._record(base, line)
+        return None
+
+    def _trace_call(self, frame, event, arg):
+        """Global trace function of sys.settrace().
+
+        :return: local trace function or None for code not traced.
+        """
+        base = self._base(frame.f_code)
+        if base is None:
+            return None
+        record = self._record
+
+        def trace_line(frame, event, arg):
+            """Local trace function recording lines."""
+            if event == 'line':
+                record(base, frame.f_lineno)
+            return trace_line
+        return trace_line
+
+
+class SharedBitmap():
+    """Bitmap in a memory mapped file, shared with another process.
+
+    The executor creates it and passes its path to a fork server in
+    ENV_COVERAGE. The children of the server record into it.
+    """
+
+    def __init__(self, directory=None):
+        """Create the file of the bitmap.
+
+        :param directory: directory of the file; default is /dev/shm if
+                          available, else the system's temporary directory.
+        :type directory: str
+        """
+        if directory is None and os.path.isdir(TMPFS_DIR):
+            directory = TMPFS_DIR
+        fd, self.path = tempfile.mkstemp(prefix='fuzzing_coverage_',
+                                         dir=directory)
+        try:
+            os.ftruncate(fd, MAP_SIZE)
+            self.buffer = mmap.mmap(fd, MAP_SIZE)
+        finally:
+            os.close(fd)
+
+    def reset(self):
+        """Clear the bitmap."""
+        self.buffer[:] = _EMPTY_MAP
+
+    def close(self):
+        """Unmap and remove the file."""
+        self.buffer.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def attach_bitmap(path):
+    """Map the file of a SharedBitmap into memory.
+
+    :param path: path of the file.
+    :type path: str
+    :return: the bitmap.
+    :rtype: mmap.mmap
+    """
+    with open(path, 'r+b') as f_map:
+        return mmap.mmap(f_map.fileno(), MAP_SIZE)
+
+
+def edge_indices(bitmap):
+    """Find the edges reached according to a bitmap.
+
+    :param bitmap: bitmap of a run.
+    :type bitmap: bytes-like object
+    :return: indices of the edges.
+    :rtype: frozenset
+    """
+    if numpy is not None:
+        edges = numpy.frombuffer(bitmap, dtype=numpy.uint8)
+        return frozenset(numpy.flatnonzero(edges).tolist())
+    return frozenset(index for index, value in enumerate(bytes(bitmap))
+                     if value)
+
+
+class CoverageMap():
+    """Edges seen in all runs so far.
+
+    With numpy the bitmap of a run is compared vectorized. Otherwise it
+    is compared as one big integer with a mask of the edges not seen.
+    """
+
+    __slots__ = ('seen_', 'unseen_')
+
+    def __init__(self):
+        """Create map without edges."""
+        if numpy is not None:
+            self.seen_ = numpy.zeros(MAP_SIZE, dtype=numpy.uint8)
+        else:
+            # Bytes of a bitmap are 0 or 1, so only every 8th bit counts.
+            self.seen_ = 0
+            self.unseen_ = int.from_bytes(b'\x01' * MAP_SIZE, 'little')
+
+    def update(self, bitmap):
+        """Add the edges of a run.
+
+        :param bitmap: bitmap of the run.
+        :type bitmap: bytes-like object
+        :return: number of edges not seen before.
+        :rtype: int
+        """
+        if numpy is not None:
+            edges = numpy.frombuffer(bitmap, dtype=numpy.uint8)
+            new = int(numpy.count_nonzero(edges > self.seen_))
+            if new:
+                numpy.maximum(self.seen_, edges, out=self.seen_)
+            return new
+        edges = int.from_bytes(bitmap, 'little')
+        new = edges & self.unseen_
+        if not new:
+            return 0
+        self.unseen_ &= ~edges
+        self.seen_ |= edges
+        return bin(new).count('1')
+
+    @property
+    def edges(self):
+        """Retrieve number of edges seen.
+
+        :return: number of edges.
+        :rtype: int
+        """
+        if numpy is not None:
+            return int(numpy.count_nonzero(self.seen_))
+        return bin(self.seen_).count('1')
+
+
+class Corpus():
+    """Inputs reaching new coverage, kept in memory for fuzzing.
+
+    Entries are named 'corpus:N'. The executor fuzzes them like seed
+    files. Inputs beyond the byte budget are dropped.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CORPUS_BYTES):
+        """Create empty corpus.
+
+        :param max_bytes: budget of the inputs in bytes.
+        :type max_bytes: int
+        """
+        self.max_bytes = max_bytes
+        self.entries_ = {}
+        self.names_ = []
+        self.size = 0
+
+    def add(self, data):
+        """Add an input if it fits into the budget.
+
+        :param data: the input.
+        :type data: bytes-like object
+        :return: name of the entry or None if dropped.
+        :rtype: str
+        """
+        if self.size + len(data) > self.max_bytes:
+            return None
+        name = '{}{}'.format(CORPUS_PREFIX, len(self.names_))
+        self.entries_[name] = bytearray(data)
+        self.names_.append(name)
+        self.size += len(data)
+        return name
+
+    def name(self, index):
+        """Retrieve the name of an entry by its position.
+
+        :param index: position of the entry, in order of addition.
+        :type index: int
+        :return: name of the entry.
+        :rtype: str
+        """
+        return self.names_[index]
+
+    def __getitem__(self, name):
+        """Retrieve an entry.
+
+        :param name: name of the entry.
+        :type name: str
+        :return: the input; modified in place while being fuzzed.
+        :rtype: bytearray
+        """
+        return self.entries_[name]
+
+    def __contains__(self, name):
+        """Check if an entry exists.
+
+        :param name: name of the entry.
+        :type name: str
+        :return: True if it exists.
+        :rtype: bool
+        """
+        return name in self.entries_
+
+    def __len__(self):
+        """Retrieve number of entries.
+
+        :return: number of entries.
+        :rtype: int
+        """
+        return len(self.names_)
+
+
+def _free_tool_id(monitoring):
+    """Find a tool id of sys.monitoring not in use.
+
+    :param monitoring: the module sys.monitoring.
+    :return: tool id.
+    :rtype: int
+    :raise RuntimeError: if all ids are in use.
+    """
+    for tool_id in (monitoring.COVERAGE_ID, 2, 3, 4):
+        if monitoring.get_tool(tool_id) is None:
+            return tool_id
+    raise RuntimeError('No free sys.monitoring tool id.')
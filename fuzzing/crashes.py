@@ -0,0 +1,213 @@
+# coding=utf-8
+"""
+Store of failing inputs.
+
+Inputs are saved under their SHA-256 digest, so each distinct input is
+stored once, however often it fails.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+import json
+import hashlib
+import tempfile
+import logging
+
+# Suffix of the file holding the metadata of an input.
+METADATA_SUFFIX = '.json'
+
+# Number of hex digits of the digest naming the shard directory.
+SHARD_DIGITS = 2
+
+
+class CrashStore():
+    """Content addressed store of failing inputs.
+
+    An input is saved as directory/ab/abcdef... with its metadata in
+    abcdef....json next to it. Files are written to a temporary file
+    and linked to their final name, so readers never see partial files,
+    and processes sharing the directory do not overwrite each other.
+    """
+
+    def __init__(self, directory):
+        """Take directory of the store; it is created if needed.
+
+        :param directory: root directory of the store.
+        :type directory: str
+        """
+        self.logger = logging.getLogger('fuzzing.crashes.CrashStore')
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Digests known to be stored, to skip the file system for
+        # inputs failing repeatedly.
+        self.known_ = set()
+        self.saved = 0
+        self.duplicates = 0
+
+    def save(self, data, metadata):
+        """Save a failing input unless it is stored already.
+
+        :param data: the input.
+        :type data: bytes-like object
+        :param metadata: description of the run; must be JSON serializable.
+        :type metadata: {}
+        :return: digest of the input.
+        :rtype: str
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self.known_:
+            self.duplicates += 1
+            return digest
+        path = self.path(digest)
+        created = False
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            created = _link_new(path, data)
+        if created:
+            metadata = dict(metadata, sha256=digest, size=len(data))
+            _replace(path + METADATA_SUFFIX,
+                     json.dumps(metadata, sort_keys=True).encode('utf-8'))
+            self.saved += 1
+            self.logger.info('Saved failing input %s', digest)
+        else:
+            self.duplicates += 1
+        self.known_.add(digest)
+        return digest
+
+    def path(self, digest):
+        """Retrieve the path of an input.
+
+        :param digest: SHA-256 digest of the input as hex string.
+        :type digest: str
+        :return: path of the input file.
+        :rtype: str
+        """
+        return os.path.join(self.directory, digest[:SHARD_DIGITS], digest)
+
+    def load(self, digest):
+        """Read a stored input.
+
+        :param digest: SHA-256 digest of the input.
+        :type digest: str
+        :return: the input.
+        :rtype: bytes
+        """
+        with open(self.path(digest), 'rb') as f_input:
+            return f_input.read()
+
+    def metadata(self, digest):
+        """Read the metadata of a stored input.
+
+        :param digest: SHA-256 digest of the input.
+        :type digest: str
+        :return: metadata or None if not written yet.
+        :rtype: {}
+        """
+        try:
+            with open(self.path(digest) + METADATA_SUFFIX, 'rb') as f_meta:
+                return json.loads(f_meta.read().decode('utf-8'))
+        except FileNotFoundError:
+            return None
+
+    def __contains__(self, digest):
+        """Check if an input is stored.
+
+        :param digest: SHA-256 digest of the input.
+        :type digest: str
+        :return: True if stored.
+        :rtype: bool
+        """
+        return digest in self.known_ or os.path.exists(self.path(digest))
+
+    def __iter__(self):
+        """Iterate over the digests of all stored inputs.
+
+        :return: iterator of digests.
+        """
+        for shard in sorted(os.listdir(self.directory)):
+            shard_path = os.path.join(self.directory, shard)
+            if len(shard) != SHARD_DIGITS or not os.path.isdir(shard_path):
+                continue
+            for name in sorted(os.listdir(shard_path)):
+                if name.startswith(shard) and '.' not in name:
+                    yield name
+
+    def __len__(self):
+        """Count the stored inputs.
+
+        :return: number of inputs.
+        :rtype: int
+        """
+        return sum(1 for _ in self)
+
+
+def _write_temp(directory, data):
+    """Write data to a new temporary file.
+
+    :param directory: directory of the file.
+    :param data: data to write.
+    :return: path of the file.
+    :rtype: str
+    """
+    fd, temp_path = tempfile.mkstemp(prefix='.tmp_', dir=directory)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    except BaseException:
+        os.close(fd)
+        os.remove(temp_path)
+        raise
+    os.close(fd)
+    return temp_path
+
+
+def _link_new(path, data):
+    """Atomically create a file with given data unless it exists.
+
+    :param path: path of the file.
+    :param data: content of the file.
+    :return: True if created, False if the file existed.
+    :rtype: bool
+    """
+    temp_path = _write_temp(os.path.dirname(path), data)
+    try:
+        os.link(temp_path, path)
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(temp_path)
+    return True
+
+
+def _replace(path, data):
+    """Atomically write a file, replacing an existing one.
+
+    :param path: path of the file.
+    :param data: content of the file.
+    """
+    temp_path = _write_temp(os.path.dirname(path), data)
+    try:
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
@@ -0,0 +1,336 @@
+# coding=utf-8
+"""
+Input delivery.
+
+Backends providing fuzzed data as input files to the applications under
+test. Each backend hands out an input slot per run, which is released
+when the run is finished.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import weakref
+
+# Directory backed by memory on most Linux systems.
+TMPFS_DIR = '/dev/shm'
+
+
+class InputSlot():
+    """An input file holding the data of one run."""
+
+    def __init__(self, fd, path, pass_fds=(), shared_path=None, data=None):
+        """Take file descriptor and path of the input.
+
+        :param fd: file descriptor of the input or None.
+        :type fd: int
+        :param path: path to pass to the application.
+        :type path: str
+        :param pass_fds: file descriptors the application must inherit.
+        :type pass_fds: (int)
+        :param shared_path: path usable by processes not started by the
+                            executor, e.g. children of a fork server.
+        :type shared_path: str
+        :param data: data to pipe into the application instead of a file.
+        :type data: bytes-like object
+        """
+        self.fd = fd
+        self.path = path
+        self.pass_fds = tuple(pass_fds)
+        self.shared_path = shared_path or path
+        self.data = data
+        # Seed file and mutator the data was derived from; set by the
+        # executor for its statistics.
+        self.seed = None
+        self.mutator = None
+
+    def read(self):
+        """Read the data of the slot back, e.g. to keep a failing input.
+
+        :return: the data.
+        :rtype: bytes
+        """
+        if self.data is not None:
+            return bytes(self.data)
+        if self.fd is not None:
+            return os.pread(self.fd, os.fstat(self.fd).st_size, 0)
+        with open(self.path, 'rb') as f_input:
+            return f_input.read()
+
+
+class Delivery():
+    """Base class of input delivery backends."""
+
+    # True if the fuzzed buffer must not change until the slot is released.
+    # Backends copying the data in acquire() don't need this.
+    persistent = False
+
+    def acquire(self, data):
+        """Provide data as input file.
+
+        :param data: the fuzzed data.
+        :type data: bytes-like object
+        :return: input slot holding data.
+        :rtype: InputSlot
+        """
+        raise NotImplementedError
+
+    def release(self, slot):
+        """Release input slot after the run is finished.
+
+        :param slot: slot returned by acquire().
+        :type slot: InputSlot
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release all resources of the backend."""
+        pass
+
+
+class TempFileDelivery(Delivery):
+    """Write each input into a new temporary file.
+
+    The file is removed when the slot is released.
+    """
+
+    def __init__(self, directory=None):
+        """Take directory for temporary files.
+
+        :param directory: directory for the files; default is the
+                          system's temporary directory.
+        :type directory: str
+        """
+        self.directory = directory
+
+    def acquire(self, data):
+        """Provide data as input file.
+
+        :param data: the fuzzed data.
+        :type data: bytes-like object
+        :return: input slot holding data.
+        :rtype: InputSlot
+        """
+        fd, path = tempfile.mkstemp(prefix='fuzzed_', dir=self.directory)
+        try:
+            _write_all(fd, data)
+        finally:
+            os.close(fd)
+        return InputSlot(None, path)
+
+    def release(self, slot):
+        """Remove the input file.
+
+        :param slot: slot returned by acquire().
+        :type slot: InputSlot
+        """
+        try:
+            os.remove(slot.path)
+        except FileNotFoundError:
+            pass
+
+
+class PipeDelivery(Delivery):
+    """Pipe the data into the application's standard input.
+
+    No file is involved. The data is written while the application
+    runs, so the buffer has to stay unchanged until then.
+    """
+
+    persistent = True
+
+    def acquire(self, data):
+        """Provide data for the standard input.
+
+        :param data: the fuzzed data.
+        :type data: bytes-like object
+        :return: input slot holding data.
+        :rtype: InputSlot
+        """
+        return InputSlot(None, None, data=data)
+
+    def release(self, slot):
+        """Nothing to release.
+
+        :param slot: slot returned by acquire().
+        :type slot: InputSlot
+        """
+        pass
+
+
+class _PooledDelivery(Delivery):
+    """Base class of backends reusing their input files.
+
+    A released slot is rewritten in place by the next run, so there is
+    no file created or removed per run. Concurrent runs get separate
+    slots.
+    """
+
+    def __init__(self):
+        """Prepare empty pool."""
+        self.free_ = []
+        self.slots_ = []
+
+    def acquire(self, data):
+        """Provide data as input file.
+
+        :param data: the fuzzed data.
+        :type data: bytes-like object
+        :return: input slot holding data.
+        :rtype: InputSlot
+        """
+        if self.free_:
+            slot = self.free_.pop()
+        else:
+            slot = self._create_slot(len(self.slots_))
+            self.slots_.append(slot)
+        os.lseek(slot.fd, 0, os.SEEK_SET)
+        _write_all(slot.fd, data)
+        os.ftruncate(slot.fd, len(data))
+        return slot
+
+    def release(self, slot):
+        """Return slot to the pool.
+
+        :param slot: slot returned by acquire().
+        :type slot: InputSlot
+        """
+        self.free_.append(slot)
+
+    def close(self):
+        """Close all input files."""
+        for slot in self.slots_:
+            os.close(slot.fd)
+        self.slots_ = []
+        self.free_ = []
+
+    def _create_slot(self, index):
+        """Create a new input file.
+
+        :param index: number of the slot.
+        :type index: int
+        :return: new slot.
+        :rtype: InputSlot
+        """
+        raise NotImplementedError
+
+
+class ReusableFileDelivery(_PooledDelivery):
+    """Rewrite the same input files in place.
+
+    The files live in a private directory, by default on tmpfs if
+    available. It is removed on close() or at the latest when the
+    process exits.
+    """
+
+    def __init__(self, directory=None):
+        """Take directory for the private directory of input files.
+
+        :param directory: parent directory; default is /dev/shm if
+                          available, else the system's temporary directory.
+        :type directory: str
+        """
+        super(ReusableFileDelivery, self).__init__()
+        if directory is None and os.path.isdir(TMPFS_DIR):
+            directory = TMPFS_DIR
+        self.directory = tempfile.mkdtemp(prefix='fuzzing_', dir=directory)
+        self._finalizer = weakref.finalize(self, shutil.rmtree,
+                                           self.directory, True)
+
+    def close(self):
+        """Close and remove all input files."""
+        super(ReusableFileDelivery, self).close()
+        self._finalizer()
+
+    def _create_slot(self, index):
+        """Create a new input file.
+
+        :param index: number of the slot.
+        :type index: int
+        :return: new slot.
+        :rtype: InputSlot
+        """
+        path = os.path.join(self.directory, 'fuzzed_{}'.format(index))
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        return InputSlot(fd, path)
+
+
+class MemfdDelivery(_PooledDelivery):
+    """Keep the inputs in anonymous memory files (Linux only).
+
+    The application gets the path /proc/self/fd/N and inherits the
+    file descriptor N.
+    """
+
+    @staticmethod
+    def available():
+        """Check if memory files are supported.
+
+        :return: True if supported.
+        :rtype: bool
+        """
+        return hasattr(os, 'memfd_create') and os.path.isdir('/proc/self/fd')
+
+    def _create_slot(self, index):
+        """Create a new memory file.
+
+        :param index: number of the slot.
+        :type index: int
+        :return: new slot.
+        :rtype: InputSlot
+        """
+        fd = os.memfd_create('fuzzed_{}'.format(index))
+        path = '/proc/self/fd/{}'.format(fd)
+        shared_path = '/proc/{}/fd/{}'.format(os.getpid(), fd)
+        return InputSlot(fd, path, (fd,), shared_path)
+
+
+DELIVERIES = {'file': ReusableFileDelivery,
+              'tempfile': TempFileDelivery,
+              'memfd': MemfdDelivery}
+
+
+def create_delivery(name):
+    """Create delivery backend by name.
+
+    :param name: one of DELIVERIES.
+    :type name: str
+    :return: the backend.
+    :rtype: Delivery
+    :raise ValueError: if the backend is unknown or not available.
+    """
+    if name not in DELIVERIES:
+        raise ValueError('Unknown delivery {}.'.format(name))
+    if name == 'memfd' and not MemfdDelivery.available():
+        raise ValueError('Delivery memfd is not available.')
+    return DELIVERIES[name]()
+
+
+def _write_all(fd, data):
+    """Write all data to fd.
+
+    :param fd: file descriptor to write to.
+    :param data: data to write.
+    """
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
@@ -0,0 +1,373 @@
+# coding=utf-8
+"""
+Fork server support.
+
+Starting an application for each test run is expensive, especially for
+interpreted targets. A fork server starts the application once. The
+application initializes itself, stops at a handshake point, and then
+forks a fresh child for each test case.
+
+Protocol
+--------
+
+The executor creates two pipes and starts the application with the
+environment variable FUZZING_FORKSERVER set to '<control fd>,<status fd>'.
+All integers are 4 byte signed big endian values.
+
+1. Handshake: the server writes the 4 bytes 'FZSV' to the status pipe.
+2. Request: the executor writes the length of the input path followed by
+   the UTF-8 encoded path to the control pipe.
+3. The server forks. The child closes both pipes and processes the input.
+   The server writes the pid of the child to the status pipe.
+4. When the child has exited, the server writes its wait status (as
+   returned by os.waitpid()) to the status pipe.
+
+Steps 2 to 4 are repeated for each test case. The server exits if the
+control pipe is closed. The executor may kill a child running too long.
+
+Python applications call serve() at the handshake point or simply
+wrap their entry point with run(), see there.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+import sys
+import math
+import resource
+import signal
+import traceback
+import struct
+import selectors
+import subprocess
+import time
+import logging
+
+from .coverage import CoverageTracer, ENV_COVERAGE, attach_bitmap
+
+ENV_FORKSERVER = 'FUZZING_FORKSERVER'
+# CPU time limit of each child in seconds. Not applied to the server,
+# which would add up the CPU time of all runs.
+ENV_CPU_LIMIT = 'FUZZING_CPU_LIMIT'
+HELLO = b'FZSV'
+
+# Seconds to wait for the handshake of a starting fork server.
+STARTUP_TIMEOUT = 10.0
+
+# Seconds to wait for a terminated child before killing it.
+TERMINATE_GRACE_PERIOD = 1.0
+
+_INT = struct.Struct('>i')
+
+
+class ForkServerError(Exception):
+    """Raised if the fork server does not follow the protocol."""
+
+    def __init__(self, info):
+        """Take info describing cause of exception."""
+        super(ForkServerError, self).__init__(info)
+        self.info = info
+
+
+def serve():
+    """Act as fork server if the application was started as one.
+
+    Call this function at the handshake point, i.e. after expensive
+    initialization is done, but before the input is read. In a fork
+    server it returns in a fresh child for each test case, traced from
+    then on if the executor measures coverage. Otherwise it returns
+    immediately. Example: ::
+
+        def main():
+            initialize()
+            path = fuzzing.forkserver.serve() or sys.argv[1]
+            process(path)
+
+    :return: path of the input to process or None if not started as
+             fork server.
+    :rtype: str
+    """
+    fds = os.environ.pop(ENV_FORKSERVER, None)
+    if fds is None:
+        return None
+    control_fd, status_fd = [int(fd) for fd in fds.split(',')]
+    # Shared with all children, so the executor sees their coverage.
+    coverage_path = os.environ.pop(ENV_COVERAGE, None)
+    bitmap = None if coverage_path is None else attach_bitmap(coverage_path)
+    cpu_limit = os.environ.pop(ENV_CPU_LIMIT, None)
+    _write_all(status_fd, HELLO)
+    while True:
+        try:
+            length = _read_int(control_fd)
+        except EOFError:
+            # Executor is gone.
+            os._exit(0)
+        path = _read_exact(control_fd, length).decode('utf8')
+        pid = os.fork()
+        if pid == 0:
+            os.close(control_fd)
+            os.close(status_fd)
+            if cpu_limit is not None:
+                limit_cpu(float(cpu_limit))
+            if bitmap is not None:
+                CoverageTracer(bitmap).start()
+            return path
+        _write_all(status_fd, _INT.pack(pid))
+        _, wait_status = os.waitpid(pid, 0)
+        _write_all(status_fd, _INT.pack(wait_status))
+
+
+def run(target):
+    """Run target on the input file, as fork server if requested.
+
+    Use it as entry point of the application: ::
+
+        if __name__ == '__main__':
+            sys.exit(fuzzing.forkserver.run(process))
+
+    target is called with the path of the input file. Without fork
+    server this is the last command line argument, and the result of
+    target is returned. In a fork server child the process exits right
+    after target returns, skipping the costly interpreter shutdown.
+    The exit code is derived from the result like sys.exit() does.
+
+    :param target: function processing an input file.
+    :type target: callable
+    :return: result of target.
+    """
+    path = serve()
+    if path is None:
+        return target(sys.argv[-1])
+    try:
+        code = target(path)
+    except SystemExit as exc:
+        code = exc.code
+    except BaseException:  # pylint: disable=broad-except
+        traceback.print_exc()
+        code = 1
+    if code is None:
+        code = 0
+    elif not isinstance(code, int):
+        print(code, file=sys.stderr)
+        code = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)
+
+
+class ForkServer():
+    """Control a fork server from the executor's side."""
+
+    def __init__(self, command, preexec_fn=None, env=None):
+        """Take command starting the application.
+
+        :param command: command line of the application without input.
+        :type command: [str]
+        :param preexec_fn: function called in the application's process
+                           before it is executed, see subprocess.Popen.
+        :param env: variables added to the environment of the application.
+        :type env: {str: str}
+        """
+        self.logger = logging.getLogger('fuzzing.forkserver.ForkServer')
+        self.command = command
+        self.preexec_fn = preexec_fn
+        self.env = env or {}
+        self.process = None
+        self.control_fd = None
+        self.status_fd = None
+
+    def start(self):
+        """Start the application and wait for the handshake.
+
+        :raise ForkServerError: if the handshake fails.
+        """
+        control_read, control_write = os.pipe()
+        status_read, status_write = os.pipe()
+        env = dict(os.environ)
+        env.update(self.env)
+        env[ENV_FORKSERVER] = '{},{}'.format(control_read, status_write)
+        self.process = subprocess.Popen(
+            self.command, env=env, pass_fds=(control_read, status_write),
+            preexec_fn=self.preexec_fn)
+        os.close(control_read)
+        os.close(status_write)
+        self.control_fd = control_write
+        self.status_fd = status_read
+        hello = _read_exact(self.status_fd, len(HELLO), STARTUP_TIMEOUT)
+        if hello != HELLO:
+            self.stop()
+            raise ForkServerError('No handshake from {}.'.format(
+                self.command[0]))
+        self.logger.info('Fork server started: %s', self.command)
+
+    def run(self, file_, timeout):
+        """Run a test case.
+
+        A child still running when timeout expires is terminated. If
+        the fork server dies or breaks the protocol, it is stopped and
+        started again by the next run.
+
+        :param file_: path of input for the test case.
+        :type file_: str
+        :param timeout: maximum time the child may run in seconds.
+        :type timeout: float
+        :return: return code as reported by Popen, or None on timeout.
+        :rtype: int
+        :raise ForkServerError: if the fork server died.
+        """
+        if self.process is None:
+            self.start()
+        path = file_.encode('utf8')
+        try:
+            _write_all(self.control_fd, _INT.pack(len(path)) + path)
+            pid = _read_int(self.status_fd, STARTUP_TIMEOUT)
+            if pid is not None:
+                return self._wait(pid, timeout)
+        except (OSError, EOFError):
+            pass
+        self.stop()
+        raise ForkServerError('Fork server {} died.'.format(self.command[0]))
+
+    def _wait(self, pid, timeout):
+        """Wait for the status of a child.
+
+        The child is only signaled while the fork server is known to be
+        alive, as its pid may be reused once the server is gone.
+
+        :param pid: process id of the child.
+        :type pid: int
+        :param timeout: maximum time the child may run in seconds.
+        :type timeout: float
+        :return: return code as reported by Popen, or None on timeout.
+        :rtype: int
+        :raise EOFError: if the fork server closed the status pipe.
+        """
+        wait_status = _read_int(self.status_fd, timeout)
+        if wait_status is not None:
+            return returncode_from_status(wait_status)
+        _kill(pid, signal.SIGTERM)
+        if _read_int(self.status_fd, TERMINATE_GRACE_PERIOD) is None:
+            _kill(pid, signal.SIGKILL)
+            _read_int(self.status_fd)
+        return None
+
+    def stop(self):
+        """Stop the fork server."""
+        if self.process is None:
+            return
+        os.close(self.control_fd)
+        os.close(self.status_fd)
+        try:
+            self.process.wait(TERMINATE_GRACE_PERIOD)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+
+def limit_cpu(cpu_limit):
+    """Limit the CPU time of the calling process.
+
+    The process gets SIGXCPU at the limit, and SIGKILL one second later.
+
+    :param cpu_limit: CPU time limit in seconds.
+    :type cpu_limit: float
+    """
+    seconds = max(1, math.ceil(cpu_limit))
+    resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+
+
+def returncode_from_status(wait_status):
+    """Convert wait status to return code as used by Popen.
+
+    :param wait_status: status as returned by os.waitpid().
+    :return: exit code, or negative signal number if signaled.
+    :rtype: int
+    """
+    if os.WIFSIGNALED(wait_status):
+        return -os.WTERMSIG(wait_status)
+    return os.WEXITSTATUS(wait_status)
+
+
+def _kill(pid, sig):
+    """Send signal to process if it still exists.
+
+    :param pid: process id.
+    :param sig: signal to send.
+    """
+    try:
+        os.kill(pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def _read_int(fd, timeout=None):
+    """Read a protocol integer.
+
+    :param fd: file descriptor to read from.
+    :param timeout: maximum time to wait in seconds; None waits forever.
+    :return: the integer or None on timeout.
+    :rtype: int
+    :raise EOFError: at end of file, or if the timeout expired after
+                     part of the integer was read.
+    """
+    data = _read_exact(fd, _INT.size, timeout)
+    if data is None:
+        return None
+    if len(data) < _INT.size:
+        raise EOFError('Incomplete integer from fd {}.'.format(fd))
+    return _INT.unpack(data)[0]
+
+
+def _read_exact(fd, size, timeout=None):
+    """Read size bytes from fd.
+
+    :param fd: file descriptor to read from.
+    :param size: number of bytes to read.
+    :param timeout: maximum time to wait in seconds; None waits forever.
+    :return: data read, shorter on end of file or on timeout after
+             part of the data was read, None on timeout before.
+    :rtype: bytes
+    """
+    data = b''
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        while len(data) < size:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not selector.select(remaining):
+                    return data or None
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+    return data
+
+
+def _write_all(fd, data):
+    """Write all data to fd.
+
+    :param fd: file descriptor to write to.
+    :param data: data to write.
+    """
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
@@ -35,12 +35,72 @@ import random
 import time
 import math
 from copy import deepcopy
-from collections import Counter
+from array import array
+import operator
+from contextlib import contextmanager
 import os.path
-from tempfile import mkstemp
 import subprocess
+import selectors
+import signal
+import resource
 import logging
 import enum
+from collections import OrderedDict
+
+from .seeds import SeedCache
+from .rng import FuzzRandom, make_rng
+from .delivery import create_delivery, PipeDelivery, InputSlot
+from .forkserver import (ForkServer, ForkServerError, returncode_from_status,
+                         limit_cpu, TERMINATE_GRACE_PERIOD, ENV_CPU_LIMIT)
+from .histogram import UsageStats
+from .capture import TailBuffer, drain, DEFAULT_TAIL_SIZE
+from .stats import MultiStatCounter
+from .buckets import CrashBuckets
+from .coverage import (CoverageTracer, CoverageMap, Corpus, SharedBitmap,
+                       ENV_COVERAGE, edge_indices)
+from .harness import (is_callable_spec, load_callable, call_target,
+                      IsolatedWorker, DEFAULT_RECYCLE)
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is optional
+    numpy = None
+
+# Below this number of modified bytes the pure Python loop is cheaper
+# than setting up the vectorized mutation.
+VECTORIZE_THRESHOLD = 32
+
+# Number of string variants fuzzed at once by iter_fuzz_string().
+STRING_BATCH_SIZE = 64
+
+# Ways to hand the input to an application, see option input.
+INPUT_MODES = ('file', 'stdin', 'argv')
+
+# Handling of the standard output and error of an application, see
+# option output.
+OUTPUT_MODES = ('inherit', 'discard', 'capture')
+
+# Argument replaced by the input file with option input=argv.
+INPUT_PLACEHOLDER = '@@'
+
+# Seconds between checks for the exit of a process, if there is no pidfd.
+POLL_INTERVAL = 0.005
+
+# Name of the mutation done by fuzzer(), see FuzzExecutor.mutator.
+MUTATOR_NAME = 'replace_bytes'
+
+# Options limiting the resources of an application; wall clock and CPU
+# time in seconds, memory in MiB.
+LIMIT_OPTIONS = ('wall_limit', 'cpu_limit', 'memory_limit')
+
+# A process exceeding its wall clock limit is considered hung rather than
+# busy if it used less CPU time than this fraction of its run time.
+HANG_CPU_RATIO = 0.1
+
+# Output of a process failing to allocate memory, e.g. of Python, glibc
+# and C++. A failed run with memory_limit printing one is out of memory.
+OOM_MARKERS = (b'MemoryError', b'Cannot allocate memory', b'std::bad_alloc',
+               b'out of memory', b'Out of memory')
 
 
 def logger():
@@ -52,7 +112,7 @@ def logger():
     return logging.getLogger('fuzzing.fuzzer')
 
 
-def fuzz_string(seed_str, runs=100, fuzz_factor=50):
+def fuzz_string(seed_str, runs=100, fuzz_factor=50, rng=None):
     """Generate runs fuzzed strings from seed_str.
 
     A random fuzzer for a simulated text viewer application.
@@ -61,61 +121,571 @@ def fuzz_string(seed_str, runs=100, fuzz_factor=50):
     :param seed_str: the string to use as seed for fuzzing.
     :param runs: number of fuzzed variants to supply.
     :param fuzz_factor: degree of fuzzing = 1 / fuzz_factor.
+    :param rng: random generator; the random module if None.
+    :type rng: random.Random
     :return: list of fuzzed variants of seed_str.
     :rtype: [str]
     """
+    return list(iter_fuzz_string(seed_str, runs, fuzz_factor, rng))
+
+
+def iter_fuzz_string(seed_str, runs=100, fuzz_factor=50, rng=None):
+    """Generate runs fuzzed strings from seed_str lazily.
+
+    Same as fuzz_string(), but yields the variants one by one.
+    Variants are fuzzed in batches of STRING_BATCH_SIZE, so memory
+    consumption does not depend on runs.
+
+    :param seed_str: the string to use as seed for fuzzing.
+    :param runs: number of fuzzed variants to supply.
+    :param fuzz_factor: degree of fuzzing = 1 / fuzz_factor.
+    :param rng: random generator; the random module if None.
+    :type rng: random.Random
+    :return: generator of fuzzed variants of seed_str.
+    :rtype: generator of str
+    """
     buf = bytearray(seed_str, encoding="utf8")
-    variants = []
-    for _ in range(runs):
-        fuzzed = fuzzer(buf, fuzz_factor)
-        variants.append(''.join([chr(b) for b in fuzzed]))
-    logger().info('Fuzzed strings: %s', variants)
-    return variants
+    remaining = runs
+    while remaining > 0:
+        count = min(remaining, STRING_BATCH_SIZE)
+        for fuzzed in fuzz_batch(buf, count, fuzz_factor, rng):
+            # Each byte maps to the character of same code point.
+            variant = str(fuzzed, encoding='latin-1')
+            if remaining == runs:
+                logger().debug('First fuzzed string: %s', variant)
+            remaining -= 1
+            yield variant
+    logger().info('Fuzzed %d strings from seed of %d bytes.', runs, len(buf))
 
 
-def fuzzer(buffer, fuzz_factor=101):
+def fuzzer(buffer, fuzz_factor=101, rng=None):
     """Fuzz given buffer.
 
     Take a buffer of bytes, create a copy, and replace some bytes
     with random values. Number of bytes to modify depends on fuzz_factor.
     This code is taken from Charlie Miller's fuzzer code.
 
+    If numpy is available and enough bytes are to be modified, all
+    positions and values are drawn in one go and written with fancy
+    indexing instead of looping in Python.
+
     :param buffer: the data to fuzz.
     :type buffer: byte array
     :param fuzz_factor: degree of fuzzing.
     :type fuzz_factor: int
+    :param rng: random generator; the random module if None.
+    :type rng: random.Random
     :return: fuzzed buffer.
     :rtype: byte array
     """
     buf = deepcopy(buffer)
-    num_writes = number_of_bytes_to_modify(len(buf), fuzz_factor)
+    num_writes = number_of_bytes_to_modify(len(buf), fuzz_factor, rng)
+    if numpy is not None and num_writes >= VECTORIZE_THRESHOLD:
+        _fuzz_vectorized(buf, num_writes, rng)
+        return buf
+    rng = _python_rng(rng)
     for _ in range(num_writes):
-        random_byte = random.randrange(256)
-        random_position = random.randrange(len(buf))
+        random_byte = rng.randrange(256)
+        random_position = rng.randrange(len(buf))
         buf[random_position] = random_byte
     return buf
 
 
-def number_of_bytes_to_modify(buf_len, fuzz_factor):
+def _fuzz_vectorized(buf, num_writes, rng):
+    """Replace num_writes random bytes of buf using numpy.
+
+    :param buf: writable buffer to modify in place.
+    :type buf: byte array
+    :param num_writes: number of bytes to replace.
+    :type num_writes: int
+    :param rng: random generator; the random module if None.
+    :type rng: random.Random
+    """
+    rng = _numpy_rng(rng)
+    data = numpy.frombuffer(buf, dtype=numpy.uint8)
+    positions = rng.integers(0, len(data), size=num_writes)
+    data[positions] = rng.integers(0, 256, size=num_writes, dtype=numpy.uint8)
+
+
+def _python_rng(rng):
+    """Provide the generator to draw Python random numbers from.
+
+    :param rng: random generator or None.
+    :type rng: random.Random
+    :return: rng, or the random module if rng is None.
+    """
+    return random if rng is None else rng
+
+
+def _numpy_rng(rng=None):
+    """Provide a numpy generator matching given generator.
+
+    A FuzzRandom provides the numpy generator of its stream. Other
+    generators, including the random module, seed a new numpy generator,
+    which keeps random.seed() effective for both code paths.
+
+    :param rng: random generator; the random module if None.
+    :type rng: random.Random
+    :return: numpy random generator.
+    :rtype: numpy.random.Generator
+    """
+    if isinstance(rng, FuzzRandom):
+        return rng.numpy_generator()
+    return numpy.random.default_rng(_python_rng(rng).getrandbits(64))
+
+
+def fuzz_batch(buffer, count, fuzz_factor=101, rng=None):
+    """Fuzz count variants of given buffer at once.
+
+    All variants are written into one contiguous arena allocated
+    for the whole batch. The variants are returned as memoryview
+    slices of this arena, so no further copies are made.
+
+    :param buffer: the data to fuzz.
+    :type buffer: byte array
+    :param count: number of variants to create.
+    :type count: int
+    :param fuzz_factor: degree of fuzzing.
+    :type fuzz_factor: int
+    :param rng: random generator; the random module if None.
+    :type rng: random.Random
+    :return: fuzzed variants.
+    :rtype: [memoryview]
+    """
+    buf_len = len(buffer)
+    arena = bytearray(buffer) * count
+    if numpy is not None and count > 0:
+        _fuzz_batch_vectorized(arena, buf_len, count, fuzz_factor, rng)
+    else:
+        python_rng = _python_rng(rng)
+        for idx in range(count):
+            offset = idx * buf_len
+            num_writes = number_of_bytes_to_modify(buf_len, fuzz_factor, rng)
+            for _ in range(num_writes):
+                random_position = offset + python_rng.randrange(buf_len)
+                arena[random_position] = python_rng.randrange(256)
+    view = memoryview(arena)
+    return [view[idx * buf_len:(idx + 1) * buf_len] for idx in range(count)]
+
+
+def _fuzz_batch_vectorized(arena, buf_len, count, fuzz_factor, rng):
+    """Fuzz all variants in arena using numpy.
+
+    :param arena: writable buffer holding count copies of the seed.
+    :type arena: byte array
+    :param buf_len: length of a single variant.
+    :type buf_len: int
+    :param count: number of variants in arena.
+    :type count: int
+    :param fuzz_factor: degree of fuzzing.
+    :type fuzz_factor: int
+    :param rng: random generator; the random module if None.
+    :type rng: random.Random
+    """
+    rng = _numpy_rng(rng)
+    data = numpy.frombuffer(arena, dtype=numpy.uint8).reshape(count, buf_len)
+    max_writes = math.ceil(float(buf_len) / fuzz_factor)
+    num_writes = rng.integers(0, max_writes, size=count) + 1
+    rows = numpy.repeat(numpy.arange(count), num_writes)
+    columns = rng.integers(0, buf_len, size=len(rows))
+    data[rows, columns] = rng.integers(0, 256, size=len(rows),
+                                       dtype=numpy.uint8)
+
+
+def fuzz_in_place(buffer, fuzz_factor=101, rng=None):
+    """Fuzz given buffer in place.
+
+    Same as fuzzer(), but modifies buffer instead of a copy.
+    Each modification is recorded in an undo log, which allows
+    to restore the original buffer using revert_fuzz().
+
+    :param buffer: the data to fuzz.
+    :type buffer: byte array
+    :param fuzz_factor: degree of fuzzing.
+    :type fuzz_factor: int
+    :param rng: random generator; the random module if None.
+    :type rng: random.Random
+    :return: undo log.
+    :rtype: [(int, int)]
+    """
+    buf_len = len(buffer)
+    num_writes = number_of_bytes_to_modify(buf_len, fuzz_factor, rng)
+    if numpy is not None and num_writes >= VECTORIZE_THRESHOLD:
+        rng = _numpy_rng(rng)
+        data = numpy.frombuffer(buffer, dtype=numpy.uint8)
+        positions = rng.integers(0, buf_len, size=num_writes)
+        # Read all old bytes before writing, so duplicate positions
+        # record the original value.
+        undo_log = list(zip(positions.tolist(), data[positions].tolist()))
+        data[positions] = rng.integers(0, 256, size=num_writes,
+                                       dtype=numpy.uint8)
+        return undo_log
+    rng = _python_rng(rng)
+    undo_log = []
+    for _ in range(num_writes):
+        random_byte = rng.randrange(256)
+        random_position = rng.randrange(buf_len)
+        undo_log.append((random_position, buffer[random_position]))
+        buffer[random_position] = random_byte
+    return undo_log
+
+
+def revert_fuzz(buffer, undo_log):
+    """Undo the modifications done by fuzz_in_place().
+
+    :param buffer: the fuzzed data.
+    :type buffer: byte array
+    :param undo_log: undo log returned by fuzz_in_place().
+    :type undo_log: [(int, int)]
+    """
+    for position, old_byte in reversed(undo_log):
+        buffer[position] = old_byte
+
+
+def number_of_bytes_to_modify(buf_len, fuzz_factor, rng=None):
     """Calculate number of bytes to modify.
 
     :param buf_len: len of data buffer to fuzz.
     :param fuzz_factor: degree of fuzzing.
+    :param rng: random generator; the random module if None.
     :return: number of bytes to change.
     """
-    return random.randrange(math.ceil((float(buf_len) / fuzz_factor))) + 1
+    rng = _python_rng(rng)
+    return rng.randrange(math.ceil((float(buf_len) / fuzz_factor))) + 1
 
 
 @enum.unique
 class Status(enum.Enum):
-    """Status values for test runs."""
+    """Status values for test runs.
+
+    FAILED: exited with an error code.
+    SUCCESS: exited with code 0, or still running at its timeout.
+    TIMEOUT: exceeded its wall clock or CPU time limit.
+    HANG: exceeded its wall clock limit without using the CPU.
+    OOM: ran out of memory.
+    SIGNAL: terminated by a signal, e.g. a segmentation fault.
+
+    The values are consecutive, starting at 0. TestStatCounter uses
+    them as column index.
+    """
 
     FAILED = 0
     SUCCESS = 1
+    TIMEOUT = 2
+    HANG = 3
+    OOM = 4
+    SIGNAL = 5
+
+
+class RunResult():
+    """Outcome of a single test run."""
+
+    def __init__(self, app, status, returncode=None, duration=0.0,
+                 error=None, rusage=None, stdout=None, stderr=None):
+        """Take outcome of the run.
+
+        :param app: application under test.
+        :type app: str
+        :param status: status of the test run.
+        :type status: Status
+        :param returncode: return code of the process; negative values
+                           denote the signal terminating the process.
+                           None if it was still running.
+        :type returncode: int
+        :param duration: wall clock time of the run in seconds.
+        :type duration: float
+        :param error: traceback of an exception raised by a callable.
+        :type error: str
+        :param rusage: resource usage of the process, if known.
+        :type rusage: resource.struct_rusage
+        :param stdout: tail of the standard output, if captured.
+        :type stdout: bytes
+        :param stderr: tail of the standard error, if captured.
+        :type stderr: bytes
+        """
+        self.app = app
+        self.status = status
+        self.returncode = returncode
+        self.duration = duration
+        self.error = error
+        self.rusage = rusage
+        self.stdout = stdout
+        self.stderr = stderr
+        # Digest of the input in the crash store, if it was saved.
+        self.crash = None
+        # Signature of a failure, see fuzzing.buckets.
+        self.bucket = None
+        # Number of edges first reached by the run, if coverage is measured.
+        self.new_edges = None
+        # Indices of the edges reached, if FuzzExecutor.keep_edges is set.
+        self.edges = None
+
+    @property
+    def exit_code(self):
+        """Retrieve exit code of the process.
+
+        :return: exit code or None if process did not exit normally.
+        :rtype: int
+        """
+        if self.returncode is None or self.returncode < 0:
+            return None
+        return self.returncode
+
+    @property
+    def signal(self):
+        """Retrieve number of signal terminating the process.
+
+        :return: signal number or None if process was not signaled.
+        :rtype: int
+        """
+        if self.returncode is None or self.returncode >= 0:
+            return None
+        return -self.returncode
+
+    @property
+    def timed_out(self):
+        """Check if the process was still running at its timeout.
+
+        :return: True if the process was still running.
+        :rtype: bool
+        """
+        return self.returncode is None
+
+    def __repr__(self):
+        """Create printable representation.
+
+        :return: printable result.
+        :rtype: str
+        """
+        tmpl = 'RunResult({}, {}, returncode={}, duration={:.3f})'
+        return tmpl.format(app_name(self.app), self.status.name,
+                           self.returncode, self.duration)
+
+
+def app_id(app):
+    """Provide a unique name of an application.
+
+    Unlike app_name(), applications of same base name are told apart.
+
+    :param app: application; path, callable spec or callable.
+    :return: path of application or module and name of callable.
+    :rtype: str
+    """
+    if callable(app):
+        return '{}:{}'.format(getattr(app, '__module__', None),
+                              getattr(app, '__qualname__', repr(app)))
+    return app
+
+
+def app_name(app):
+    """Provide the name of an application used in statistics.
+
+    :param app: application; path, callable spec or callable.
+    :return: name of application.
+    :rtype: str
+    """
+    if callable(app):
+        return getattr(app, '__qualname__', repr(app))
+    return os.path.basename(app)
+
+
+def wait_for_exit(process, timeout, input_data=None, outputs=None):
+    """Wait until process exits or timeout expires.
+
+    Wakes up as soon as the process exits. On Linux a pidfd is
+    watched, elsewhere the process is polled.
+
+    If input_data is given, it is written to the standard input of the
+    process while waiting. The standard input is closed afterwards.
+
+    If outputs are given, the pipes are read while waiting, so the process
+    does not block on a full pipe. Their data is kept in the tail buffers.
+
+    The process is reaped with reap(), so its resource usage is known.
+
+    :param process: the process to wait for.
+    :type process: subprocess.Popen
+    :param timeout: maximum time to wait in seconds.
+    :type timeout: float
+    :param input_data: data for the standard input of process.
+    :type input_data: bytes-like object
+    :param outputs: tail buffers keyed by the output pipes of process.
+    :type outputs: dict
+    :return: resource usage if the process exited, else None.
+    :rtype: resource.struct_rusage
+    """
+    deadline = time.monotonic() + timeout
+    pidfd = _pidfd_open(process.pid)
+    pending = None
+    with selectors.DefaultSelector() as selector:
+        if pidfd is not None:
+            selector.register(pidfd, selectors.EVENT_READ)
+        for pipe in outputs or ():
+            os.set_blocking(pipe.fileno(), False)
+            selector.register(pipe, selectors.EVENT_READ)
+        if input_data is not None:
+            pending = memoryview(input_data)
+            os.set_blocking(process.stdin.fileno(), False)
+            selector.register(process.stdin, selectors.EVENT_WRITE)
+        try:
+            while True:
+                rusage = reap(process)
+                if rusage is not None:
+                    return rusage
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                if pidfd is None:
+                    remaining = min(remaining, POLL_INTERVAL)
+                for key, _ in selector.select(remaining):
+                    if outputs and key.fileobj in outputs:
+                        if not drain(key.fd, outputs[key.fileobj]):
+                            selector.unregister(key.fileobj)
+                        continue
+                    if key.fileobj is not process.stdin:
+                        continue
+                    pending = _feed(process.stdin, pending)
+                    if not pending:
+                        selector.unregister(process.stdin)
+                        process.stdin.close()
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+            if pending is not None:
+                pending.release()
+            if process.stdin is not None and not process.stdin.closed:
+                process.stdin.close()
+
+
+def reap(process, block=False):
+    """Collect exit status and resource usage of process.
+
+    The return code is stored in process, as Popen.poll() would do.
+
+    :param process: the process to reap.
+    :type process: subprocess.Popen
+    :param block: wait for the process to exit.
+    :type block: bool
+    :return: resource usage or None if the process is still running.
+    :rtype: resource.struct_rusage
+    """
+    assert process.returncode is None, 'ENSURE: process is not reaped.'
+    pid, wait_status, rusage = os.wait4(process.pid,
+                                        0 if block else os.WNOHANG)
+    if pid == 0:
+        return None
+    process.returncode = returncode_from_status(wait_status)
+    return rusage
+
+
+def terminate(process, grace_period=TERMINATE_GRACE_PERIOD):
+    """Terminate process and reap it.
+
+    The process is killed if it does not exit within grace_period
+    after SIGTERM.
+
+    :param process: the process to terminate.
+    :type process: subprocess.Popen
+    :param grace_period: seconds to wait before killing the process.
+    :type grace_period: float
+    :return: resource usage of the process.
+    :rtype: resource.struct_rusage
+    """
+    # Popen.terminate() polls the process first, which would reap it
+    # and lose its resource usage.
+    os.kill(process.pid, signal.SIGTERM)
+    rusage = wait_for_exit(process, grace_period)
+    if rusage is None:
+        os.kill(process.pid, signal.SIGKILL)
+        rusage = reap(process, block=True)
+    return rusage
+
+
+def resource_limiter(cpu_limit=None, memory_limit=None):
+    """Create a function applying resource limits in a child process.
+
+    Pass it as preexec_fn to Popen. A process exceeding cpu_limit is
+    terminated with SIGXCPU. Allocations beyond memory_limit fail.
+
+    :param cpu_limit: CPU time limit in seconds.
+    :type cpu_limit: float
+    :param memory_limit: limit of the address space in bytes.
+    :type memory_limit: int
+    :return: function setting the limits or None without limits.
+    """
+    if cpu_limit is None and memory_limit is None:
+        return None
+
+    def limit_resources():
+        """Apply the limits to the calling process."""
+        if cpu_limit is not None:
+            limit_cpu(cpu_limit)
+        if memory_limit is not None:
+            resource.setrlimit(resource.RLIMIT_AS,
+                               (memory_limit, memory_limit))
+    return limit_resources
+
+
+def _feed(pipe, pending):
+    """Write as much of pending to pipe as possible without blocking.
+
+    :param pipe: non-blocking pipe to write to.
+    :param pending: data still to write.
+    :type pending: memoryview
+    :return: data still to write; None if the reader is gone.
+    :rtype: memoryview
+    """
+    try:
+        written = os.write(pipe.fileno(), pending)
+    except BlockingIOError:
+        return pending
+    except BrokenPipeError:
+        return None
+    return pending[written:]
+
+
+def collect_output(outputs):
+    """Read the remaining output of a finished process and close the pipes.
+
+    :param outputs: tail buffers keyed by the output pipes of a process.
+    :type outputs: dict
+    """
+    for pipe, tail in outputs.items():
+        drain(pipe.fileno(), tail)
+        pipe.close()
+
+
+def _pidfd_open(pid):
+    """Open a file descriptor referring to given process.
+
+    :param pid: process id.
+    :type pid: int
+    :return: file descriptor or None if not supported.
+    :rtype: int
+    """
+    if not hasattr(os, 'pidfd_open'):
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError:
+        return None
 
 
 class TestStatCounter():
-    """Hold a set of test results."""
+    """Hold a set of test results.
+
+    The counts form a matrix with a row per key and a column per status,
+    stored row by row in a flat array. Totals per status are kept up to
+    date with each result, so reading them does not depend on the
+    number of keys.
+
+    Attribute usage holds the histograms of the resource usage per key,
+    attribute runs counts the runs by application, seed file, mutator
+    and status, attribute buckets groups the failures by signature.
+    """
+
+    __slots__ = ('keys_', 'rows_', 'counts_', 'totals_', 'usage', 'runs',
+                 'buckets')
 
     def __init__(self, keys):
         """Prepare instance for test setup.
@@ -123,10 +693,15 @@ class TestStatCounter():
         :param keys: set of keys_.
         :type keys: [str]
         """
-        self.keys_ = set(keys)
-        self.stats_ = {}
+        self.keys_ = []
+        self.rows_ = {}
+        self.counts_ = array('q')
+        self.totals_ = array('q', [0]) * len(Status)
+        self.usage = UsageStats()
+        self.runs = MultiStatCounter()
+        self.buckets = CrashBuckets()
         for key in keys:
-            self.stats_[key] = Counter()
+            self._row(key)
 
     @property
     def keys(self):
@@ -135,7 +710,7 @@ class TestStatCounter():
         :return: set of keys.
         :rtype: set(str)
         """
-        return deepcopy(self.keys_)
+        return set(self.keys_)
 
     def add(self, key, status):
         """Add a new test result to the statistics.
@@ -145,15 +720,19 @@ class TestStatCounter():
         :param status: status of the test run.
         :type status: Status
         """
-        assert key in self.keys_, 'ENSURE: key is valid.'
-        self.stats_[key][status] += 1
+        row = self.rows_.get(key)
+        assert row is not None, 'ENSURE: key is valid.'
+        # _value_ avoids the slower lookup of the value property.
+        column = status._value_
+        self.counts_[row + column] += 1
+        self.totals_[column] += 1
 
     def cumulated_counts(self):
         """Return sum over all counters.
 
         :return: The number of test runs; failed and successful.
         """
-        return sum([sum(v.values()) for v in self.stats_.values()])
+        return sum(self.totals_)
 
     def cumulated_counts_for_status(self, status):
         """Return sum over all counters for given status.
@@ -162,7 +741,7 @@ class TestStatCounter():
         :type status: Status
         :return: number of tests resulting in status.
         """
-        return sum([v[status] for v in self.stats_.values()])
+        return self.totals_[status.value]
 
     def retrieve_count(self, key, status):
         """Return count of key / status pair.
@@ -173,9 +752,9 @@ class TestStatCounter():
         :type status: Status
         :return: count
         """
-        assert key in self.keys_, 'ENSURE: key is valid.'
+        assert key in self.rows_, 'ENSURE: key is valid.'
         assert status in Status, 'ENSURE: status is valid.'
-        return self.stats_[key][status]
+        return self.counts_[self.rows_[key] + status.value]
 
     def __add__(self, other):
         """Merge test statistics.
@@ -187,63 +766,240 @@ class TestStatCounter():
         :return: the merged statistics.
         :rtype: TestStatCounter
         """
-        combined_keys = self.keys_.union(other.keys_)
-        tsc = TestStatCounter(combined_keys)
-        for key in self.stats_:
-            tsc.stats_[key].update(self.stats_[key])
-        for key in other.stats_:
-            tsc.stats_[key].update(other.stats_[key])
+        tsc = TestStatCounter(())
+        tsc.keys_ = list(self.keys_)
+        tsc.rows_ = dict(self.rows_)
+        tsc.counts_ = array('q', self.counts_)
+        tsc.totals_ = array('q', self.totals_)
+        tsc.usage += self.usage
+        tsc.runs += self.runs
+        tsc.buckets += self.buckets
+        tsc += other
         return tsc
 
+    def __iadd__(self, other):
+        """Merge other test statistics into these.
+
+        If both have the same keys in the same order, the count
+        matrices are added element by element in one go.
+
+        :param other: test statistics to merge.
+        :type other: TestStatCounter
+        :return: the merged statistics.
+        :rtype: TestStatCounter
+        """
+        if other.keys_ == self.keys_:
+            self.counts_ = array('q', map(operator.add, self.counts_,
+                                          other.counts_))
+        else:
+            width = len(Status)
+            for key, other_row in other.rows_.items():
+                row = self._row(key)
+                for column in range(width):
+                    self.counts_[row + column] += \
+                        other.counts_[other_row + column]
+        self.totals_ = array('q', map(operator.add, self.totals_,
+                                      other.totals_))
+        self.usage += other.usage
+        self.runs += other.runs
+        self.buckets += other.buckets
+        return self
+
+    def _row(self, key):
+        """Retrieve the offset of the row of key, adding it if missing.
+
+        :param key: key of test runs.
+        :type key: str
+        :return: offset of the first count of key in counts_.
+        :rtype: int
+        """
+        row = self.rows_.get(key)
+        if row is None:
+            row = self.rows_[key] = len(self.counts_)
+            self.keys_.append(key)
+            self.counts_.extend(array('q', [0]) * len(Status))
+        return row
+
     def __repr__(self):
         """Create printable representation.
 
         :return: printable statistics.
         :rtype: str
         """
-        count_failed = self.cumulated_counts_for_status(Status.FAILED)
+        count_all = self.cumulated_counts()
         count_succeeded = self.cumulated_counts_for_status(Status.SUCCESS)
-        count_all = count_succeeded + count_failed
+        count_failed = count_all - count_succeeded
         tmpl = 'Tests run/succeeded/failed: {} / {} / {}\n'
         info = tmpl.format(count_all, count_succeeded, count_failed)
         for key in self.keys_:
             info += '{}\n'.format(key)
             for status in Status:
                 count = self.retrieve_count(key, status)
-                info += '\t{}: {}\n'.format(status.name, count)
+                # Statuses other than FAILED and SUCCESS only if they occur.
+                if count or status in (Status.FAILED, Status.SUCCESS):
+                    info += '\t{}: {}\n'.format(status.name, count)
         return info
 
 
 class FuzzExecutor():
     """Run fuzz tests on applications."""
 
-    def __init__(self, app_list, file_list):
+    def __init__(self, app_list, file_list, delivery='file', rng=None):
         """Take apps under test and test data.
 
+        Applications are executables or Python callables. Callables are
+        given directly or as spec 'callable:package.module:function'.
+        They are called with the fuzzed data as bytes.
+
+        All random decisions are drawn from rng. Executors running in
+        parallel should be given different streams of fuzzing.rng, so
+        they do not repeat each other's work.
+
         :param app_list: list of applications.
         :param file_list: list of files for testing.
+        :param delivery: backend providing the input files; a name of
+                         fuzzing.delivery.DELIVERIES or a Delivery.
+        :type delivery: str or Delivery
+        :param rng: random generator; a new stream with a fresh master
+                    seed if None.
+        :type rng: random.Random
         """
         self.logger = logging.getLogger('fuzzing.fuzzer.FuzzExecutor')
         self.logger.info('Initializing FuzzExecutor ...')
-        self.apps, self.args = FuzzExecutor.__parse_app_list(app_list)
+        if rng is None:
+            rng = make_rng()
+        self.rng = rng
+        if isinstance(rng, FuzzRandom):
+            self.logger.info('Random seed: %d, stream: %d',
+                             rng.master_seed, rng.stream)
+        self.apps, self.args, self.options = \
+            FuzzExecutor.__parse_app_list(app_list)
         self.file_list = file_list
         self.fuzz_factor = 251
-        keys = [os.path.basename(app) for app in self.apps]
+        # Seconds to wait for an application to exit. May be overridden
+        # per application with option timeout.
+        self.timeout = 1.0
+        self._fork_servers = {}
+        self._bitmaps = {}
+        self._callables = {app: load_callable(app) for app in self.apps
+                           if is_callable_spec(app)}
+        self._workers = {}
+        # Variants are fuzzed in batches of up to batch_size, limited
+        # by the memory a single batch may occupy.
+        self.batch_size = 16
+        self.batch_arena_size = 64 * 1024 * 1024
+        # Bytes the arenas of all partly used batches may occupy. The
+        # least recently used batches are dropped beyond.
+        self.batch_budget = 64 * 1024 * 1024
+        self._batches = OrderedDict()
+        self._batch_bytes = 0
+        self.seed_cache = SeedCache()
+        if isinstance(delivery, str):
+            delivery = create_delivery(delivery)
+        self.delivery = delivery
+        self._pipe_delivery = PipeDelivery()
+        self.__check_options()
+        keys = [app_name(app) for app in self.apps]
         self.stats_ = TestStatCounter(keys)
+        # Callables taking the RunResult of each run.
+        self.listeners = []
+        # CrashStore keeping the inputs of failed runs, if any.
+        self.crash_store = None
+        # Edges seen by applications with option coverage=true, and the
+        # inputs reaching new ones. The corpus is fuzzed like the seeds.
+        self.coverage = CoverageMap()
+        self.corpus = Corpus()
+        # Attach the edges reached to the RunResult of each run with
+        # coverage, see fuzzing.corpus.
+        self.keep_edges = False
+        self._tracer = None
+        # Havoc stacking the mutations of fuzzing.mutators; if None, the
+        # seeds are fuzzed by replacing bytes as fuzzer() does.
+        self.havoc = None
+
+    def __enter__(self):
+        """Enter context; the executor is closed on exit.
+
+        :return: this executor.
+        :rtype: FuzzExecutor
+        """
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close executor when leaving the context."""
+        self.close()
+
+    def close(self):
+        """Release resources like running fork servers and input files."""
+        for fork_server in self._fork_servers.values():
+            fork_server.stop()
+        self._fork_servers.clear()
+        for bitmap in self._bitmaps.values():
+            bitmap.close()
+        self._bitmaps.clear()
+        for worker in self._workers.values():
+            worker.stop()
+        self._workers.clear()
+        self.delivery.close()
 
-    def run_test(self, runs):
+    def run_test(self, runs, deadline=None):
         """Run tests and build up statistics.
 
         :param runs: number of tests to run.
+        :param deadline: time.monotonic() value after which no further
+                         tests are started.
+        :type deadline: float
         """
         self.logger.info('Start fuzzing ...')
         for _ in range(runs):
-            app = random.choice(self.apps)
-            data_file = random.choice(self.file_list)
-            fuzzed_file = self._fuzz_data_file(data_file)
-            self._execute(app, fuzzed_file)
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            app = self.rng.choice(self.apps)
+            data_file = self._choose_seed()
+            if app in self._callables:
+                self._execute_callable(app, data_file)
+            else:
+                with self._deliver(app, data_file) as slot:
+                    self._execute(app, slot)
         self.logger.info('Fuzzing completed.')
 
+    def _choose_seed(self):
+        """Pick the seed of the next run.
+
+        Seed files and corpus entries are equally likely.
+
+        :return: path of a seed file or name of a corpus entry.
+        :rtype: str
+        """
+        if not self.corpus:
+            return self.rng.choice(self.file_list)
+        index = self.rng.randrange(len(self.file_list) + len(self.corpus))
+        if index < len(self.file_list):
+            return self.file_list[index]
+        return self.corpus.name(index - len(self.file_list))
+
+    def run_input(self, app_, data):
+        """Run app once with given input, without fuzzing it.
+
+        The run is recorded like the runs of run_test(), e.g. to check
+        if an input still fails.
+
+        :param app_: one of the applications of the executor.
+        :param data: input of the run.
+        :type data: bytes-like object
+        :return: result of the run.
+        :rtype: RunResult
+        """
+        assert app_ in self.options, 'ENSURE: app is known.'
+        if app_ in self._callables:
+            return self._call(app_, bytes(data))
+        delivery = self._delivery(app_)
+        slot = delivery.acquire(data)
+        try:
+            return self._execute(app_, slot)
+        finally:
+            delivery.release(slot)
+
     @property
     def stats(self):
         """Retrieve statistics of last run.
@@ -253,57 +1009,703 @@ class FuzzExecutor():
         """
         return self.stats_
 
-    def _fuzz_data_file(self, data_file):
-        """Generate fuzzed variant of given file.
+    def reset_stats(self):
+        """Start new statistics, e.g. before running the next chunk of tests.
+
+        :return: statistics collected so far.
+        :rtype: TestStatCounter
+        """
+        stats = self.stats_
+        self.stats_ = TestStatCounter(stats.keys)
+        return stats
+
+    def reseed(self, rng):
+        """Continue fuzzing with given random generator.
+
+        Variants fuzzed in advance are dropped, so all further inputs
+        depend on rng only.
+
+        :param rng: random generator.
+        :type rng: random.Random
+        """
+        self.rng = rng
+        self._batches.clear()
+        self._batch_bytes = 0
+
+    @property
+    def mutator(self):
+        """Retrieve the name of the mutation applied to the seeds.
+
+        With havoc each input is named by its stack of mutations instead.
+
+        :return: name of mutator and fuzz factor.
+        :rtype: str
+        """
+        return '{}/{}'.format(MUTATOR_NAME, self.fuzz_factor)
+
+    @property
+    def cache_hits(self):
+        """Retrieve number of seeds served from the seed cache.
+
+        :return: number of cache hits.
+        :rtype: int
+        """
+        return self.seed_cache.hits
+
+    @property
+    def cache_misses(self):
+        """Retrieve number of seeds loaded from disk.
 
+        :return: number of cache misses.
+        :rtype: int
+        """
+        return self.seed_cache.misses
+
+    @contextmanager
+    def _deliver(self, app_, data_file):
+        """Provide fuzzed variant of given file as input for app.
+
+        :param app_: application to provide input for.
         :param data_file: path to file to fuzz.
         :type data_file: str
-        :return: path to fuzzed file.
+        :return: input slot holding the fuzzed data.
+        :rtype: InputSlot
+        """
+        slot = self._acquire_input(app_, data_file)
+        try:
+            yield slot
+        finally:
+            self._delivery(app_).release(slot)
+
+    def _acquire_input(self, app_, data_file):
+        """Fuzz given file and hand it to the delivery backend of app.
+
+        The slot must be released with the delivery backend.
+
+        :param app_: application to provide input for.
+        :param data_file: path to file to fuzz.
+        :type data_file: str
+        :return: input slot holding the fuzzed data.
+        :rtype: InputSlot
+        """
+        delivery = self._delivery(app_)
+        with self._fuzzed_buffer(data_file, delivery.persistent) as \
+                (fuzzed, mutator):
+            slot = delivery.acquire(fuzzed)
+        slot.seed = data_file
+        slot.mutator = mutator
+        return slot
+
+    def _delivery(self, app_):
+        """Retrieve the delivery backend of app.
+
+        :param app_: application.
+        :return: delivery backend.
+        :rtype: Delivery
+        """
+        if self._input_mode(app_) == 'stdin':
+            return self._pipe_delivery
+        return self.delivery
+
+    def _input_mode(self, app_):
+        """Retrieve the way app gets its input.
+
+        :param app_: application.
+        :return: one of INPUT_MODES.
         :rtype: str
         """
-        buf = bytearray(open(os.path.abspath(data_file), 'rb').read())
-        fuzzed = fuzzer(buf, self.fuzz_factor)
+        return self.options[app_].get('input', 'file')
+
+    @contextmanager
+    def _fuzzed_buffer(self, data_file, persistent):
+        """Provide a fuzzed variant of given file.
+
+        If the variant is not required to persist, the cached seed is
+        fuzzed in place and reverted when leaving the context.
+        Otherwise the variant is taken from a batch. With havoc, a copy
+        of the seed is mutated in place by a stack of mutations.
+
+        :param data_file: path to file to fuzz.
+        :type data_file: str
+        :param persistent: True if the variant must outlive the context.
+        :type persistent: bool
+        :return: fuzzed variant and name of the mutation.
+        :rtype: (byte array or memoryview, str)
+        """
+        if self.havoc is not None:
+            fuzzed = bytearray(self._seed(data_file))
+            mutator = self.havoc.mutate(fuzzed, self.rng, self._donor)
+            yield fuzzed, mutator
+            return
+        if persistent:
+            yield self._next_variant(data_file), self.mutator
+            return
+        seed = self._seed(data_file)
+        undo_log = fuzz_in_place(seed, self.fuzz_factor, self.rng)
         try:
-            _, fuzz_output = mkstemp(prefix='fuzzed_')
-            open(fuzz_output, 'wb').write(fuzzed)
+            yield seed, self.mutator
         finally:
-            pass
-        return fuzz_output
+            revert_fuzz(seed, undo_log)
+
+    def _donor(self):
+        """Pick a seed to splice with.
 
-    def _execute(self, app_, file_):
+        :return: content of a seed file or corpus entry.
+        :rtype: bytearray or mmap
+        """
+        return self._seed(self._choose_seed())
+
+    def _seed(self, data_file):
+        """Retrieve content of given seed file or corpus entry.
+
+        :param data_file: path to seed file or name of corpus entry.
+        :type data_file: str
+        :return: content of seed.
+        :rtype: bytearray or mmap
+        """
+        if data_file in self.corpus:
+            return self.corpus[data_file]
+        return self.seed_cache.get(data_file)
+
+    def _next_variant(self, data_file):
+        """Take the next fuzzed variant of given file from its batch.
+
+        A new batch is fuzzed when the previous one is used up or was
+        dropped to keep the batches within batch_budget.
+
+        :param data_file: path to file to fuzz.
+        :type data_file: str
+        :return: fuzzed variant.
+        :rtype: memoryview
+        """
+        entry = self._batches.get(data_file)
+        if entry is None:
+            seed = self._seed(data_file)
+            count = self.batch_arena_size // max(len(seed), 1)
+            count = max(1, min(self.batch_size, count))
+            batch = fuzz_batch(seed, count, self.fuzz_factor, self.rng)
+            batch.reverse()
+            entry = (batch, count * len(seed))
+            self._batches[data_file] = entry
+            self._batch_bytes += entry[1]
+            self._evict_batches()
+        else:
+            self._batches.move_to_end(data_file)
+        batch, size = entry
+        variant = batch.pop()
+        if not batch:
+            del self._batches[data_file]
+            self._batch_bytes -= size
+        return variant
+
+    def _evict_batches(self):
+        """Drop least recently used batches exceeding batch_budget.
+
+        The most recently used batch is kept, even if it exceeds the
+        budget on its own.
+        """
+        while self._batch_bytes > self.batch_budget and \
+                len(self._batches) > 1:
+            _, (_, size) = self._batches.popitem(last=False)
+            self._batch_bytes -= size
+
+    def _execute(self, app_, slot):
         """Run app with file as input.
 
+        The application succeeds if it exits with code 0 or is still
+        running when its timeout expires, unless option wall_limit is
+        given. A process still running is terminated, killed if needed,
+        and reaped. With option output=capture the tails of its output are
+        attached to the result of a failed run.
+
+        :param app_: application to run.
+        :param slot: input to run app with.
+        :type slot: InputSlot
+        :return: result of the run.
+        :rtype: RunResult
+        """
+        if self.options[app_].get('mode') == 'forkserver':
+            return self._execute_fork_server(app_, slot)
+        start = time.monotonic()
+        stdin = None if slot.data is None else subprocess.PIPE
+        output = self._output_target(app_)
+        process = subprocess.Popen(self._command(app_, slot.path),
+                                   stdin=stdin, stdout=output, stderr=output,
+                                   pass_fds=slot.pass_fds,
+                                   preexec_fn=self._limiter(app_))
+        outputs = None
+        if output == subprocess.PIPE:
+            outputs = {process.stdout: self._tail(app_),
+                       process.stderr: self._tail(app_)}
+
+        rusage = wait_for_exit(process, self._timeout(app_), slot.data,
+                               outputs)
+        duration = time.monotonic() - start
+        returncode = process.returncode
+        if rusage is None:
+            # process did not crash, so just terminate it
+            rusage = terminate(process)
+            returncode = None
+        if outputs is not None:
+            collect_output(outputs)
+            outputs = (outputs[process.stdout], outputs[process.stderr])
+        return self._record(app_, returncode, duration, rusage=rusage,
+                            seed=slot.seed, mutator=slot.mutator,
+                            output=outputs, slot=slot)
+
+    def _execute_callable(self, app_, data_file):
+        """Call app with fuzzed variant of data_file.
+
+        An uncaught exception is a failure. With option isolate=true the
+        callable runs in a worker process, which is replaced after
+        recycle runs (option recycle). With option coverage=true the
+        lines executed are traced.
+
+        :param app_: callable or callable spec to run.
+        :param data_file: path to file to fuzz.
+        :return: result of the run.
+        :rtype: RunResult
+        """
+        with self._fuzzed_buffer(data_file, persistent=False) as \
+                (fuzzed, mutator):
+            data = bytes(fuzzed)
+        return self._call(app_, data, data_file, mutator)
+
+    def _call(self, app_, data, seed=None, mutator=None):
+        """Call app with data.
+
+        :param app_: callable or callable spec to run.
+        :param data: input of the callable.
+        :type data: bytes
+        :param seed: seed file the input was derived from.
+        :param mutator: name of the mutation applied to the seed.
+        :return: result of the run.
+        :rtype: RunResult
+        """
+        coverage = self._coverage_enabled(app_)
+        bitmap = None
+        start = time.monotonic()
+        if self.options[app_].get('isolate', 'false').lower() == 'true':
+            worker = self._workers.get(app_)
+            if worker is None:
+                recycle = int(self.options[app_].get('recycle',
+                                                     DEFAULT_RECYCLE))
+                worker = IsolatedWorker(self._callables[app_], recycle,
+                                        coverage)
+                self._workers[app_] = worker
+            returncode, error = worker.run(data, self._timeout(app_))
+            bitmap = worker.bitmap
+        elif coverage:
+            if self._tracer is None:
+                self._tracer = CoverageTracer()
+            self._tracer.reset()
+            with self._tracer:
+                error = call_target(self._callables[app_], data)
+            returncode = 0 if error is None else 1
+            bitmap = self._tracer.bitmap
+        else:
+            error = call_target(self._callables[app_], data)
+            returncode = 0 if error is None else 1
+        return self._record(app_, returncode, time.monotonic() - start,
+                            error, seed=seed, mutator=mutator,
+                            slot=InputSlot(None, None, data=data),
+                            bitmap=bitmap)
+
+    def _execute_fork_server(self, app_, slot):
+        """Run input through the fork server of app.
+
+        The fork server is started on first use. If it dies, the run
+        fails and the server is restarted with the next run.
+
+        :param app_: application to run.
+        :param slot: input to run app with.
+        :type slot: InputSlot
+        :return: result of the run.
+        :rtype: RunResult
+        """
+        start = time.monotonic()
+        returncode = self._run_fork_server(app_, slot.shared_path)
+        return self._record(app_, returncode, time.monotonic() - start,
+                            seed=slot.seed, mutator=slot.mutator, slot=slot,
+                            bitmap=self._fork_server_bitmap(app_))
+
+    def _run_fork_server(self, app_, file_):
+        """Run file through the fork server of app.
+
+        With option coverage=true the children of the fork server record
+        their coverage into a bitmap shared with the executor.
+
         :param app_: application to run.
         :param file_: file to run app with.
-        :return: success True, else False
+        :return: return code or None if app was running at timeout.
+        :rtype: int
+        """
+        fork_server = self._fork_servers.get(app_)
+        if fork_server is None:
+            command = [app_]
+            command.extend(self.args[app_])
+            env = {}
+            if self._coverage_enabled(app_):
+                if app_ not in self._bitmaps:
+                    self._bitmaps[app_] = SharedBitmap()
+                env[ENV_COVERAGE] = self._bitmaps[app_].path
+            cpu_limit = self._limit(app_, 'cpu_limit')
+            if cpu_limit is not None:
+                # Each child is limited, else the fork server would run
+                # out of CPU time over many runs.
+                env[ENV_CPU_LIMIT] = str(cpu_limit)
+            # Children of the fork server inherit its memory limit.
+            fork_server = ForkServer(command,
+                                     self._limiter(app_, cpu=False), env)
+            self._fork_servers[app_] = fork_server
+        if app_ in self._bitmaps:
+            self._bitmaps[app_].reset()
+        try:
+            return fork_server.run(file_, self._timeout(app_))
+        except ForkServerError as err:
+            self.logger.error('%s', err.info)
+            # count as failed run
+            return 1
+
+    def _fork_server_bitmap(self, app_):
+        """Retrieve the coverage of the last run of a fork server.
+
+        :param app_: application run.
+        :return: bitmap or None without coverage.
+        :rtype: mmap.mmap
+        """
+        bitmap = self._bitmaps.get(app_)
+        return None if bitmap is None else bitmap.buffer
+
+    def _coverage_enabled(self, app_):
+        """Check if the coverage of given application is measured.
+
+        :param app_: application.
+        :return: True with option coverage=true.
         :rtype: bool
         """
-        app_name = os.path.basename(app_)
+        return self.options[app_].get('coverage', 'false').lower() == 'true'
+
+    def _command(self, app_, file_):
+        """Build command line to run app with file.
+
+        Depending on the input mode of app the file is appended, replaces
+        the placeholder or is not passed at all.
+
+        :param app_: application to run.
+        :param file_: file to run app with.
+        :return: command line.
+        :rtype: [str]
+        """
         args = [app_]
+        input_mode = self._input_mode(app_)
+        if input_mode == 'argv':
+            args.extend([file_ if arg == INPUT_PLACEHOLDER else arg
+                         for arg in self.args[app_]])
+            return args
         args.extend(self.args[app_])
-        args.append(file_)
-        process = subprocess.Popen(args)
-
-        time.sleep(1)
-        status = {True: Status.SUCCESS, False: Status.FAILED}
-        crashed = process.poll()
-        result = status[crashed is None]
-        self.stats_.add(app_name, result)
-        if result is Status.SUCCESS:
-            # process did not crash, so just terminate it
-            process.terminate()
+        if input_mode == 'file':
+            args.append(file_)
+        return args
+
+    def _record(self, app_, returncode, duration, error=None, rusage=None,
+                seed=None, mutator=None, output=None, slot=None,
+                bitmap=None):
+        """Evaluate the outcome of a run and add it to the statistics.
+
+        Captured output is only kept for failed runs. Failed runs are
+        grouped by signature and their inputs are saved to the crash
+        store, if there is one. Inputs reaching new edges are added to
+        the corpus.
+
+        :param app_: application run.
+        :param returncode: return code of the process or None if it was
+                           still running at timeout.
+        :param duration: wall clock time of the run in seconds.
+        :param error: traceback of an exception raised by a callable.
+        :param rusage: resource usage of the process, if known.
+        :param seed: seed file the input was derived from.
+        :param mutator: name of the mutation applied to the seed.
+        :param output: tails of standard output and error, if captured.
+        :type output: (TailBuffer, TailBuffer)
+        :param slot: input of the run.
+        :type slot: InputSlot
+        :param bitmap: coverage of the run, if measured.
+        :type bitmap: bytes-like object
+        :return: result of the run.
+        :rtype: RunResult
+        """
+        status = self._status(app_, returncode, duration, rusage)
+        result = RunResult(app_, status, returncode, duration, error, rusage)
+        if bitmap is not None:
+            result.new_edges = self.coverage.update(bitmap)
+            if self.keep_edges:
+                result.edges = edge_indices(bitmap)
+            if result.new_edges and slot is not None:
+                name = self.corpus.add(slot.read())
+                self.logger.debug('New edges: %d, corpus entry: %s',
+                                  result.new_edges, name)
+        if output is not None and status is not Status.SUCCESS:
+            result.stdout, result.stderr = (tail.getvalue()
+                                            for tail in output)
+            if self._out_of_memory(app_, result):
+                result.status = Status.OOM
+        if status is not Status.SUCCESS:
+            self._classify(app_, result, seed, mutator, slot)
+        self.logger.debug('%s', result)
+        self.stats_.add(app_name(app_), result.status)
+        self.stats_.usage.add(app_name(app_), duration, rusage)
+        self.stats_.runs.add(app_id(app_), seed, mutator, result.status.name)
+        for listener in self.listeners:
+            listener(result)
+        return result
+
+    def _classify(self, app_, result, seed, mutator, slot):
+        """Put a failed run into its bucket and save its input.
+
+        With havoc, a failure of a signature not seen before rewards the
+        mutators of the input.
+
+        :param app_: application run.
+        :param result: result of the run.
+        :type result: RunResult
+        :param seed: seed file the input was derived from.
+        :param mutator: name of the mutation applied to the seed.
+        :param slot: input of the run, if known.
+        :type slot: InputSlot
+        """
+        buckets = self.stats_.buckets
+        result.bucket = buckets.add(app_name(app_), result, seed)
+        if self.havoc is not None:
+            self.havoc.reward(mutator, result.bucket)
+        if self.crash_store is None or slot is None:
+            return
+        result.crash = self.crash_store.save(
+            slot.read(), self._crash_metadata(app_, result, seed, mutator))
+        bucket = buckets[result.bucket]
+        if bucket.crash is None:
+            bucket.crash = result.crash
+
+    def _crash_metadata(self, app_, result, seed, mutator):
+        """Describe a failed run for the crash store.
+
+        Master seed and stream identify the random stream the input was
+        drawn from, e.g. the chunk of run_fuzzer.py.
+
+        :param app_: application run.
+        :param result: result of the run.
+        :type result: RunResult
+        :param seed: seed file the input was derived from.
+        :param mutator: name of the mutation applied to the seed.
+        :return: metadata of the input.
+        :rtype: {}
+        """
+        return {'app': app_id(app_), 'args': self.args[app_],
+                'seed_file': seed, 'mutator': mutator,
+                'rng_seed': getattr(self.rng, 'master_seed', None),
+                'rng_stream': getattr(self.rng, 'stream', None),
+                'status': result.status.name, 'bucket': result.bucket,
+                'returncode': result.returncode,
+                'duration': result.duration, 'time': time.time()}
+
+    def _status(self, app_, returncode, duration, rusage):
+        """Determine the status of a run.
+
+        :param app_: application run.
+        :param returncode: return code of the process or None if it was
+                           still running at timeout.
+        :param duration: wall clock time of the run in seconds.
+        :param rusage: resource usage of the process, if known.
+        :return: status of the run.
+        :rtype: Status
+        """
+        if returncode is None:
+            if self._limit(app_, 'wall_limit') is None:
+                return Status.SUCCESS
+            if rusage is not None and rusage.ru_utime + rusage.ru_stime < \
+                    HANG_CPU_RATIO * duration:
+                return Status.HANG
+            return Status.TIMEOUT
+        if returncode == 0:
+            return Status.SUCCESS
+        if returncode == -signal.SIGXCPU:
+            return Status.TIMEOUT
+        if returncode == -signal.SIGKILL:
+            cpu_limit = self._limit(app_, 'cpu_limit')
+            if cpu_limit is not None and rusage is not None and \
+                    rusage.ru_utime + rusage.ru_stime >= cpu_limit:
+                # Killed at the hard limit after ignoring SIGXCPU.
+                return Status.TIMEOUT
+            # The executor only kills processes it reports as timed out,
+            # so this is most likely the OOM killer.
+            return Status.OOM
+        if returncode < 0:
+            return Status.SIGNAL
+        return Status.FAILED
+
+    def _out_of_memory(self, app_, result):
+        """Check if a failed run could not allocate memory.
+
+        The memory limit caps the address space, so the resident memory
+        of a failing process tells nothing. Instead its captured output
+        is searched for OOM_MARKERS.
+
+        :param app_: application run.
+        :param result: result of a failed run with captured output.
+        :type result: RunResult
+        :return: True if app has a memory limit and ran out of memory.
+        :rtype: bool
+        """
+        if self._limit(app_, 'memory_limit') is None or \
+                result.status not in (Status.FAILED, Status.SIGNAL):
+            return False
+        output = result.stdout + result.stderr
+        return any(marker in output for marker in OOM_MARKERS)
+
+    def _timeout(self, app_):
+        """Retrieve the timeout of given application.
+
+        The wall clock limit takes precedence over the timeout.
+
+        :param app_: application.
+        :return: timeout in seconds.
+        :rtype: float
+        """
+        wall_limit = self._limit(app_, 'wall_limit')
+        if wall_limit is not None:
+            return wall_limit
+        return float(self.options[app_].get('timeout', self.timeout))
+
+    def _output_target(self, app_):
+        """Determine where the output of given application goes.
+
+        :param app_: application.
+        :return: stdout and stderr argument for Popen.
+        """
+        output = self.options[app_].get('output', 'inherit')
+        if output == 'capture':
+            return subprocess.PIPE
+        if output == 'discard':
+            return subprocess.DEVNULL
+        return None
+
+    def _tail(self, app_):
+        """Create buffer for the output of given application.
+
+        :param app_: application.
+        :return: empty buffer of the size given by option tail in KiB.
+        :rtype: TailBuffer
+        """
+        tail = self.options[app_].get('tail')
+        if tail is None:
+            return TailBuffer(DEFAULT_TAIL_SIZE)
+        return TailBuffer(int(tail) * 1024)
+
+    def _limit(self, app_, name):
+        """Retrieve a resource limit of given application.
+
+        :param app_: application.
+        :param name: one of LIMIT_OPTIONS.
+        :type name: str
+        :return: limit or None if not limited.
+        :rtype: float
+        """
+        value = self.options[app_].get(name)
+        return None if value is None else float(value)
+
+    def _limiter(self, app_, cpu=True):
+        """Create function applying the resource limits of app.
+
+        :param app_: application.
+        :param cpu: apply the CPU time limit, too.
+        :type cpu: bool
+        :return: preexec_fn for Popen or None without limits.
+        """
+        memory_limit = self._limit(app_, 'memory_limit')
+        if memory_limit is not None:
+            memory_limit = int(memory_limit * 2 ** 20)
+        cpu_limit = self._limit(app_, 'cpu_limit') if cpu else None
+        return resource_limiter(cpu_limit, memory_limit)
+
+    def __check_options(self):
+        """Check the options of all applications.
+
+        :raise ValueError: if an option is invalid.
+        """
+        for app_ in self.apps:
+            input_mode = self._input_mode(app_)
+            if input_mode not in INPUT_MODES:
+                raise ValueError('Invalid input {} for {}.'.format(
+                    input_mode, app_))
+            if input_mode == 'argv' and \
+                    INPUT_PLACEHOLDER not in self.args[app_]:
+                raise ValueError('Missing {} in arguments of {}.'.format(
+                    INPUT_PLACEHOLDER, app_))
+            if input_mode == 'stdin' and \
+                    self.options[app_].get('mode') == 'forkserver':
+                raise ValueError('Fork server {} reads no stdin.'.format(
+                    app_))
+            output = self.options[app_].get('output', 'inherit')
+            if output not in OUTPUT_MODES:
+                raise ValueError('Invalid output {} for {}.'.format(
+                    output, app_))
+            if output == 'capture' and \
+                    self.options[app_].get('mode') == 'forkserver':
+                raise ValueError('Output of fork server {} is not '
+                                 'captured.'.format(app_))
+            mode = self.options[app_].get('mode')
+            if mode not in (None, 'forkserver'):
+                raise ValueError('Invalid mode {} for {}.'.format(
+                    mode, app_))
+            isolate = self.options[app_].get('isolate', 'false').lower()
+            if isolate not in ('true', 'false'):
+                raise ValueError('Invalid isolate {} for {}.'.format(
+                    isolate, app_))
+            coverage = self.options[app_].get('coverage', 'false').lower()
+            if coverage not in ('true', 'false'):
+                raise ValueError('Invalid coverage {} for {}.'.format(
+                    coverage, app_))
+            if coverage == 'true' and app_ not in self._callables and \
+                    self.options[app_].get('mode') != 'forkserver':
+                raise ValueError('Coverage of {} requires a fork '
+                                 'server.'.format(app_))
+            try:
+                tail = int(self.options[app_].get('tail', 1))
+            except ValueError:
+                tail = 0
+            if tail <= 0:
+                raise ValueError('Invalid tail for {}.'.format(app_))
+            for name in LIMIT_OPTIONS:
+                try:
+                    limit = self._limit(app_, name)
+                except ValueError:
+                    limit = 0
+                if limit is not None and limit <= 0:
+                    raise ValueError('Invalid {} for {}.'.format(name, app_))
 
     @staticmethod
     def __parse_app_list(app_list):
-        """Parse list of apps for arguments.
+        """Parse list of apps for arguments and options.
+
+        Each entry has the form 'app & arguments & options'. Arguments
+        and options are optional. Options are given as key=value pairs
+        separated by white space, e.g. 'timeout=0.5'.
 
-        :param app_list: list of apps with optional arguments.
-        :return: list of apps and assigned argument dict.
-        :rtype: [String], {String: [String]}
+        :param app_list: list of apps with optional arguments and options.
+                         Callables are taken as they are.
+        :return: list of apps, assigned argument dict and option dict.
+        :rtype: [String], {String: [String]}, {String: {String: String}}
+        :raise ValueError: if an option is not a key=value pair.
         """
         args = {}
         apps = []
+        options = {}
         for app_str in app_list:
+            if callable(app_str):
+                apps.append(app_str)
+                args[app_str] = []
+                options[app_str] = {}
+                continue
             parts = app_str.split("&")
             app_path = parts[0].strip()
             apps.append(app_path)
@@ -311,4 +1713,12 @@ class FuzzExecutor():
                 args[app_path] = [arg.strip() for arg in parts[1].split()]
             else:
                 args[app_path] = []
-        return apps, args
+            options[app_path] = {}
+            if len(parts) > 2:
+                for option in parts[2].split():
+                    key, sep, value = option.partition('=')
+                    if not sep:
+                        raise ValueError('Invalid option {} for {}.'.format(
+                            option, app_path))
+                    options[app_path][key] = value
+        return apps, args, options
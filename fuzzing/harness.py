@@ -0,0 +1,233 @@
+# coding=utf-8
+"""
+In-process test harness.
+
+Run Python callables as applications under test, without starting a
+process for each run. Optionally the callable runs isolated in a worker
+process, which is recycled after a number of runs to contain leaks.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import importlib
+import logging
+import multiprocessing
+import traceback
+
+from .coverage import CoverageTracer
+
+# Applications given as 'callable:package.module:function' are callables.
+CALLABLE_PREFIX = 'callable:'
+
+# Number of runs after which an isolated worker is replaced.
+DEFAULT_RECYCLE = 1000
+
+
+def is_callable_spec(app):
+    """Check if app denotes a Python callable.
+
+    :param app: application as given to FuzzExecutor.
+    :return: True if app is a callable or a callable spec.
+    :rtype: bool
+    """
+    if callable(app):
+        return True
+    return app.startswith(CALLABLE_PREFIX)
+
+
+def load_callable(app):
+    """Resolve the callable denoted by app.
+
+    :param app: a callable or a spec 'callable:package.module:function'.
+    :return: the callable.
+    :rtype: callable
+    :raise ValueError: if the spec is malformed.
+    """
+    if callable(app):
+        return app
+    module_name, sep, name = app[len(CALLABLE_PREFIX):].partition(':')
+    if not sep or not module_name or not name:
+        raise ValueError('Invalid callable {}.'.format(app))
+    target = importlib.import_module(module_name)
+    for attr in name.split('.'):
+        target = getattr(target, attr)
+    return target
+
+
+def call_target(target, data):
+    """Call target with data, catching any exception.
+
+    SystemExit is caught as well, since parsers often exit on invalid
+    input; like for a process, exit code 0 or None is a success. Only
+    KeyboardInterrupt stops the fuzzer.
+
+    :param target: the callable under test.
+    :param data: input for the test run.
+    :type data: bytes
+    :return: formatted traceback of an uncaught exception or None.
+    :rtype: str
+    """
+    try:
+        target(data)
+    except SystemExit as exc:
+        if exc.code is not None and exc.code != 0:
+            return traceback.format_exc()
+    except Exception:  # pylint: disable=broad-except
+        return traceback.format_exc()
+    return None
+
+
+class IsolatedWorker():
+    """Run a callable in a separate worker process.
+
+    The worker is started on first use and replaced after recycle runs,
+    or if it died or was killed due to a timeout.
+
+    With coverage the worker records the edges executed by each run and
+    sends back the bitmap, see attribute bitmap.
+    """
+
+    def __init__(self, target, recycle=DEFAULT_RECYCLE, coverage=False):
+        """Take callable to run.
+
+        :param target: the callable under test.
+        :param recycle: number of runs after which the worker is replaced.
+        :type recycle: int
+        :param coverage: record the coverage of the runs.
+        :type coverage: bool
+        """
+        self.logger = logging.getLogger('fuzzing.harness.IsolatedWorker')
+        self.target = target
+        self.recycle = recycle
+        self.coverage = coverage
+        # Coverage bitmap of the last run, if it completed.
+        self.bitmap = None
+        self.runs_ = 0
+        self.process = None
+        self.conn = None
+
+    def run(self, data, timeout=None):
+        """Run callable with data.
+
+        :param data: input for the test run.
+        :type data: bytes
+        :param timeout: maximum time to wait in seconds; None waits forever.
+        :type timeout: float
+        :return: return code and traceback of an uncaught exception.
+                 The return code is None if the callable was running at
+                 timeout, negative if the worker was killed by a signal.
+        :rtype: (int, str)
+        """
+        if self.process is None:
+            self.start()
+        self.bitmap = None
+        try:
+            self.conn.send_bytes(data)
+        except OSError:
+            # The worker died between runs, e.g. killed by the OOM
+            # killer. The input is not to blame, so a new worker runs it.
+            self.logger.warning('Worker %d died, restarting.',
+                                self.process.pid)
+            self.stop()
+            self.start()
+            self.conn.send_bytes(data)
+        if not self.conn.poll(timeout):
+            self.stop(kill=True)
+            return None, None
+        try:
+            error = self.conn.recv()
+            if self.coverage:
+                self.bitmap = self.conn.recv_bytes()
+        except EOFError:
+            self.process.join()
+            returncode = self.process.exitcode
+            self.stop()
+            return returncode, None
+        self.runs_ += 1
+        if self.runs_ >= self.recycle:
+            self.stop()
+        return (0 if error is None else 1), error
+
+    def start(self):
+        """Start a new worker process."""
+        context = _mp_context()
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_loop,
+            args=(self.target, child_conn, self.conn, self.coverage),
+            daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.runs_ = 0
+        self.logger.debug('Worker %d started.', self.process.pid)
+
+    def stop(self, kill=False):
+        """Stop the worker process.
+
+        :param kill: kill the worker instead of asking it to exit.
+        :type kill: bool
+        """
+        if self.process is None:
+            return
+        if kill:
+            self.process.kill()
+        self.conn.close()
+        self.process.join()
+        self.process = None
+        self.conn = None
+
+
+def _worker_loop(target, conn, executor_conn, coverage=False):
+    """Run target for each input received until the pipe is closed.
+
+    :param target: the callable under test.
+    :param conn: connection to the executor.
+    :param executor_conn: the executor's end of the pipe, to be closed.
+    :param coverage: send the coverage bitmap after each result.
+    :type coverage: bool
+    """
+    # Otherwise closing the pipe in the executor is not noticed.
+    executor_conn.close()
+    tracer = CoverageTracer() if coverage else None
+    while True:
+        try:
+            data = conn.recv_bytes()
+        except EOFError:
+            return
+        if tracer is None:
+            conn.send(call_target(target, data))
+            continue
+        tracer.reset()
+        with tracer:
+            error = call_target(target, data)
+        conn.send(error)
+        conn.send_bytes(tracer.bitmap)
+
+
+def _mp_context():
+    """Provide multiprocessing context for workers.
+
+    Forking allows to run callables which can't be pickled.
+
+    :return: multiprocessing context.
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
@@ -0,0 +1,318 @@
+# coding=utf-8
+"""
+Histograms of resource usage.
+
+Record wall clock time, CPU time and memory of test runs with fixed memory use.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import sys
+import math
+from array import array
+
+# Metrics recorded per key by UsageStats.
+WALL = 'wall'
+USER = 'user'
+SYS = 'sys'
+MAXRSS = 'maxrss'
+METRICS = (WALL, USER, SYS, MAXRSS)
+
+# Smallest value distinguished per metric; seconds or bytes.
+LOWEST = {WALL: 1e-6, USER: 1e-6, SYS: 1e-6, MAXRSS: 1024}
+
+# Range of the histograms in powers of two above the lowest value.
+DEFAULT_OCTAVES = 40
+
+# Buckets per power of two. 4 buckets limit the error to about 19 %.
+DEFAULT_PRECISION = 4
+
+
+class Histogram():
+    """Histogram with a fixed number of logarithmic buckets.
+
+    Bucket 0 counts values below lowest, bucket i > 0 values up to
+    lowest * 2 ** ((i - 1) / precision). Values beyond the range are counted
+    in the last bucket. Memory use does not depend on the number of
+    values, so histograms are merged as cheaply as counters.
+    """
+
+    __slots__ = ('lowest', 'precision', 'counts_', 'count', 'total',
+                 'maximum')
+
+    def __init__(self, lowest=1e-6, octaves=DEFAULT_OCTAVES,
+                 precision=DEFAULT_PRECISION):
+        """Prepare empty histogram.
+
+        :param lowest: smallest value distinguished.
+        :type lowest: float
+        :param octaves: range in powers of two above lowest.
+        :type octaves: int
+        :param precision: buckets per power of two.
+        :type precision: int
+        """
+        assert lowest > 0, 'ENSURE: lowest value is positive.'
+        self.lowest = lowest
+        self.precision = precision
+        self.counts_ = array('q', [0]) * (octaves * precision + 2)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, value):
+        """Count value.
+
+        :param value: value to count; not negative.
+        :type value: float
+        """
+        if value < self.lowest:
+            bucket = 0
+        else:
+            bucket = min(len(self.counts_) - 1,
+                         math.ceil(math.log2(value / self.lowest) *
+                                   self.precision) + 1)
+        self.counts_[bucket] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, percent):
+        """Estimate the value below which percent of the values lie.
+
+        The estimate is the upper bound of the bucket holding the
+        percentile, but never more than the maximum value.
+
+        :param percent: percentile, e.g. 99.
+        :type percent: float
+        :return: estimated value; 0 if the histogram is empty.
+        :rtype: float
+        """
+        assert 0 <= percent <= 100, 'ENSURE: percent is in [0, 100].'
+        rank = math.ceil(self.count * percent / 100.0)
+        seen = 0
+        for bucket, count in enumerate(self.counts_):
+            seen += count
+            if count and seen >= rank:
+                return min(self.upper_bound(bucket), self.maximum)
+        return 0.0
+
+    def upper_bound(self, bucket):
+        """Retrieve the largest value counted in bucket.
+
+        :param bucket: index of bucket.
+        :type bucket: int
+        :return: upper bound of bucket.
+        :rtype: float
+        """
+        if bucket == 0:
+            return self.lowest
+        if bucket == len(self.counts_) - 1:
+            return math.inf
+        return self.lowest * 2 ** ((bucket - 1) / self.precision)
+
+    def mean(self):
+        """Calculate the mean value.
+
+        :return: mean value; 0 if the histogram is empty.
+        :rtype: float
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def copy(self):
+        """Create an independent copy.
+
+        :return: copy of this histogram.
+        :rtype: Histogram
+        """
+        histogram = Histogram(self.lowest, 0, self.precision)
+        histogram.counts_ = array('q', self.counts_)
+        histogram.count = self.count
+        histogram.total = self.total
+        histogram.maximum = self.maximum
+        return histogram
+
+    def __iadd__(self, other):
+        """Merge other histogram into this one.
+
+        :param other: histogram with the same buckets.
+        :type other: Histogram
+        :return: this histogram.
+        :rtype: Histogram
+        """
+        assert (self.lowest, self.precision, len(self.counts_)) == \
+            (other.lowest, other.precision, len(other.counts_)), \
+            'ENSURE: histograms have the same buckets.'
+        for bucket, count in enumerate(other.counts_):
+            if count:
+                self.counts_[bucket] += count
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    def __add__(self, other):
+        """Merge histograms into a new one.
+
+        :param other: histogram with the same buckets.
+        :type other: Histogram
+        :return: merged histogram.
+        :rtype: Histogram
+        """
+        histogram = self.copy()
+        histogram += other
+        return histogram
+
+
+class UsageStats():
+    """Resource usage of test runs per key.
+
+    Holds a Histogram for each of METRICS: wall clock time, user and
+    system CPU time in seconds, and the maximum resident set size in
+    bytes. CPU times and memory are only known for runs of processes,
+    which were reaped by the executor.
+    """
+
+    __slots__ = ('histograms_',)
+
+    def __init__(self):
+        """Prepare empty statistics."""
+        self.histograms_ = {}
+
+    @property
+    def keys(self):
+        """Retrieve the keys with recorded runs.
+
+        :return: set of keys.
+        :rtype: set(str)
+        """
+        return set(self.histograms_)
+
+    def add(self, key, wall, rusage=None):
+        """Record resource usage of a run.
+
+        :param key: key of the test run.
+        :type key: str
+        :param wall: wall clock time of the run in seconds.
+        :type wall: float
+        :param rusage: resource usage of the process, if known.
+        :type rusage: resource.struct_rusage
+        """
+        histograms = self._histograms(key)
+        histograms[WALL].add(wall)
+        if rusage is not None:
+            histograms[USER].add(rusage.ru_utime)
+            histograms[SYS].add(rusage.ru_stime)
+            histograms[MAXRSS].add(maxrss_bytes(rusage))
+
+    def histogram(self, key, metric):
+        """Retrieve histogram of metric for key.
+
+        :param key: key of test runs.
+        :type key: str
+        :param metric: one of METRICS.
+        :type metric: str
+        :return: histogram; empty if there are no runs for key.
+        :rtype: Histogram
+        """
+        assert metric in METRICS, 'ENSURE: metric is valid.'
+        if key not in self.histograms_:
+            return Histogram(LOWEST[metric])
+        return self.histograms_[key][metric]
+
+    def __iadd__(self, other):
+        """Merge other statistics into these.
+
+        :param other: statistics to merge.
+        :type other: UsageStats
+        :return: these statistics.
+        :rtype: UsageStats
+        """
+        for key, others in other.histograms_.items():
+            histograms = self._histograms(key)
+            for metric in METRICS:
+                histograms[metric] += others[metric]
+        return self
+
+    def __add__(self, other):
+        """Merge statistics into new ones.
+
+        :param other: statistics to merge.
+        :type other: UsageStats
+        :return: merged statistics.
+        :rtype: UsageStats
+        """
+        usage = UsageStats()
+        usage += self
+        usage += other
+        return usage
+
+    def _histograms(self, key):
+        """Retrieve histograms of key, creating them if missing.
+
+        :param key: key of test runs.
+        :type key: str
+        :return: histogram per metric.
+        :rtype: {str: Histogram}
+        """
+        histograms = self.histograms_.get(key)
+        if histograms is None:
+            histograms = {metric: Histogram(LOWEST[metric])
+                          for metric in METRICS}
+            self.histograms_[key] = histograms
+        return histograms
+
+    def __repr__(self):
+        """Create printable representation.
+
+        :return: percentiles of each metric per key.
+        :rtype: str
+        """
+        info = ''
+        for key in sorted(self.histograms_):
+            info += '{}\n'.format(key)
+            for metric in METRICS:
+                histogram = self.histograms_[key][metric]
+                if not histogram.count:
+                    continue
+                values = [histogram.percentile(50),
+                          histogram.percentile(99), histogram.maximum]
+                if metric == MAXRSS:
+                    values = ['{:.1f} MiB'.format(v / 2 ** 20)
+                              for v in values]
+                else:
+                    values = ['{:.1f} ms'.format(v * 1000) for v in values]
+                info += '\t{} p50/p99/max: {}\n'.format(metric,
+                                                       ' / '.join(values))
+        return info
+
+
+def maxrss_bytes(rusage):
+    """Retrieve maximum resident set size in bytes.
+
+    :param rusage: resource usage.
+    :type rusage: resource.struct_rusage
+    :return: maximum resident set size in bytes.
+    :rtype: int
+    """
+    # macOS reports bytes, other systems kilobytes.
+    if sys.platform == 'darwin':
+        return rusage.ru_maxrss
+    return rusage.ru_maxrss * 1024
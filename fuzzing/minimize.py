@@ -0,0 +1,296 @@
+# coding=utf-8
+"""
+Minimization of failing inputs.
+
+Shrink inputs to the smallest one failing the same way by delta debugging.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import hashlib
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+from .fuzzer import FuzzExecutor
+
+# Executor of a worker process, see _init_worker().
+_executor = None
+
+
+def ddmin(units, search):
+    """Find a minimal list of units still showing a failure.
+
+    Implements the ddmin algorithm of Zeller and Hildebrandt: the units
+    are split into chunks, and a chunk or the complement of a chunk
+    showing the failure replaces the units. Without such a candidate the
+    chunks are halved, until single units are tried.
+
+    The candidates of a step are passed to search at once, so it may
+    test them in parallel. They are generated lazily, since the
+    complements of a step hold the units about granularity times.
+
+    :param units: units of an input showing the failure.
+    :type units: list
+    :param search: function taking an iterator of candidate unit lists
+                   and returning the index of the first one showing the
+                   failure, or None.
+    :return: units of a 1-minimal candidate.
+    :rtype: list
+    """
+    units = list(units)
+    granularity = 2
+    while len(units) >= 2:
+        bounds = [len(units) * i // granularity
+                  for i in range(granularity + 1)]
+        ranges = list(zip(bounds, bounds[1:]))
+        # With two chunks the complements are the chunks themselves.
+        index = search(_candidates(units, ranges, granularity > 2))
+        if index is None:
+            if granularity >= len(units):
+                break
+            granularity = min(granularity * 2, len(units))
+        elif index < granularity:
+            start, end = ranges[index]
+            units = units[start:end]
+            granularity = 2
+        else:
+            start, end = ranges[index - granularity]
+            units = units[:start] + units[end:]
+            granularity = max(granularity - 1, 2)
+    return units
+
+
+def _candidates(units, ranges, complements):
+    """Generate the candidates of a ddmin step.
+
+    :param units: current units.
+    :type units: list
+    :param ranges: start and end of each chunk.
+    :type ranges: [(int, int)]
+    :param complements: also generate the complements of the chunks.
+    :type complements: bool
+    :return: generator of the chunks, followed by their complements.
+    """
+    for start, end in ranges:
+        yield units[start:end]
+    if complements:
+        for start, end in ranges:
+            yield units[:start] + units[end:]
+
+
+class Minimizer():
+    """Shrink failing inputs of an application.
+
+    An input is minimized in two phases. First ddmin removes chunks of
+    bytes. Then the bytes differing from the seed the input was fuzzed
+    from are reverted, again with ddmin, leaving only the mutations
+    needed for the failure. A candidate reproduces the failure if its
+    run has the same signature as the original input (see
+    fuzzing.buckets).
+
+    Candidates are run on a pool of processes. Results are cached by
+    the SHA-256 digest of the candidate, so no input is run twice.
+    """
+
+    def __init__(self, app, seed=None, processes=1):
+        """Take application and seed of the failing inputs.
+
+        :param app: application entry 'app & arguments & options' as
+                    given to FuzzExecutor, or a callable.
+        :param seed: content of the seed file the inputs were fuzzed
+                     from; no bytes are reverted if None.
+        :type seed: bytes
+        :param processes: number of candidates run in parallel.
+        :type processes: int
+        """
+        assert processes > 0, 'ENSURE: processes is positive.'
+        self.logger = logging.getLogger('fuzzing.minimize.Minimizer')
+        self.app_entry = app
+        self.executor = FuzzExecutor([app], [])
+        self.app = self.executor.apps[0]
+        self.seed = seed
+        self.processes = processes
+        # Signature of the failure to preserve, see minimize().
+        self.signature = None
+        self.cache_ = {}
+        self.executions = 0
+        self.cache_hits = 0
+        self._pool = None
+
+    def __enter__(self):
+        """Enter context; the minimizer is closed on exit.
+
+        :return: this minimizer.
+        :rtype: Minimizer
+        """
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close minimizer when leaving the context."""
+        self.close()
+
+    def close(self):
+        """Stop the worker processes and release the executor."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.executor.close()
+
+    def minimize(self, data):
+        """Shrink a failing input.
+
+        :param data: the failing input.
+        :type data: bytes
+        :return: smallest input found failing with the same signature.
+        :rtype: bytes
+        :raise ValueError: if data does not fail.
+        """
+        data = bytes(data)
+        self.signature = self._signatures([data])[0]
+        if self.signature is None:
+            raise ValueError('Input does not fail.')
+        self.logger.info('Minimizing %d bytes failing with %s', len(data),
+                         self.signature)
+
+        def build_removed(positions):
+            """Keep the bytes at given positions."""
+            return bytes(map(data.__getitem__, positions))
+
+        positions = self._ddmin(range(len(data)), build_removed)
+        if self.seed is not None and len(self.seed) == len(data):
+            seed = self.seed
+            mutated = [pos for pos in positions if data[pos] != seed[pos]]
+
+            def build_reverted(kept_mutations):
+                """Revert all mutations but the given ones."""
+                kept = set(kept_mutations)
+                return bytes(data[pos] if pos in kept else seed[pos]
+                             for pos in positions)
+
+            mutated = self._ddmin(mutated, build_reverted)
+            result = build_reverted(mutated)
+        else:
+            result = build_removed(positions)
+        self.logger.info('Minimized to %d bytes with %d executions',
+                         len(result), self.executions)
+        return result
+
+    def _ddmin(self, units, build):
+        """Minimize units, trying the empty list first.
+
+        :param units: units of the failing input.
+        :param build: function creating an input from a list of units.
+        :return: minimal units.
+        :rtype: list
+        """
+        if self._search([[]], build) == 0:
+            return []
+        return ddmin(units, lambda candidates: self._search(candidates,
+                                                             build))
+
+    def _search(self, candidates, build):
+        """Find the first candidate reproducing the failure.
+
+        Candidates are built and run in waves of processes inputs, so
+        the search stops after the wave with the first reproducing
+        candidate, and only one wave is held in memory.
+
+        :param candidates: lists of units.
+        :type candidates: iterable
+        :param build: function creating an input from a list of units.
+        :return: index of the first reproducing candidate or None.
+        :rtype: int
+        """
+        candidates = iter(candidates)
+        start = 0
+        while True:
+            wave = [build(units)
+                    for units in itertools.islice(candidates, self.processes)]
+            if not wave:
+                return None
+            for offset, signature in enumerate(self._signatures(wave)):
+                if signature == self.signature:
+                    return start + offset
+            start += len(wave)
+
+    def _signatures(self, inputs):
+        """Run inputs unless their signature is cached.
+
+        :param inputs: inputs to run.
+        :type inputs: [bytes]
+        :return: signature per input; None for success.
+        :rtype: [str]
+        """
+        digests = [hashlib.sha256(data).digest() for data in inputs]
+        pending = {}
+        for digest, data in zip(digests, inputs):
+            if digest in self.cache_ or digest in pending:
+                self.cache_hits += 1
+            else:
+                pending[digest] = data
+        if pending:
+            self.executions += len(pending)
+            if self.processes == 1:
+                signatures = [self.executor.run_input(self.app, data).bucket
+                              for data in pending.values()]
+            else:
+                signatures = self._pool_map(list(pending.values()))
+            self.cache_.update(zip(pending, signatures))
+        return [self.cache_[digest] for digest in digests]
+
+    def _pool_map(self, inputs):
+        """Run inputs in the worker processes.
+
+        :param inputs: inputs to run.
+        :type inputs: [bytes]
+        :return: signature per input; None for success.
+        :rtype: [str]
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.processes,
+                                             initializer=_init_worker,
+                                             initargs=(self.app_entry,))
+        return list(self._pool.map(_run_input, inputs))
+
+
+def _init_worker(app):
+    """Create the executor of a worker process.
+
+    :param app: application entry as given to FuzzExecutor.
+    """
+    global _executor
+    _executor = FuzzExecutor([app], [])
+    Finalize(_executor, _executor.close, exitpriority=10)
+
+
+def _run_input(data):
+    """Run an input in a worker process.
+
+    :param data: input to run.
+    :type data: bytes
+    :return: signature of the failure or None for success.
+    :rtype: str
+    """
+    result = _executor.run_input(_executor.apps[0], data)
+    # Statistics of single runs are not needed.
+    _executor.reset_stats()
+    return result.bucket
@@ -0,0 +1,343 @@
+# coding=utf-8
+"""
+Mutators.
+
+Mutations of fuzzed inputs, applied in place, and Havoc, which stacks
+them by adaptive weights.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import logging
+
+# Widths in bytes of the integers modified by arithmetic and interesting.
+WIDTHS = (1, 2, 4)
+
+# Largest value added to or subtracted from an integer, as in AFL.
+ARITH_MAX = 35
+
+# Values likely to hit boundary conditions, per width.
+INTERESTING = {1: (0, 1, 0x10, 0x20, 0x40, 0x64, 0x7F, 0x80, 0xFF),
+               2: (0, 0xFF, 0x100, 0x200, 0x3E8, 0x400, 0x1000, 0x7FFF,
+                   0x8000, 0xFFFF),
+               4: (0, 0xFFFF, 0x10000, 0x7FFFFFFF, 0x80000000,
+                   0xFFFFFFFF)}
+
+# Upper bounds of block lengths; small blocks are as likely as large ones.
+BLOCK_SIZES = (32, 128, 1500)
+
+# Havoc stacks 1, 2, 4, ... up to 2 ** (MAX_STACK_POWER - 1) mutations.
+MAX_STACK_POWER = 6
+
+# Mutated inputs are cut to GROWTH_LIMIT times the seed's length, but
+# may always grow to MIN_LENGTH_LIMIT bytes.
+GROWTH_LIMIT = 4
+MIN_LENGTH_LIMIT = 1024
+
+# Weight added to a mutator for each new failure, and its upper bound.
+REWARD = 1.0
+MAX_WEIGHT = 50.0
+
+# Prefix of the names of stacked mutations, see Havoc.mutate().
+HAVOC_PREFIX = 'havoc:'
+
+
+def replace_byte(buf, rng, donor=None):
+    """Replace a random byte with a random value.
+
+    :param buf: the data to mutate in place.
+    :type buf: bytearray
+    :param rng: random generator.
+    :type rng: random.Random
+    :param donor: function providing another seed, unused.
+    """
+    if buf:
+        buf[rng.randrange(len(buf))] = rng.randrange(256)
+
+
+def flip_bit(buf, rng, donor=None):
+    """Flip a random bit.
+
+    :param buf: the data to mutate in place.
+    :type buf: bytearray
+    :param rng: random generator.
+    :type rng: random.Random
+    :param donor: function providing another seed, unused.
+    """
+    if buf:
+        bit = rng.randrange(len(buf) * 8)
+        buf[bit >> 3] ^= 1 << (bit & 7)
+
+
+def arithmetic(buf, rng, donor=None):
+    """Add or subtract a small value to an integer of 1, 2 or 4 bytes.
+
+    The integer is read in little or big endian byte order and wraps
+    around.
+
+    :param buf: the data to mutate in place.
+    :type buf: bytearray
+    :param rng: random generator.
+    :type rng: random.Random
+    :param donor: function providing another seed, unused.
+    """
+    width, position, order = _integer_at(buf, rng)
+    if width is None:
+        return
+    delta = rng.randint(1, ARITH_MAX) * rng.choice((1, -1))
+    value = int.from_bytes(buf[position:position + width], order) + delta
+    buf[position:position + width] = \
+        (value % (1 << 8 * width)).to_bytes(width, order)
+
+
+def interesting(buf, rng, donor=None):
+    """Overwrite an integer of 1, 2 or 4 bytes with an interesting value.
+
+    :param buf: the data to mutate in place.
+    :type buf: bytearray
+    :param rng: random generator.
+    :type rng: random.Random
+    :param donor: function providing another seed, unused.
+    """
+    width, position, order = _integer_at(buf, rng)
+    if width is None:
+        return
+    value = rng.choice(INTERESTING[width])
+    buf[position:position + width] = value.to_bytes(width, order)
+
+
+def delete_block(buf, rng, donor=None):
+    """Delete a block of bytes; at least one byte is kept.
+
+    :param buf: the data to mutate in place.
+    :type buf: bytearray
+    :param rng: random generator.
+    :type rng: random.Random
+    :param donor: function providing another seed, unused.
+    """
+    if len(buf) < 2:
+        return
+    length = _block_length(len(buf) - 1, rng)
+    start = rng.randrange(len(buf) - length + 1)
+    del buf[start:start + length]
+
+
+def duplicate_block(buf, rng, donor=None):
+    """Insert a copy of a block of bytes at a random position.
+
+    :param buf: the data to mutate in place.
+    :type buf: bytearray
+    :param rng: random generator.
+    :type rng: random.Random
+    :param donor: function providing another seed, unused.
+    """
+    if not buf:
+        return
+    length = _block_length(len(buf), rng)
+    start = rng.randrange(len(buf) - length + 1)
+    target = rng.randrange(len(buf) + 1)
+    buf[target:target] = buf[start:start + length]
+
+
+def swap_blocks(buf, rng, donor=None):
+    """Swap two blocks of bytes of same length.
+
+    :param buf: the data to mutate in place.
+    :type buf: bytearray
+    :param rng: random generator.
+    :type rng: random.Random
+    :param donor: function providing another seed, unused.
+    """
+    if len(buf) < 2:
+        return
+    length = _block_length(len(buf) // 2, rng)
+    first = rng.randrange(len(buf) - 2 * length + 1)
+    second = rng.randrange(first + length, len(buf) - length + 1)
+    buf[first:first + length], buf[second:second + length] = \
+        buf[second:second + length], buf[first:first + length]
+
+
+def splice(buf, rng, donor=None):
+    """Replace the tail of the data with the tail of another seed.
+
+    :param buf: the data to mutate in place.
+    :type buf: bytearray
+    :param rng: random generator.
+    :type rng: random.Random
+    :param donor: function providing another seed.
+    """
+    other = None if donor is None else donor()
+    if not buf or not other:
+        return
+    split = rng.randrange(len(buf))
+    buf[split:] = other[rng.randrange(len(other)):]
+
+
+def stack_names(mutator):
+    """Split the name of a stack of mutations into its mutators.
+
+    :param mutator: name of a stack, see Havoc.mutate().
+    :type mutator: str
+    :return: names of the mutators; empty for other names.
+    :rtype: [str]
+    """
+    if not mutator or not mutator.startswith(HAVOC_PREFIX):
+        return []
+    return mutator[len(HAVOC_PREFIX):].split('+')
+
+
+def _integer_at(buf, rng):
+    """Pick width, position and byte order of an integer in buf.
+
+    :param buf: the data.
+    :param rng: random generator.
+    :return: width, position and byte order; all None if buf is too
+             short for the width drawn.
+    :rtype: (int, int, str)
+    """
+    width = rng.choice(WIDTHS)
+    if len(buf) < width:
+        return None, None, None
+    position = rng.randrange(len(buf) - width + 1)
+    return width, position, rng.choice(('little', 'big'))
+
+
+def _block_length(limit, rng):
+    """Draw the length of a block.
+
+    :param limit: largest length possible; at least 1.
+    :type limit: int
+    :param rng: random generator.
+    :return: length of the block.
+    :rtype: int
+    """
+    return rng.randint(1, min(limit, rng.choice(BLOCK_SIZES)))
+
+
+# Mutators by name. A mutator modifies a bytearray in place, given a
+# random generator and a function providing another seed to mix in.
+# Further mutators may be added before creating a Havoc.
+MUTATORS = {'replace_byte': replace_byte,
+            'flip_bit': flip_bit,
+            'arithmetic': arithmetic,
+            'interesting': interesting,
+            'delete_block': delete_block,
+            'duplicate_block': duplicate_block,
+            'swap_blocks': swap_blocks,
+            'splice': splice}
+
+
+class Havoc():
+    """Apply stacks of random mutations, preferring successful mutators.
+
+    Each mutator has a weight, initially 1. The mutators of a stack are
+    drawn by weight. If a stack makes the application fail in a new way,
+    reward() increases the weights of its mutators, so they are chosen
+    more often from then on. The signatures of the failures seen are
+    kept by the Havoc, so they stay known when the statistics of the
+    executor are reset.
+    """
+
+    def __init__(self, names=None, max_stack_power=MAX_STACK_POWER):
+        """Take the mutators to use.
+
+        :param names: names of MUTATORS; all if None.
+        :type names: [str]
+        :param max_stack_power: stacks have up to 2 ** (max_stack_power - 1)
+                                mutations.
+        :type max_stack_power: int
+        :raise ValueError: if a mutator is unknown.
+        """
+        self.logger = logging.getLogger('fuzzing.mutators.Havoc')
+        names = list(MUTATORS) if names is None else list(names)
+        if not names:
+            raise ValueError('No mutators given.')
+        for name in names:
+            if name not in MUTATORS:
+                raise ValueError('Unknown mutator {}.'.format(name))
+        assert max_stack_power >= 1, 'ENSURE: stacks are not empty.'
+        self.names = names
+        self.max_stack_power = max_stack_power
+        self.functions_ = [MUTATORS[name] for name in names]
+        self.index_ = {name: idx for idx, name in enumerate(names)}
+        self.weights = [1.0] * len(names)
+        # Stacks using and new failures found by each mutator.
+        self.uses = [0] * len(names)
+        self.finds = [0] * len(names)
+        # Signatures of the failures seen so far.
+        self.signatures_ = set()
+
+    def mutate(self, buf, rng, donor=None):
+        """Apply a stack of mutations to buf in place.
+
+        The mutations modify buf one after another without copying it.
+        Inputs growing beyond their limit are cut.
+
+        :param buf: the data to mutate.
+        :type buf: bytearray
+        :param rng: random generator.
+        :type rng: random.Random
+        :param donor: function providing another seed for splice.
+        :return: name of the stack, HAVOC_PREFIX followed by the names of
+                 its mutators.
+        :rtype: str
+        """
+        limit = max(MIN_LENGTH_LIMIT, GROWTH_LIMIT * len(buf))
+        count = 1 << rng.randrange(self.max_stack_power)
+        stack = rng.choices(range(len(self.names)), self.weights, k=count)
+        for idx in stack:
+            self.functions_[idx](buf, rng, donor)
+            if len(buf) > limit:
+                del buf[limit:]
+        used = sorted(set(stack))
+        for idx in used:
+            self.uses[idx] += 1
+        return HAVOC_PREFIX + '+'.join(self.names[idx] for idx in used)
+
+    def reward(self, mutator, signature):
+        """Credit the mutators of a stack with a failure, if it is new.
+
+        :param mutator: name of the stack returned by mutate(); other
+                        names are ignored.
+        :type mutator: str
+        :param signature: signature of the failure, see fuzzing.buckets.
+        :type signature: str
+        """
+        if signature in self.signatures_:
+            return
+        self.signatures_.add(signature)
+        for name in stack_names(mutator):
+            idx = self.index_.get(name)
+            if idx is None:
+                continue
+            self.finds[idx] += 1
+            self.weights[idx] = min(self.weights[idx] + REWARD, MAX_WEIGHT)
+        self.logger.debug('Rewarded %s: %s', mutator, self.weights)
+
+    def __repr__(self):
+        """Create printable representation.
+
+        :return: weight, uses and finds per mutator.
+        :rtype: str
+        """
+        return 'Havoc({})'.format(', '.join(
+            '{}: {:.1f} {}/{}'.format(name, weight, finds, uses)
+            for name, weight, uses, finds in zip(
+                self.names, self.weights, self.uses, self.finds)))
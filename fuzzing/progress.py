@@ -0,0 +1,247 @@
+# coding=utf-8
+"""
+Progress of fuzzing campaigns.
+
+Stream counts of runs from worker processes to the parent process.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import time
+import json
+import queue
+import threading
+
+from .fuzzer import Status, app_name
+
+# Seconds between progress reports.
+DEFAULT_INTERVAL = 1.0
+
+# Indices of the counters kept per application.
+EXECS = 0
+FAILED = 1
+TIMEOUTS = 2
+
+# Statuses counted as timeouts in addition to runs terminated by the executor.
+TIMEOUT_STATUSES = (Status.TIMEOUT, Status.HANG)
+
+
+class ProgressReporter():
+    """Publish the progress of a worker process.
+
+    Add it to FuzzExecutor.listeners. Counts of runs are collected
+    per application and put into queue as deltas, at most once per
+    interval, so the overhead per run is small.
+    """
+
+    def __init__(self, queue_, interval=DEFAULT_INTERVAL):
+        """Take queue to publish deltas to.
+
+        :param queue_: queue shared with the monitoring process.
+        :type queue_: multiprocessing.Queue
+        :param interval: seconds between publications.
+        :type interval: float
+        """
+        self.queue = queue_
+        self.interval = interval
+        self.deltas_ = {}
+        self._published = time.monotonic()
+
+    def __call__(self, result):
+        """Count a run and publish deltas if the interval has passed.
+
+        :param result: result of the run.
+        :type result: RunResult
+        """
+        counts = self.deltas_.get(app_name(result.app))
+        if counts is None:
+            counts = self.deltas_[app_name(result.app)] = [0, 0, 0]
+        counts[EXECS] += 1
+        if result.status is not Status.SUCCESS:
+            counts[FAILED] += 1
+        if result.timed_out or result.status in TIMEOUT_STATUSES:
+            counts[TIMEOUTS] += 1
+        if time.monotonic() - self._published >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Publish the deltas collected so far."""
+        if self.deltas_:
+            self.queue.put(self.deltas_)
+            self.deltas_ = {}
+        self._published = time.monotonic()
+
+
+class ProgressMonitor():
+    """Show the progress published by ProgressReporters.
+
+    A background thread merges the deltas and, once per interval,
+    writes a status line to stream and a record to the metrics file.
+    The metrics file gets one JSON object per line holding counts and
+    executions per second of each application.
+    """
+
+    def __init__(self, queue_, interval=DEFAULT_INTERVAL, metrics_path=None,
+                 stream=None):
+        """Take queue to read deltas from.
+
+        :param queue_: queue shared with the worker processes.
+        :type queue_: multiprocessing.Queue
+        :param interval: seconds between reports.
+        :type interval: float
+        :param metrics_path: path of the metrics file, None for no file.
+        :type metrics_path: str
+        :param stream: stream to write the status line to; None for no
+                       status line.
+        """
+        self.queue = queue_
+        self.interval = interval
+        self.metrics_path = metrics_path
+        self.stream = stream
+        self.totals_ = {}
+        self._previous = {}
+        self._start = self._last_report = time.monotonic()
+        self._line_length = 0
+        self._thread = None
+
+    def start(self):
+        """Start monitoring in a background thread."""
+        assert self._thread is None, 'ENSURE: monitor is not running.'
+        self._start = self._last_report = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Process outstanding deltas, report and stop monitoring."""
+        if self._thread is None:
+            return
+        self.queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self.report()
+        if self._is_tty():
+            self.stream.write('\n')
+            self.stream.flush()
+
+    def add(self, deltas):
+        """Merge deltas published by a worker.
+
+        :param deltas: counters per application.
+        :type deltas: {str: [int]}
+        """
+        for key, counts in deltas.items():
+            totals = self.totals_.setdefault(key, [0, 0, 0])
+            for idx, count in enumerate(counts):
+                totals[idx] += count
+
+    def report(self):
+        """Write status line and metrics record."""
+        now = time.monotonic()
+        elapsed = now - self._start
+        period = max(now - self._last_report, 1e-9)
+        rates = {}
+        for key, totals in self.totals_.items():
+            previous = self._previous.get(key, [0, 0, 0])
+            rates[key] = (totals[EXECS] - previous[EXECS]) / period
+        self._previous = {key: list(totals)
+                          for key, totals in self.totals_.items()}
+        self._last_report = now
+        if self.stream is not None:
+            self._write_status(self.status_line(elapsed, sum(rates.values())))
+        if self.metrics_path is not None:
+            self._write_metrics(elapsed, rates)
+
+    def status_line(self, elapsed, rate):
+        """Format the status line.
+
+        :param elapsed: seconds since start.
+        :type elapsed: float
+        :param rate: executions per second.
+        :type rate: float
+        :return: status line.
+        :rtype: str
+        """
+        totals = [sum(counts[idx] for counts in self.totals_.values())
+                  for idx in (EXECS, FAILED, TIMEOUTS)]
+        minutes, seconds = divmod(int(elapsed), 60)
+        hours, minutes = divmod(minutes, 60)
+        tmpl = ('[{:02d}:{:02d}:{:02d}] execs: {} ({:.1f}/s) failed: {} '
+                'timeouts: {}')
+        return tmpl.format(hours, minutes, seconds, totals[EXECS], rate,
+                           totals[FAILED], totals[TIMEOUTS])
+
+    def _run(self):
+        """Merge deltas and report until stop() is called."""
+        next_report = time.monotonic() + self.interval
+        while True:
+            try:
+                deltas = self.queue.get(
+                    timeout=max(0.0, next_report - time.monotonic()))
+            except queue.Empty:
+                deltas = {}
+            if deltas is None:
+                return
+            self.add(deltas)
+            if time.monotonic() >= next_report:
+                self.report()
+                next_report += self.interval
+
+    def _is_tty(self):
+        """Check if the status line goes to a terminal.
+
+        :return: True for a terminal.
+        :rtype: bool
+        """
+        return self.stream is not None and self.stream.isatty()
+
+    def _write_status(self, line):
+        """Write status line.
+
+        On a terminal the line is overwritten by the next one.
+
+        :param line: status line.
+        :type line: str
+        """
+        if self._is_tty():
+            padding = ' ' * max(0, self._line_length - len(line))
+            self.stream.write('\r' + line + padding)
+            self._line_length = len(line)
+        else:
+            self.stream.write(line + '\n')
+        self.stream.flush()
+
+    def _write_metrics(self, elapsed, rates):
+        """Append a record to the metrics file.
+
+        :param elapsed: seconds since start.
+        :type elapsed: float
+        :param rates: executions per second of each application.
+        :type rates: {str: float}
+        """
+        apps = {}
+        for key, totals in self.totals_.items():
+            apps[key] = {'execs': totals[EXECS], 'failed': totals[FAILED],
+                         'timeouts': totals[TIMEOUTS],
+                         'execs_per_sec': round(rates[key], 3)}
+        record = {'time': time.time(), 'elapsed': round(elapsed, 3),
+                  'apps': apps}
+        with open(self.metrics_path, 'a') as f_metrics:
+            f_metrics.write(json.dumps(record, sort_keys=True) + '\n')
+
@@ -0,0 +1,114 @@
+# coding=utf-8
+"""
+Random number streams.
+
+Reproducible, independent random number generators for fuzzing workers.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import random
+import hashlib
+import secrets
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is optional
+    numpy = None
+
+
+class FuzzRandom(random.Random):
+    """Random number generator used for fuzzing.
+
+    A random.Random, which remembers the master seed and stream number
+    it was created from. If numpy is available, it also provides a numpy
+    generator of the same stream for the vectorized mutations.
+    """
+
+    def __init__(self, seed=None, stream=0, numpy_seed=None):
+        """Initialize generator.
+
+        :param seed: seed of the Python generator.
+        :param stream: number of the stream, only kept for reference.
+        :type stream: int
+        :param numpy_seed: seed of the numpy generator. If not given, it
+                           is drawn from the Python generator on first use.
+        """
+        super(FuzzRandom, self).__init__(seed)
+        self.master_seed = seed
+        self.stream = stream
+        self._numpy_seed = numpy_seed
+        self._numpy_generator = None
+
+    def numpy_generator(self):
+        """Provide the numpy generator of this stream.
+
+        :return: numpy random generator.
+        :rtype: numpy.random.Generator
+        """
+        assert numpy is not None, 'ENSURE: numpy is installed.'
+        if self._numpy_generator is None:
+            numpy_seed = self._numpy_seed
+            if numpy_seed is None:
+                numpy_seed = self.getrandbits(64)
+            self._numpy_generator = numpy.random.default_rng(numpy_seed)
+        return self._numpy_generator
+
+
+def new_seed():
+    """Create a fresh master seed.
+
+    :return: seed.
+    :rtype: int
+    """
+    return secrets.randbits(63)
+
+
+def make_rng(seed=None, stream=0):
+    """Create generator for stream number stream of master seed seed.
+
+    Streams of the same master seed are statistically independent, so
+    workers given different stream numbers never duplicate their work.
+    The same seed and stream always reproduce the same sequence.
+
+    With numpy the streams are spawned from a numpy SeedSequence,
+    otherwise the stream seed is a hash of master seed and stream.
+
+    :param seed: master seed; a fresh one is created if None.
+    :type seed: int
+    :param stream: number of the stream.
+    :type stream: int
+    :return: random generator.
+    :rtype: FuzzRandom
+    """
+    assert stream >= 0, 'ENSURE: stream number is not negative.'
+    if seed is None:
+        seed = new_seed()
+    if numpy is not None:
+        sequence = numpy.random.SeedSequence(seed, spawn_key=(stream,))
+        python_seq, numpy_seq = sequence.spawn(2)
+        python_seed = int.from_bytes(
+            python_seq.generate_state(4, numpy.uint32).tobytes(), 'little')
+        rng = FuzzRandom(python_seed, stream, numpy_seq)
+    else:
+        digest = hashlib.sha256('{}:{}'.format(seed, stream).encode())
+        rng = FuzzRandom(int.from_bytes(digest.digest(), 'big'), stream)
+    rng.master_seed = seed
+    return rng
@@ -0,0 +1,131 @@
+# coding=utf-8
+"""
+Seed file cache.
+
+Keep the content of seed files in memory, so each seed is read only once.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+import mmap
+import logging
+from collections import OrderedDict
+
+DEFAULT_BUDGET = 256 * 1024 * 1024
+DEFAULT_MMAP_THRESHOLD = 4 * 1024 * 1024
+
+
+class SeedCache():
+    """Least recently used cache for seed file content.
+
+    Seeds are returned as writable buffers. Modifications are not
+    written back to the seed files. Files of at least mmap_threshold
+    bytes are mapped into memory instead of being read, so only the
+    pages actually touched are copied.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET,
+                 mmap_threshold=DEFAULT_MMAP_THRESHOLD):
+        """Prepare empty cache.
+
+        :param budget: number of bytes the cached seeds may occupy.
+        :type budget: int
+        :param mmap_threshold: minimum size of seeds to map into memory.
+        :type mmap_threshold: int
+        """
+        self.logger = logging.getLogger('fuzzing.seeds.SeedCache')
+        self.budget = budget
+        self.mmap_threshold = mmap_threshold
+        self.hits = 0
+        self.misses = 0
+        self.size_ = 0
+        self.seeds_ = OrderedDict()
+
+    def get(self, path):
+        """Retrieve content of given seed file.
+
+        :param path: path to seed file.
+        :type path: str
+        :return: content of seed file.
+        :rtype: bytearray or mmap
+        """
+        path = os.path.abspath(path)
+        seed = self.seeds_.get(path)
+        if seed is not None:
+            self.hits += 1
+            self.seeds_.move_to_end(path)
+            return seed
+        self.misses += 1
+        seed = self._load(path)
+        self.seeds_[path] = seed
+        self.size_ += len(seed)
+        self._evict()
+        return seed
+
+    def clear(self):
+        """Remove all seeds from cache."""
+        while self.seeds_:
+            self._remove_oldest()
+
+    def __len__(self):
+        """Return number of cached seeds.
+
+        :return: number of cached seeds.
+        :rtype: int
+        """
+        return len(self.seeds_)
+
+    def _load(self, path):
+        """Read or map content of seed file.
+
+        :param path: path to seed file.
+        :type path: str
+        :return: content of seed file.
+        :rtype: bytearray or mmap
+        """
+        with open(path, 'rb') as seed_file:
+            size = os.fstat(seed_file.fileno()).st_size
+            if size and size >= self.mmap_threshold:
+                self.logger.debug('Mapping seed %s (%d bytes).', path, size)
+                return mmap.mmap(seed_file.fileno(), 0,
+                                 access=mmap.ACCESS_COPY)
+            return bytearray(seed_file.read())
+
+    def _evict(self):
+        """Remove least recently used seeds exceeding the budget.
+
+        The most recently used seed is kept, even if it exceeds the
+        budget on its own.
+        """
+        while self.size_ > self.budget and len(self.seeds_) > 1:
+            self._remove_oldest()
+
+    def _remove_oldest(self):
+        """Remove least recently used seed."""
+        path, seed = self.seeds_.popitem(last=False)
+        self.size_ -= len(seed)
+        self.logger.debug('Evicting seed %s.', path)
+        if isinstance(seed, mmap.mmap):
+            try:
+                seed.close()
+            except BufferError:
+                # Still referenced, will be unmapped when released.
+                pass
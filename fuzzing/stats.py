@@ -0,0 +1,176 @@
+# coding=utf-8
+"""
+Multi-dimensional test statistics.
+
+Count test runs by application, seed file, mutator and status.
+
+Copyright (c) 2015-2018 Stefan Braun
+"""
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import operator
+
+# Dimensions of the runs counted by FuzzExecutor.
+APP = 'app'
+SEED = 'seed'
+MUTATOR = 'mutator'
+STATUS = 'status'
+DIMENSIONS = (APP, SEED, MUTATOR, STATUS)
+
+
+class MultiStatCounter():
+    """Sparse counter of test runs over several dimensions.
+
+    Counts are kept in a dict keyed by tuples with one value per
+    dimension, so only combinations which occurred take memory.
+    Projections onto some of the dimensions are created by group_by().
+    """
+
+    __slots__ = ('dimensions', 'counts_')
+
+    def __init__(self, dimensions=DIMENSIONS):
+        """Prepare empty counter.
+
+        :param dimensions: names of the dimensions.
+        :type dimensions: (str)
+        """
+        assert len(set(dimensions)) == len(dimensions), \
+            'ENSURE: dimensions are unique.'
+        self.dimensions = tuple(dimensions)
+        self.counts_ = {}
+
+    def add(self, *values, count=1):
+        """Count a test run.
+
+        :param values: one value per dimension.
+        :param count: number of runs to add.
+        :type count: int
+        """
+        assert len(values) == len(self.dimensions), \
+            'ENSURE: one value per dimension.'
+        self.counts_[values] = self.counts_.get(values, 0) + count
+
+    def count(self, **selection):
+        """Count the runs matching selection.
+
+        :param selection: values of some dimensions, e.g. status='FAILED'.
+        :return: number of matching runs.
+        :rtype: int
+        """
+        criteria = [(self._index(dimension), value)
+                    for dimension, value in selection.items()]
+        return sum(count for key, count in self.counts_.items()
+                   if all(key[idx] == value for idx, value in criteria))
+
+    def group_by(self, *dimensions):
+        """Project the counts onto given dimensions.
+
+        :param dimensions: names of the dimensions to keep.
+        :return: counter summing up all other dimensions.
+        :rtype: MultiStatCounter
+        """
+        assert dimensions, 'ENSURE: at least one dimension is kept.'
+        project = operator.itemgetter(*map(self._index, dimensions))
+        # itemgetter returns no tuple for a single index.
+        single = len(dimensions) == 1
+        projected = MultiStatCounter(dimensions)
+        counts = projected.counts_
+        for key, count in self.counts_.items():
+            key = (project(key),) if single else project(key)
+            counts[key] = counts.get(key, 0) + count
+        return projected
+
+    def values(self, dimension):
+        """Retrieve the values occurring in dimension.
+
+        :param dimension: name of the dimension.
+        :type dimension: str
+        :return: set of values.
+        """
+        idx = self._index(dimension)
+        return {key[idx] for key in self.counts_}
+
+    def items(self):
+        """Retrieve the counts.
+
+        :return: pairs of value tuple and count.
+        """
+        return self.counts_.items()
+
+    def __len__(self):
+        """Retrieve the number of value combinations.
+
+        :return: number of value combinations counted.
+        :rtype: int
+        """
+        return len(self.counts_)
+
+    def __iadd__(self, other):
+        """Merge other counter into this one.
+
+        :param other: counter with the same dimensions.
+        :type other: MultiStatCounter
+        :return: this counter.
+        :rtype: MultiStatCounter
+        """
+        assert other.dimensions == self.dimensions, \
+            'ENSURE: counters have the same dimensions.'
+        counts = self.counts_
+        for key, count in other.counts_.items():
+            counts[key] = counts.get(key, 0) + count
+        return self
+
+    def __add__(self, other):
+        """Merge counters into a new one.
+
+        :param other: counter with the same dimensions.
+        :type other: MultiStatCounter
+        :return: merged counter.
+        :rtype: MultiStatCounter
+        """
+        merged = MultiStatCounter(self.dimensions)
+        merged.counts_ = dict(self.counts_)
+        merged += other
+        return merged
+
+    def _index(self, dimension):
+        """Retrieve the position of dimension in the keys.
+
+        :param dimension: name of the dimension.
+        :type dimension: str
+        :return: position.
+        :rtype: int
+        :raise ValueError: if there is no such dimension.
+        """
+        try:
+            return self.dimensions.index(dimension)
+        except ValueError:
+            raise ValueError('Unknown dimension {}.'.format(dimension))
+
+    def __repr__(self):
+        """Create printable representation.
+
+        :return: one line per value combination.
+        :rtype: str
+        """
+        info = '{}\n'.format(' / '.join(self.dimensions))
+        for key in sorted(self.counts_, key=lambda k: tuple(map(str, k))):
+            info += '\t{}: {}\n'.format(' / '.join(map(str, key)),
+                                        self.counts_[key])
+        return info
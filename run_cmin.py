@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""Reduce the seed files of a test configuration to a minimal subset.
+
+Copyright (c) 2015-2018 Stefan Braun
+
+Permission is hereby granted, free of charge, to any person
+obtaining a copy of this software and associated documentation
+files (the "Software"), to deal in the Software without restriction,
+including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall
+be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import sys
+import argparse
+import yaml
+
+from fuzzing.corpus import CorpusMinimizer
+
+APPLICATIONS = 'applications'
+SEED_FILES = 'seed_files'
+
+# Suffix of the configuration written by default.
+MINIMIZED_SUFFIX = '.min.yaml'
+
+
+def list_seed_files(config, corpus_dirs):
+    """Collect the seed files of configuration and corpus directories.
+
+    :param config: test configuration.
+    :type config: {}
+    :param corpus_dirs: directories whose files are added as seeds.
+    :type corpus_dirs: [str]
+    :return: paths of the seed files, without duplicates.
+    :rtype: [str]
+    """
+    seed_files = list(config.get(SEED_FILES) or [])
+    for directory in corpus_dirs:
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                seed_files.append(path)
+    return list(dict.fromkeys(seed_files))
+
+
+def main():
+    """Read configuration, minimize its seeds and write the result."""
+    parser = argparse.ArgumentParser(
+        description='Reduce seed files to a subset of equal features.')
+    parser.add_argument('config_path', help='Path to configuration file.')
+    parser.add_argument('--corpus', action='append', default=[],
+                        help='Directory of further seed files; '
+                             'may be given repeatedly.')
+    parser.add_argument('--output',
+                        help='Path of the reduced configuration; default is '
+                             'the configuration with suffix .min.yaml.')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help='Number of seed files run in parallel.')
+    args = parser.parse_args()
+    with open(args.config_path) as f_conf:
+        config = yaml.safe_load(f_conf)
+    if not config or APPLICATIONS not in config:
+        print('Missing application configuration.')
+        return 1
+    seed_files = list_seed_files(config, args.corpus)
+    if not seed_files:
+        print('No seed files.')
+        return 1
+    minimizer = CorpusMinimizer(config[APPLICATIONS], args.processes)
+    selected = minimizer.minimize(seed_files)
+    features = set().union(*minimizer.features_.values())
+    print('Selected {} of {} seed files covering {} features.'.format(
+        len(selected), len(seed_files), len(features)))
+    config[SEED_FILES] = selected
+    output = args.output
+    if output is None:
+        output = os.path.splitext(args.config_path)[0] + MINIMIZED_SUFFIX
+    with open(output, 'w') as f_out:
+        yaml.safe_dump(config, f_out, default_flow_style=False)
+    print('Written to {}'.format(output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -25,21 +25,54 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
 
+import os
 import sys
+import time
 import argparse
-from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing.util import Finalize
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import yaml
 
-from fuzzing import FuzzExecutor, TestStatCounter
+from fuzzing import (FuzzExecutor, TestStatCounter, Status, make_rng,
+                     CrashStore)
+from fuzzing import stats
+from fuzzing.mutators import Havoc, MUTATORS, stack_names
+from fuzzing.rng import new_seed
+from fuzzing.progress import (ProgressReporter, ProgressMonitor,
+                              DEFAULT_INTERVAL)
 
 APPLICATIONS = 'applications'
 SEED_FILES = 'seed_files'
 PROCESSORS = 'processors'
 PROCESSES = 'processes'
 RUNS = 'runs'
+DELIVERY = 'delivery'
+SEED = 'seed'
+CHUNK_SIZE = 'chunk_size'
+DURATION = 'duration'
+MAX_EXECS = 'max_execs'
+PROGRESS = 'progress'
+PROGRESS_INTERVAL = 'progress_interval'
+METRICS_FILE = 'metrics_file'
+CRASH_DIR = 'crash_dir'
+MUTATOR_NAMES = 'mutators'
 DEFAULT_RUNS = 10
-DEFAULT_PROCESSORS = 1
+DEFAULT_PROCESSORS = os.cpu_count() or 1
 DEFAULT_PROCESSES = 3
+DEFAULT_DELIVERY = 'file'
+DEFAULT_CHUNK_SIZE = 10
+
+# Number of failure buckets printed at the end of a campaign.
+BUCKETS_SHOWN = 20
+
+# Chunks queued per processor, so an idle worker finds the next chunk
+# immediately.
+CHUNKS_PER_PROCESSOR = 2
+
+# Executor and progress reporter of a worker process, see init_worker().
+_executor = None
+_reporter = None
 
 HELP_CONFIGURATION = """
 version: 1
@@ -88,20 +121,190 @@ def validate_config(conf_dict):
         conf_dict[PROCESSES] = DEFAULT_PROCESSES
     if PROCESSORS not in conf_dict.keys():
         conf_dict[PROCESSORS] = DEFAULT_PROCESSORS
+    if DELIVERY not in conf_dict.keys():
+        conf_dict[DELIVERY] = DEFAULT_DELIVERY
+    if conf_dict.get(SEED) is None:
+        conf_dict[SEED] = new_seed()
+    if CHUNK_SIZE not in conf_dict.keys():
+        conf_dict[CHUNK_SIZE] = DEFAULT_CHUNK_SIZE
+    if conf_dict[CHUNK_SIZE] < 1:
+        raise InvalidConfigurationError('Chunk size must be positive.')
+    for key in (DURATION, MAX_EXECS, METRICS_FILE, CRASH_DIR,
+                MUTATOR_NAMES):
+        conf_dict.setdefault(key, None)
+    mutators = conf_dict[MUTATOR_NAMES]
+    if mutators == 'havoc':
+        conf_dict[MUTATOR_NAMES] = mutators = list(MUTATORS)
+    if mutators is not None and (not mutators or isinstance(mutators, str) or
+                                 not set(mutators) <= set(MUTATORS)):
+        raise InvalidConfigurationError('Invalid mutators {}.'.format(
+            mutators))
+    conf_dict.setdefault(PROGRESS, True)
+    conf_dict.setdefault(PROGRESS_INTERVAL, DEFAULT_INTERVAL)
+
 
+def init_worker(config, progress_queue=None):
+    """Create the executor of a worker process.
 
-def execute_test(config):
-    """Run tests.
+    The executor is kept for all chunks run by the worker, so fork
+    servers and cached seeds are reused. It is closed when the worker
+    exits.
 
     :param config: test configuration.
     :type config: {}
+    :param progress_queue: queue to publish progress to, if any.
+    :type progress_queue: multiprocessing.Queue
     """
-    import os
+    global _executor, _reporter
     print('Starting process: {}'.format(os.getpid()))
-    executor = FuzzExecutor(config[APPLICATIONS], config[SEED_FILES])
-    executor.run_test(config[RUNS])
-    print('Process {} finishes.'.format(os.getpid()))
-    return executor.stats
+    _executor = FuzzExecutor(config[APPLICATIONS], config[SEED_FILES],
+                             config[DELIVERY], make_rng(config[SEED]))
+    Finalize(_executor, _executor.close, exitpriority=10)
+    if config[CRASH_DIR] is not None:
+        _executor.crash_store = CrashStore(config[CRASH_DIR])
+    if config[MUTATOR_NAMES] is not None:
+        _executor.havoc = Havoc(config[MUTATOR_NAMES])
+    if progress_queue is not None:
+        _reporter = ProgressReporter(progress_queue,
+                                     config[PROGRESS_INTERVAL])
+        _executor.listeners.append(_reporter)
+
+
+def execute_chunk(config, index, runs, deadline=None):
+    """Run a chunk of tests in a worker process.
+
+    Each chunk fuzzes with its own random stream. With the default
+    mutation the inputs of a chunk do not depend on the worker running
+    it. The corpus of applications with option coverage and the weights
+    of havoc (mutators) carry over to the next chunk of the worker,
+    though. Then the inputs also depend on the chunks the worker ran
+    before, and a failing input cannot be recreated from its master
+    seed and stream; take it from the crash store instead.
+
+    :param config: test configuration.
+    :type config: {}
+    :param index: number of the chunk.
+    :type index: int
+    :param runs: number of tests to run.
+    :type runs: int
+    :param deadline: time.monotonic() value ending the campaign.
+    :type deadline: float
+    :return: statistics of the chunk.
+    :rtype: TestStatCounter
+    """
+    _executor.reseed(make_rng(config[SEED], index))
+    _executor.run_test(runs, deadline)
+    if _reporter is not None:
+        _reporter.flush()
+    return _executor.reset_stats()
+
+
+def plan_chunks(config):
+    """Split the campaign into chunks of tests.
+
+    The campaign consists of max_execs tests, if configured. Otherwise
+    it consists of runs tests per process, unless a duration is given.
+    Then chunks are provided until the duration expires.
+
+    :param config: test configuration.
+    :type config: {}
+    :return: generator of chunk sizes.
+    :rtype: generator of int
+    """
+    total = config[MAX_EXECS]
+    if total is None and config[DURATION] is None:
+        total = config[RUNS] * config[PROCESSES]
+    chunk_size = config[CHUNK_SIZE]
+    while total is None or total > 0:
+        size = chunk_size if total is None else min(chunk_size, total)
+        if total is not None:
+            total -= size
+        yield size
+
+
+def run_campaign(config):
+    """Run tests in chunks on a pool of worker processes.
+
+    While the tests run, the progress is shown in a status line and
+    written to the metrics file, as configured.
+
+    :param config: test configuration.
+    :type config: {}
+    :return: combined statistics.
+    :rtype: TestStatCounter
+    """
+    monitor = create_monitor(config)
+    if monitor is None:
+        return schedule_chunks(config)
+    monitor.start()
+    try:
+        return schedule_chunks(config, monitor.queue)
+    finally:
+        monitor.stop()
+
+
+def create_monitor(config):
+    """Create the monitor showing the progress of the campaign.
+
+    :param config: test configuration.
+    :type config: {}
+    :return: monitor or None, if neither status line nor metrics file
+             are requested.
+    :rtype: ProgressMonitor
+    """
+    stream = sys.stderr if config[PROGRESS] else None
+    if stream is None and config[METRICS_FILE] is None:
+        return None
+    return ProgressMonitor(multiprocessing.Queue(), config[PROGRESS_INTERVAL],
+                           config[METRICS_FILE], stream)
+
+
+def schedule_chunks(config, progress_queue=None):
+    """Hand out chunks of tests to idle workers.
+
+    Idle workers take the next chunk, so slow workers do not stall
+    the campaign. The statistics are merged as chunks finish. When
+    the duration expires, running chunks stop after their current test.
+
+    :param config: test configuration.
+    :type config: {}
+    :param progress_queue: queue the workers publish progress to, if any.
+    :type progress_queue: multiprocessing.Queue
+    :return: combined statistics.
+    :rtype: TestStatCounter
+    """
+    deadline = None
+    if config[DURATION] is not None:
+        deadline = time.monotonic() + config[DURATION]
+    test_stats = TestStatCounter(set())
+    chunks = enumerate(plan_chunks(config))
+    max_pending = config[PROCESSORS] * CHUNKS_PER_PROCESSOR
+    pending = set()
+    with ProcessPoolExecutor(config[PROCESSORS], initializer=init_worker,
+                             initargs=(config, progress_queue)) as pool:
+        while True:
+            while len(pending) < max_pending and \
+                    (deadline is None or time.monotonic() < deadline):
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                index, runs = chunk
+                pending.add(pool.submit(execute_chunk, config, index, runs,
+                                        deadline))
+            if not pending:
+                break
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    # Drop chunks not started yet, running ones finish.
+                    pending = {future for future in pending
+                               if not future.cancel()}
+                    timeout = None
+            done, pending = wait(pending, timeout, FIRST_COMPLETED)
+            for future in done:
+                test_stats += future.result()
+    return test_stats
 
 
 def show_test_stats(test_stats):
@@ -114,27 +317,96 @@ def show_test_stats(test_stats):
     print('Test Results:')
     print('{}'.format('_' * 50))
     print(test_stats)
+    print('Resource usage:')
+    print(test_stats.usage)
+    print('Runs per seed file:')
+    print(seed_summary(test_stats.runs))
+    mutators = mutator_summary(test_stats.runs)
+    if mutators:
+        print('Runs per mutator:')
+        print(mutators)
+    if test_stats.buckets:
+        print('Failures by signature ({} buckets):'.format(
+            len(test_stats.buckets)))
+        print(bucket_summary(test_stats.buckets))
     print('{}\n'.format('_' * 50))
 
 
-def combine_test_stats(results):
-    """Combine the test results.
+def seed_summary(runs):
+    """Summarize runs and failures per seed file.
 
-    :param results: list of test results.
-    :type results: [TestStatCounter]
-    :return: combined statistics.
-    :rtype: TestStatCounter
+    Seeds are listed by descending number of failures, so seeds wasting
+    executions are found at the end.
+
+    :param runs: counts of runs.
+    :type runs: MultiStatCounter
+    :return: one line per seed file.
+    :rtype: str
+    """
+    per_seed = runs.group_by(stats.SEED, stats.STATUS)
+    lines = []
+    for seed in per_seed.values(stats.SEED):
+        total = per_seed.count(seed=seed)
+        failed = total - per_seed.count(seed=seed, status=Status.SUCCESS.name)
+        lines.append((-failed, str(seed), total))
+    return ''.join('\t{}: {} runs, {} failed\n'.format(seed, total, -failed)
+                   for failed, seed, total in sorted(lines))
+
+
+def mutator_summary(runs):
+    """Summarize runs and failures per mutator of havoc stacks.
+
+    A run counts for every mutator of its stack.
+
+    :param runs: counts of runs.
+    :type runs: MultiStatCounter
+    :return: one line per mutator; empty without havoc.
+    :rtype: str
+    """
+    totals = {}
+    for (mutator, status), count in runs.group_by(stats.MUTATOR,
+                                                  stats.STATUS).items():
+        failed = 0 if status == Status.SUCCESS.name else count
+        for name in stack_names(mutator):
+            total, failures = totals.get(name, (0, 0))
+            totals[name] = (total + count, failures + failed)
+    return ''.join('\t{}: {} runs, {} failed\n'.format(name, total, failed)
+                   for name, (total, failed) in sorted(totals.items()))
+
+
+def bucket_summary(buckets, limit=BUCKETS_SHOWN):
+    """Summarize the largest buckets of failures.
+
+    :param buckets: failures grouped by signature.
+    :type buckets: CrashBuckets
+    :param limit: maximum number of buckets listed.
+    :type limit: int
+    :return: one line per bucket with count, signature and first input.
+    :rtype: str
     """
-    combined = TestStatCounter(set())
-    for res in results:
-        combined += res
-    return combined
+    lines = ''.join('\t{!r}\n'.format(bucket)
+                    for bucket in buckets.largest(limit))
+    if len(buckets) > limit:
+        lines += '\t... {} more\n'.format(len(buckets) - limit)
+    return lines
 
 
 def main():
     """Read configuration and execute test runs."""
     parser = argparse.ArgumentParser(description='Stress test applications.')
     parser.add_argument('config_path', help='Path to configuration file.')
+    parser.add_argument('--seed', type=int,
+                        help='Master seed to reproduce a previous run.')
+    parser.add_argument('--duration', type=float,
+                        help='Seconds to fuzz for.')
+    parser.add_argument('--max-execs', type=int,
+                        help='Maximum number of tests to run.')
+    parser.add_argument('--metrics-file',
+                        help='File to append progress records to.')
+    parser.add_argument('--no-progress', action='store_true',
+                        help='Do not show the status line.')
+    parser.add_argument('--crash-dir',
+                        help='Directory to save failing inputs to.')
     args = parser.parse_args()
     try:
         configuration = load_configuration(args.config_path)
@@ -142,14 +414,27 @@ def main():
         print("\nConfiguration is not valid.")
         print('Example:\n{}'.format(HELP_CONFIGURATION))
         return 1
+    if args.seed is not None:
+        configuration[SEED] = args.seed
+    if args.duration is not None:
+        configuration[DURATION] = args.duration
+    if args.max_execs is not None:
+        configuration[MAX_EXECS] = args.max_execs
+    if args.metrics_file is not None:
+        configuration[METRICS_FILE] = args.metrics_file
+    if args.no_progress:
+        configuration[PROGRESS] = False
+    if args.crash_dir is not None:
+        configuration[CRASH_DIR] = args.crash_dir
     print("Starting up ...")
-    futures = []
-    with ProcessPoolExecutor(configuration[PROCESSORS]) as executor:
-        for _ in range(configuration[PROCESSES]):
-            futures.append(executor.submit(execute_test, configuration))
+    print('Master seed: {}'.format(configuration[SEED]))
+    test_stats = run_campaign(configuration)
     print("... finished")
-    test_stats = combine_test_stats([f.result() for f in futures])
     show_test_stats(test_stats)
+    crash_dir = configuration[CRASH_DIR]
+    if crash_dir is not None:
+        print('Failing inputs in {}: {}'.format(crash_dir,
+                                                 len(CrashStore(crash_dir))))
     return 0
 
 
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""Shrink an input making an application fail.
+
+Copyright (c) 2015-2018 Stefan Braun
+
+Permission is hereby granted, free of charge, to any person
+obtaining a copy of this software and associated documentation
+files (the "Software"), to deal in the Software without restriction,
+including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall
+be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import sys
+import argparse
+
+from fuzzing.crashes import CrashStore
+from fuzzing.minimize import Minimizer
+
+# Suffix appended to the name of the input for the minimized input.
+MINIMIZED_SUFFIX = '.min'
+
+
+def load_input(args):
+    """Read the failing input and its seed.
+
+    :param args: parsed command line.
+    :return: input, seed or None, and the default output path.
+    :rtype: (bytes, bytes, str)
+    """
+    seed_file = args.seed_file
+    if args.crash_dir is not None:
+        store = CrashStore(args.crash_dir)
+        data = store.load(args.input)
+        metadata = store.metadata(args.input) or {}
+        if seed_file is None:
+            seed_file = metadata.get('seed_file')
+            # Inputs derived from the in-memory corpus have no seed file.
+            if seed_file is not None and not os.path.isfile(seed_file):
+                seed_file = None
+    else:
+        with open(args.input, 'rb') as f_input:
+            data = f_input.read()
+    seed = None
+    if seed_file is not None:
+        with open(seed_file, 'rb') as f_seed:
+            seed = f_seed.read()
+    return data, seed, args.input + MINIMIZED_SUFFIX
+
+
+def main():
+    """Read failing input and write the minimized input."""
+    parser = argparse.ArgumentParser(
+        description='Shrink an input making an application fail.')
+    parser.add_argument('app',
+                        help="Application as in the configuration of "
+                             "run_fuzzer.py: 'app & arguments & options'.")
+    parser.add_argument('input',
+                        help='Failing input; its digest with --crash-dir.')
+    parser.add_argument('--seed-file',
+                        help='Seed the input was fuzzed from; mutated bytes '
+                             'are reverted to it.')
+    parser.add_argument('--crash-dir',
+                        help='Crash store to take the input from.')
+    parser.add_argument('--output',
+                        help='Path of the minimized input; default is the '
+                             'input with suffix .min.')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help='Number of candidates run in parallel.')
+    args = parser.parse_args()
+    data, seed, output = load_input(args)
+    if args.output is not None:
+        output = args.output
+    with Minimizer(args.app, seed, args.processes) as minimizer:
+        try:
+            minimized = minimizer.minimize(data)
+        except ValueError:
+            print('Input does not fail.')
+            return 1
+        print('Failure: {}'.format(minimizer.signature))
+        print('Minimized {} to {} bytes with {} executions.'.format(
+            len(data), len(minimized), minimizer.executions))
+    with open(output, 'wb') as f_output:
+        f_output.write(minimized)
+    print('Written to {}'.format(output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -66,11 +66,13 @@ setup(name="fuzzing",
       zip_safe=False,
       tests_require=['pytest', 'behave>=1.2.4', 'pytest-cover', 'pytest-watch'],
       cmdclass={'test': PyTest},
-      scripts=['run_fuzzer.py', ],
+      scripts=['run_fuzzer.py', 'run_minimizer.py', 'run_cmin.py'],
 
       # List of packages that this one depends upon:
       install_requires=['sphinx', 'wrapt', 'PyYAML', 'argh', 'pathtools',
                         'setuptools', 'zc.buildout'],
+      # Optional packages speeding up the fuzzer.
+      extras_require={'fast': ['numpy']},
       requires=['wrapt', 'PyYAML', 'argh', 'pathtools', 'setuptools'],
       provides=['fuzzing', 'gp_decorators'],
       )
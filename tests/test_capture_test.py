@@ -0,0 +1,74 @@
+# coding=utf-8
+"""Test cases for the capture of application output."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import os
+
+from fuzzing.capture import TailBuffer, drain
+
+
+def test_short_output_is_kept():
+    """Data below the limit is kept completely."""
+    tail = TailBuffer(8)
+    tail.write(b'abc')
+    tail.write(b'de')
+    assert tail.getvalue() == b'abcde'
+    assert len(tail) == 5
+    assert not tail.truncated
+
+
+def test_only_tail_is_kept():
+    """Older data is overwritten."""
+    tail = TailBuffer(4)
+    for chunk in (b'abc', b'def', b'g'):
+        tail.write(chunk)
+    assert tail.getvalue() == b'defg'
+    assert tail.truncated
+    assert tail.total == 7
+
+
+def test_large_write_replaces_buffer():
+    """A write beyond the limit keeps its end."""
+    tail = TailBuffer(4)
+    tail.write(b'ab')
+    tail.write(b'0123456789')
+    assert tail.getvalue() == b'6789'
+    tail.write(b'x')
+    assert tail.getvalue() == b'789x'
+
+
+def test_drain_reads_available_data():
+    """Reading a pipe neither blocks nor misses its end."""
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    tail = TailBuffer(16)
+    try:
+        assert drain(read_fd, tail)
+        os.write(write_fd, b'output')
+        assert drain(read_fd, tail)
+        os.close(write_fd)
+        assert not drain(read_fd, tail)
+    finally:
+        os.close(read_fd)
+    assert tail.getvalue() == b'output'
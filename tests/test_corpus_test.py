@@ -0,0 +1,117 @@
+# coding=utf-8
+"""Test cases for the corpus minimization."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import pytest
+
+from fuzzing import corpus
+from fuzzing.corpus import (CorpusMinimizer, greedy_cover, runtime_bucket,
+                            result_features)
+from fuzzing.fuzzer import RunResult, Status
+
+
+def test_runtime_buckets_double():
+    """Runs of similar time share a bucket."""
+    assert runtime_bucket(0.0001) == 0
+    assert runtime_bucket(0.0015) == runtime_bucket(0.0019) == 1
+    assert runtime_bucket(0.003) == 2
+    assert runtime_bucket(1.0) == 10
+
+
+def test_features_of_run():
+    """Outcome and runtime are features per application."""
+    result = RunResult('/bin/app', Status.FAILED, 2, 0.0001)
+    result.bucket = 'FAILED exit 2 -'
+    assert result_features(result) == {('app', 'outcome', 'FAILED exit 2 -'),
+                                       ('app', 'runtime', 0)}
+
+
+def test_greedy_cover_selects_few_seeds():
+    """Seeds adding most uncovered features are taken first."""
+    features = {'a': frozenset({1, 2, 3}), 'b': frozenset({1, 4}),
+                'c': frozenset({4, 5}), 'd': frozenset({2}),
+                'e': frozenset()}
+    assert greedy_cover(features) == ['a', 'c']
+
+
+def test_greedy_cover_prefers_small_seeds():
+    """Among seeds of equal features the smallest is taken."""
+    features = {'big': frozenset({1}), 'small': frozenset({1})}
+    assert greedy_cover(features, {'big': 100, 'small': 1}) == ['small']
+
+
+def fail_on_marker(data):
+    """Fail if the input holds a marker."""
+    if b'XY' in data:
+        raise ValueError('marker')
+
+
+def check_length(data):
+    """Fail for long inputs."""
+    if len(data) > 20:
+        raise ValueError('too long')
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_corpus_is_minimized(tmpdir, monkeypatch, processes):
+    """Redundant seed files are dropped."""
+    # Put all runs into one runtime bucket; workers inherit the setting.
+    monkeypatch.setattr(corpus, 'RUNTIME_RESOLUTION', 60.0)
+    contents = [b'a', b'bb', b'aXYa', b'XY', b'a' * 30, b'b' * 40]
+    seed_files = []
+    for index, content in enumerate(contents):
+        seed = tmpdir.join('seed_{}'.format(index))
+        seed.write_binary(content)
+        seed_files.append(str(seed))
+    minimizer = CorpusMinimizer([fail_on_marker, check_length], processes)
+    selected = minimizer.minimize(seed_files)
+    assert selected == [seed_files[0], seed_files[3], seed_files[4]]
+    assert set(minimizer.features_) == set(seed_files)
+
+
+def branch_on_first_byte(data):
+    """Take another path for inputs starting with 'a'."""
+    if data[:1] == b'a':
+        return 'a'
+    return 'other'
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_corpus_keeps_seeds_of_new_edges(tmpdir, monkeypatch, processes):
+    """With coverage, seeds taking different paths are kept."""
+    monkeypatch.setattr(corpus, 'RUNTIME_RESOLUTION', 60.0)
+    seed_files = []
+    for index, content in enumerate([b'a', b'b', b'aa', b'bb']):
+        seed = tmpdir.join('seed_{}'.format(index))
+        seed.write_binary(content)
+        seed_files.append(str(seed))
+    app = 'callable:{}:branch_on_first_byte & & coverage=true'.format(
+        __name__)
+    minimizer = CorpusMinimizer([app], processes)
+    assert minimizer.minimize(seed_files) == seed_files[:2]
+    features = minimizer.features_
+    assert any(feature[1] == 'edge' for feature in features[seed_files[0]])
+    assert features[seed_files[0]] == features[seed_files[2]]
+    assert CorpusMinimizer([branch_on_first_byte]).minimize(seed_files) == \
+        seed_files[:1]
@@ -0,0 +1,212 @@
+# coding=utf-8
+"""Test cases for coverage feedback."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import json
+import os
+import sys
+
+import pytest
+
+from fuzzing import coverage
+from fuzzing.coverage import (CoverageTracer, CoverageMap, Corpus,
+                              SharedBitmap, is_traced, edge_indices,
+                              CORPUS_PREFIX)
+from fuzzing.fuzzer import FuzzExecutor, Status
+
+from .conftest import PACKAGE_ROOT
+
+
+def branchy(data):
+    """Take different paths depending on the first byte."""
+    if data[:1] == b'A':
+        result = 1
+    else:
+        result = 2
+    return result
+
+
+def target(data):
+    """Callable under test, taking a path per class of byte."""
+    for byte in data:
+        if byte < 64:
+            kind = 'low'
+        elif byte < 128:
+            kind = 'middle'
+        else:
+            kind = 'high'
+    return kind
+
+
+def trace(function, data):
+    """Record the bitmap of a single call."""
+    tracer = CoverageTracer()
+    with tracer:
+        function(data)
+    return bytes(tracer.bitmap)
+
+
+def test_tracer_tells_paths_apart():
+    """Different branches give different bitmaps, same ones equal bitmaps."""
+    first = trace(branchy, b'A')
+    assert any(first)
+    assert trace(branchy, b'A') == first
+    assert trace(branchy, b'B') != first
+
+
+def test_tracer_is_stopped():
+    """Nothing is recorded after leaving the context."""
+    tracer = CoverageTracer()
+    with tracer:
+        pass
+    tracer.reset()
+    branchy(b'A')
+    assert not any(tracer.bitmap)
+
+
+def test_library_code_is_not_traced():
+    """The standard library and the fuzzing package are skipped."""
+    assert is_traced(__file__)
+    assert not is_traced(json.__file__)
+    assert not is_traced(coverage.__file__)
+    assert not is_traced('<string>')
+    assert not any(trace(json.dumps, {'a': [1, 2]}))
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_map_counts_new_edges(monkeypatch, vectorized):
+    """Edges are only new once, with and without numpy."""
+    if not vectorized:
+        monkeypatch.setattr(coverage, 'numpy', None)
+    elif coverage.numpy is None:
+        pytest.skip('numpy is not installed')
+    edges = CoverageMap()
+    first = trace(branchy, b'A')
+    new = edges.update(first)
+    assert new == sum(first)
+    assert edges.update(first) == 0
+    assert edges.update(trace(branchy, b'B')) > 0
+    assert edges.edges > new
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_edge_indices(monkeypatch, vectorized):
+    """The edges of a bitmap are found with and without numpy."""
+    if not vectorized:
+        monkeypatch.setattr(coverage, 'numpy', None)
+    elif coverage.numpy is None:
+        pytest.skip('numpy is not installed')
+    bitmap = bytearray(coverage.MAP_SIZE)
+    bitmap[3] = bitmap[coverage.MAP_MASK] = 1
+    assert edge_indices(bitmap) == {3, coverage.MAP_MASK}
+    assert edge_indices(trace(branchy, b'A')) != \
+        edge_indices(trace(branchy, b'B'))
+
+
+def test_corpus_keeps_budget():
+    """Entries beyond the budget are dropped."""
+    corpus = Corpus(max_bytes=8)
+    assert corpus.add(b'12345') == CORPUS_PREFIX + '0'
+    assert corpus.add(b'12345') is None
+    assert corpus.add(b'678') == CORPUS_PREFIX + '1'
+    assert len(corpus) == 2
+    assert corpus.name(1) in corpus
+    assert corpus[CORPUS_PREFIX + '0'] == bytearray(b'12345')
+
+
+def test_shared_bitmap(tmpdir):
+    """The bitmap is cleared and its file removed on close."""
+    bitmap = SharedBitmap(str(tmpdir))
+    with open(bitmap.path, 'r+b') as f_map:
+        f_map.write(b'\x01')
+    assert bitmap.buffer[0] == 1
+    bitmap.reset()
+    assert not any(bitmap.buffer[:])
+    bitmap.close()
+    assert not tmpdir.listdir()
+
+
+@pytest.mark.parametrize('isolate', ['false', 'true'])
+def test_new_coverage_grows_corpus(seed_file, isolate):
+    """Inputs reaching new edges are fuzzed like seed files."""
+    app = 'callable:{}:target & & coverage=true isolate={}'.format(
+        __name__, isolate)
+    with FuzzExecutor([app], [seed_file]) as executor:
+        executor.fuzz_factor = 4
+        executor.run_test(100)
+    assert executor.coverage.edges > 0
+    assert executor.corpus
+    seeds = executor.stats.runs.values('seed')
+    assert any(seed.startswith(CORPUS_PREFIX) for seed in seeds)
+    assert executor.stats.cumulated_counts_for_status(Status.SUCCESS) == 100
+
+
+def test_without_coverage_corpus_stays_empty(seed_file):
+    """Coverage is only measured if enabled."""
+    app = 'callable:{}:target'.format(__name__)
+    with FuzzExecutor([app], [seed_file]) as executor:
+        executor.run_test(10)
+    assert executor.coverage.edges == 0
+    assert not executor.corpus
+
+
+FORK_SERVER_APP = """
+import sys
+sys.path.insert(0, {!r})
+from fuzzing.forkserver import run
+def main(path):
+    for byte in open(path, 'rb').read():
+        if byte < 64:
+            kind = 'low'
+        elif byte < 128:
+            kind = 'middle'
+        else:
+            kind = 'high'
+    return 0
+sys.exit(run(main))
+"""
+
+
+def test_fork_server_coverage(tmpdir, seed_file):
+    """Children of a fork server share their coverage with the executor."""
+    script = tmpdir.join('app.py')
+    script.write(FORK_SERVER_APP.format(PACKAGE_ROOT))
+    app = '{} & {} & mode=forkserver coverage=true'.format(sys.executable,
+                                                          script)
+    with FuzzExecutor([app], [seed_file]) as executor:
+        executor.fuzz_factor = 4
+        executor.run_test(30)
+        path = executor._bitmaps[sys.executable].path
+    assert executor.coverage.edges > 0
+    assert executor.corpus
+    assert executor.stats.cumulated_counts_for_status(Status.SUCCESS) == 30
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize('options', ['coverage=true', 'coverage=maybe'])
+def test_invalid_coverage_option(tmpdir, seed_file, options):
+    """Coverage of a plain process is not measured."""
+    app = '{} & -c pass & {}'.format(sys.executable, options)
+    with pytest.raises(ValueError):
+        FuzzExecutor([app], [seed_file])
@@ -0,0 +1,123 @@
+# coding=utf-8
+"""Test cases for grouping failures by signature."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import pickle
+import signal
+
+from fuzzing.buckets import CrashBuckets, normalize, signature
+from fuzzing.fuzzer import FuzzExecutor, RunResult, Status
+from fuzzing.crashes import CrashStore
+
+
+def failure(returncode, stderr=None, status=Status.FAILED):
+    """Create result of a failed run."""
+    return RunResult('/bin/app', status, returncode, stderr=stderr)
+
+
+def test_volatile_output_is_normalized():
+    """Addresses, numbers and input names do not matter."""
+    one = b'read 17 bytes\nsegfault at 0x7ffd1234 in /dev/shm/fuzzing_ab12/x\n'
+    other = b'read 4 bytes\n\nsegfault at 0x55aa in /dev/shm/fuzzing_zz9/x'
+    assert normalize(one) == normalize(other)
+    assert normalize('a\n' * 20) == b'\n'.join([b'a'] * 8)
+
+
+def test_signature_distinguishes_causes():
+    """Signal, exit code and output make up the signature."""
+    assert signature(failure(-signal.SIGSEGV, status=Status.SIGNAL)) == \
+        'SIGNAL SIGSEGV -'
+    assert signature(failure(3)) == 'FAILED exit 3 -'
+    assert signature(failure(None, status=Status.HANG)) == 'HANG running -'
+    assert signature(failure(1, b'error at 0x1')) == \
+        signature(failure(1, b'error at 0x2'))
+    assert signature(failure(1, b'error at 0x1')) != \
+        signature(failure(1, b'other error'))
+
+
+def test_failures_are_counted_per_bucket():
+    """The first failure of a bucket is kept."""
+    buckets = CrashBuckets()
+    first = buckets.add('app', failure(1, b'boom'), 'seed.txt')
+    buckets.add('app', failure(1, b'boom'), 'other.txt')
+    buckets.add('app', failure(2))
+    assert len(buckets) == 2
+    assert buckets[first].count == 2
+    assert buckets[first].seed == 'seed.txt'
+    assert buckets[first].excerpt == 'boom'
+    assert [bucket.count for bucket in buckets.largest()] == [2, 1]
+    assert buckets.largest(1)[0].signature == first
+
+
+def test_buckets_are_merged():
+    """Counts add up, the first failure stays."""
+    one = CrashBuckets()
+    key = one.add('app', failure(1), 'one.txt')
+    other = CrashBuckets()
+    other.add('app', failure(1), 'other.txt')
+    other.add('app', failure(2), 'other.txt')
+    merged = one + other
+    assert merged[key].count == 2
+    assert merged[key].seed == 'one.txt'
+    assert len(merged) == 2
+    assert one[key].count == 1
+    merged = pickle.loads(pickle.dumps(merged))
+    assert merged[key].count == 2
+
+
+def fail_by_first_byte(data):
+    """Fail differently depending on the input."""
+    if data[0] % 2:
+        raise ValueError('odd')
+    raise KeyError('even')
+
+
+def test_executor_buckets_failures(tmpdir):
+    """Runs carry their bucket, which refers to the first saved input."""
+    seed_file = tmpdir.join('seed.txt')
+    seed_file.write_binary(b'\x00\x01' * 50)
+    executor = FuzzExecutor([fail_by_first_byte], [str(seed_file)])
+    executor.crash_store = CrashStore(str(tmpdir.join('crashes')))
+    results = []
+    executor.listeners.append(results.append)
+    executor.run_test(20)
+    buckets = executor.stats.buckets
+    assert len(buckets) == len({result.bucket for result in results})
+    assert sum(bucket.count for bucket in buckets.largest()) == 20
+    first = results[0]
+    assert buckets[first.bucket].crash == first.crash
+    assert executor.crash_store.metadata(first.crash)['bucket'] == \
+        first.bucket
+
+
+def test_applications_get_separate_buckets():
+    """The same failure of different applications is kept apart."""
+    buckets = CrashBuckets()
+    first = buckets.add('app', failure(1, b'boom'), 'seed.txt')
+    other = buckets.add('other', failure(1, b'boom'), 'seed.txt')
+    assert first != other
+    assert len(buckets) == 2
+    assert buckets[first].app == 'app'
+    assert buckets[other].app == 'other'
+    assert buckets[other].count == 1
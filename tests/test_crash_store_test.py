@@ -0,0 +1,96 @@
+# coding=utf-8
+"""Test cases for the store of failing inputs."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import hashlib
+import os
+
+from fuzzing.crashes import CrashStore
+from fuzzing.fuzzer import FuzzExecutor, Status
+from fuzzing.rng import make_rng
+
+
+def test_input_is_saved_under_digest(tmpdir):
+    """Inputs are named by their SHA-256 digest in shard directories."""
+    store = CrashStore(str(tmpdir))
+    digest = store.save(b'crash', {'status': 'FAILED'})
+    assert digest == hashlib.sha256(b'crash').hexdigest()
+    assert store.path(digest) == os.path.join(str(tmpdir), digest[:2], digest)
+    assert store.load(digest) == b'crash'
+    assert store.metadata(digest)['status'] == 'FAILED'
+    assert store.metadata(digest)['size'] == 5
+    assert digest in store
+
+
+def test_duplicates_are_stored_once(tmpdir):
+    """The first metadata of an input is kept."""
+    store = CrashStore(str(tmpdir))
+    digest = store.save(b'crash', {'run': 1})
+    store.save(bytearray(b'crash'), {'run': 2})
+    other = CrashStore(str(tmpdir))
+    other.save(b'crash', {'run': 3})
+    assert store.saved == 1
+    assert store.duplicates == 1
+    assert other.saved == 0
+    assert other.duplicates == 1
+    assert store.metadata(digest)['run'] == 1
+
+
+def test_stored_inputs_are_listed(tmpdir):
+    """Only inputs are listed, neither metadata nor temporary files."""
+    store = CrashStore(str(tmpdir))
+    digests = {store.save(data, {}) for data in (b'a', b'b', b'c', b'a')}
+    assert set(store) == digests
+    assert len(store) == 3
+    names = [name for _, _, files in os.walk(str(tmpdir)) for name in files]
+    assert not [name for name in names if name.startswith('.tmp')]
+
+
+def fail_on_input(data):
+    """Fail for every input."""
+    raise ValueError('length {}'.format(len(data)))
+
+
+def test_executor_saves_failing_inputs(tmpdir):
+    """Failed runs refer to their saved input and its origin."""
+    seed_file = tmpdir.join('seed.txt')
+    seed_file.write_binary(b'0123456789' * 10)
+    store = CrashStore(str(tmpdir.join('crashes')))
+    executor = FuzzExecutor([fail_on_input], [str(seed_file)],
+                            rng=make_rng(4711, 3))
+    executor.crash_store = store
+    results = []
+    executor.listeners.append(results.append)
+    executor.run_test(3)
+    assert len(store) == len({result.crash for result in results})
+    result = results[0]
+    assert result.status is Status.FAILED
+    data = store.load(result.crash)
+    assert len(data) == 100
+    assert data != b'0123456789' * 10
+    metadata = store.metadata(result.crash)
+    assert metadata['seed_file'] == str(seed_file)
+    assert metadata['rng_seed'] == 4711
+    assert metadata['rng_stream'] == 3
+    assert metadata['status'] == 'FAILED'
@@ -0,0 +1,84 @@
+# coding=utf-8
+"""Test cases for input delivery backends."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import os
+
+import pytest
+
+from fuzzing.delivery import (TempFileDelivery, ReusableFileDelivery,
+                              MemfdDelivery, create_delivery)
+
+
+def read_slot(slot):
+    """Read the content of an input slot.
+
+    :param slot: the input slot.
+    :return: content.
+    """
+    with open(slot.shared_path, 'rb') as slot_file:
+        return slot_file.read()
+
+
+def test_temp_file_is_removed_on_release(tmpdir):
+    """Each input gets a new file, which is removed on release."""
+    delivery = TempFileDelivery(str(tmpdir))
+    slot = delivery.acquire(bytearray(b'abc'))
+    assert read_slot(slot) == b'abc'
+    delivery.release(slot)
+    assert not os.path.exists(slot.path)
+    assert tmpdir.listdir() == []
+
+
+def test_reusable_file_is_rewritten(tmpdir):
+    """Released files are reused and fully overwritten."""
+    delivery = ReusableFileDelivery(str(tmpdir))
+    slot = delivery.acquire(b'a longer input')
+    delivery.release(slot)
+    second = delivery.acquire(memoryview(b'short'))
+    assert second is slot
+    assert read_slot(second) == b'short'
+    third = delivery.acquire(b'concurrent')
+    assert third.path != second.path
+    delivery.close()
+    assert tmpdir.listdir() == []
+
+
+@pytest.mark.skipif(not MemfdDelivery.available(),
+                    reason='memfd not available')
+def test_memfd_is_passed_to_application():
+    """Memory files are addressed by their file descriptor."""
+    delivery = MemfdDelivery()
+    slot = delivery.acquire(b'in memory')
+    assert slot.path == '/proc/self/fd/{}'.format(slot.fd)
+    assert slot.pass_fds == (slot.fd,)
+    assert read_slot(slot) == b'in memory'
+    delivery.release(slot)
+    delivery.close()
+
+
+def test_unknown_delivery():
+    """Unknown backends are rejected."""
+    with pytest.raises(ValueError):
+        create_delivery('carrier pigeon')
@@ -0,0 +1,504 @@
+# coding=utf-8
+"""Test cases for running applications with FuzzExecutor."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import os
+import resource
+import signal
+import sys
+import time
+
+import pytest
+
+from fuzzing import forkserver
+from fuzzing.fuzzer import FuzzExecutor, Status
+from fuzzing.async_executor import AsyncFuzzExecutor
+from fuzzing.delivery import InputSlot, DELIVERIES, MemfdDelivery
+from fuzzing.rng import make_rng
+from fuzzing.crashes import CrashStore
+from fuzzing.histogram import MAXRSS
+
+from .conftest import PACKAGE_ROOT
+
+
+def make_app(tmpdir, code, options=''):
+    """Write a Python script and create its app entry.
+
+    :param tmpdir: directory to write script to.
+    :param code: the script's source code.
+    :param options: application options.
+    :return: app entry for FuzzExecutor.
+    """
+    script = tmpdir.join('app_{}.py'.format(abs(hash(code))))
+    script.write('import os, sys, time\n'
+                 'sys.path.insert(0, {!r})\n'.format(PACKAGE_ROOT) +
+                 code + '\n')
+    return '{} & {} & {}'.format(sys.executable, script, options)
+
+
+def test_fast_exit_is_detected_early(tmpdir, seed_file):
+    """An application exiting with 0 succeeds without waiting."""
+    app = make_app(tmpdir, 'sys.exit(0)', 'timeout=10')
+    executor = FuzzExecutor([app], [seed_file])
+    start = time.monotonic()
+    executor.run_test(2)
+    assert time.monotonic() - start < 10
+    assert executor.stats.cumulated_counts_for_status(Status.SUCCESS) == 2
+
+
+def test_exit_code_is_recorded(tmpdir, seed_file):
+    """A non zero exit code is a failure."""
+    app = make_app(tmpdir, 'sys.exit(3)')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.status is Status.FAILED
+    assert result.exit_code == 3
+    assert result.signal is None
+
+
+def test_signal_is_recorded(tmpdir, seed_file):
+    """A process terminated by a signal is a failure."""
+    app = make_app(tmpdir, 'os.kill(os.getpid(), 11)')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.status is Status.SIGNAL
+    assert result.signal == signal.SIGSEGV
+    assert result.exit_code is None
+
+
+def test_killed_process_is_out_of_memory(tmpdir, seed_file):
+    """SIGKILL not sent by the executor comes from the OOM killer."""
+    app = make_app(tmpdir, 'os.kill(os.getpid(), 9)')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.status is Status.OOM
+
+
+def test_running_app_is_terminated_after_timeout(tmpdir, seed_file):
+    """An application still running at its timeout succeeds."""
+    app = make_app(tmpdir, 'time.sleep(30)', 'timeout=0.2')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.status is Status.SUCCESS
+    assert result.returncode is None
+    assert result.duration < 5
+
+
+def test_sleeping_app_is_a_hang(tmpdir, seed_file):
+    """An app idling at its wall limit hangs."""
+    app = make_app(tmpdir, 'time.sleep(30)', 'wall_limit=0.3')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.status is Status.HANG
+    assert result.rusage is not None
+    assert result.duration < 5
+
+
+def test_busy_app_times_out(tmpdir, seed_file):
+    """An app computing at its wall limit times out."""
+    app = make_app(tmpdir, 'while True: pass', 'wall_limit=0.5')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.status is Status.TIMEOUT
+
+
+def test_cpu_limit(tmpdir, seed_file):
+    """The kernel stops an app exceeding its CPU time."""
+    app = make_app(tmpdir, 'while True: pass', 'cpu_limit=1 timeout=20')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.status is Status.TIMEOUT
+    assert result.signal == signal.SIGXCPU
+
+
+def test_cpu_limit_kills_app_ignoring_sigxcpu(tmpdir, seed_file):
+    """SIGKILL at the hard CPU limit is a timeout, not out of memory."""
+    code = ('import signal\n'
+            'signal.signal(signal.SIGXCPU, signal.SIG_IGN)\n'
+            'while True: pass')
+    app = make_app(tmpdir, code, 'cpu_limit=1 timeout=20')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.signal == signal.SIGKILL
+    assert result.status is Status.TIMEOUT
+
+
+def test_memory_limit(tmpdir, seed_file):
+    """An app failing a single large allocation is out of memory."""
+    code = 'data = bytearray(400 << 20)'
+    app = make_app(tmpdir, code, 'memory_limit=200 timeout=20 output=capture')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.exit_code == 1
+    assert result.status is Status.OOM
+    assert result.bucket.startswith('OOM')
+
+
+def test_failure_within_memory_limit(tmpdir, seed_file):
+    """Other failures of an app with memory limit are not out of memory."""
+    app = make_app(tmpdir, 'sys.exit(3)',
+                   'memory_limit=200 output=capture')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.status is Status.FAILED
+
+
+@pytest.mark.parametrize('option', ['wall_limit=0', 'cpu_limit=-1',
+                                    'memory_limit=lots'])
+def test_invalid_limit_is_rejected(option):
+    """Limits must be positive numbers."""
+    with pytest.raises(ValueError):
+        FuzzExecutor(['app & & {}'.format(option)], [])
+
+
+CHATTY_APP = """
+sys.stdout.write('x' * (1 << 20))
+sys.stderr.write('crashed')
+sys.exit({})
+"""
+
+
+@pytest.mark.parametrize('executor_class', [FuzzExecutor, AsyncFuzzExecutor])
+def test_output_tail_is_attached_to_failure(tmpdir, seed_file, executor_class):
+    """Only the tail of the output of a failed run is kept."""
+    app = make_app(tmpdir, CHATTY_APP.format(1), 'output=capture tail=4')
+    executor = executor_class([app], [seed_file])
+    results = []
+    executor.listeners.append(results.append)
+    executor.run_test(1)
+    assert results[0].status is Status.FAILED
+    assert results[0].stdout == b'x' * 4096
+    assert results[0].stderr == b'crashed'
+
+
+@pytest.mark.parametrize('executor_class', [FuzzExecutor, AsyncFuzzExecutor])
+def test_output_of_success_is_dropped(tmpdir, seed_file, executor_class):
+    """Successful runs carry no output."""
+    app = make_app(tmpdir, CHATTY_APP.format(0), 'output=capture')
+    executor = executor_class([app], [seed_file])
+    results = []
+    executor.listeners.append(results.append)
+    executor.run_test(1)
+    assert results[0].status is Status.SUCCESS
+    assert results[0].stdout is None
+
+
+def test_output_of_hanging_app_is_captured(tmpdir, seed_file):
+    """Output written before the timeout is kept."""
+    code = 'print("waiting", flush=True)\ntime.sleep(30)'
+    app = make_app(tmpdir, code, 'output=capture wall_limit=0.3')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.status is Status.HANG
+    assert result.stdout == b'waiting\n'
+
+
+def test_output_can_be_discarded(tmpdir, seed_file, capfd):
+    """Discarded output does not reach the terminal."""
+    app = make_app(tmpdir, 'print("noise")', 'output=discard')
+    executor = FuzzExecutor([app], [seed_file])
+    result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.stdout is None
+    assert 'noise' not in capfd.readouterr().out
+
+
+@pytest.mark.parametrize('options', ['output=all', 'output=capture tail=0',
+                                     'output=capture mode=forkserver'])
+def test_invalid_output_is_rejected(options):
+    """Output options are checked."""
+    with pytest.raises(ValueError):
+        FuzzExecutor(['app & & {}'.format(options)], [])
+
+
+@pytest.mark.parametrize('delivery', sorted(DELIVERIES))
+def test_input_of_failed_run_is_saved(tmpdir, seed_file, delivery):
+    """The crash store gets the input the application failed on."""
+    code = 'sys.stdout.buffer.write(open(sys.argv[-1], "rb").read())\n' \
+           'sys.exit(1)'
+    app = make_app(tmpdir, code, 'output=capture')
+    with FuzzExecutor([app], [seed_file], delivery) as executor:
+        executor.crash_store = CrashStore(str(tmpdir.join('crashes')))
+        result = executor._execute(sys.executable,
+                                   executor._acquire_input(sys.executable,
+                                                           seed_file))
+    assert result.crash is not None
+    assert executor.crash_store.load(result.crash) == result.stdout
+
+
+def test_run_input(tmpdir):
+    """A given input is run without fuzzing it."""
+    app = make_app(tmpdir, 'sys.exit(len(open(sys.argv[-1], "rb").read()))')
+    with FuzzExecutor([app, record_input], []) as executor:
+        result = executor.run_input(sys.executable, b'abc')
+        del RECORDED_INPUTS[:]
+        executor.run_input(record_input, bytearray(b'xyz'))
+    assert result.exit_code == 3
+    assert RECORDED_INPUTS == [b'xyz']
+    assert executor.stats.cumulated_counts() == 2
+
+
+def record_input(data):
+    """Remember the input of a callable."""
+    RECORDED_INPUTS.append(data)
+
+
+RECORDED_INPUTS = []
+
+
+def test_reseed_reproduces_inputs(seed_file):
+    """The inputs only depend on the random stream."""
+    executor = FuzzExecutor([record_input], [seed_file])
+    inputs = []
+    for _ in range(2):
+        del RECORDED_INPUTS[:]
+        executor.reseed(make_rng(4711, 2))
+        executor.run_test(4)
+        inputs.append(list(RECORDED_INPUTS))
+    assert inputs[0] == inputs[1]
+    assert len(inputs[0]) == 4
+
+
+def test_reset_stats(seed_file):
+    """Statistics are handed out and started afresh."""
+    executor = FuzzExecutor([record_input], [seed_file])
+    executor.run_test(3)
+    stats = executor.reset_stats()
+    assert stats.cumulated_counts() == 3
+    assert executor.stats.cumulated_counts() == 0
+    assert executor.stats.keys == stats.keys
+
+
+def test_no_tests_start_after_deadline(seed_file):
+    """Runs stop at the deadline."""
+    executor = FuzzExecutor([record_input], [seed_file])
+    executor.run_test(100, deadline=time.monotonic())
+    assert executor.stats.cumulated_counts() == 0
+
+
+def test_invalid_option_is_rejected():
+    """Options must be key=value pairs."""
+    with pytest.raises(ValueError):
+        FuzzExecutor(['app & & timeout'], [])
+
+
+CHECK_INPUT_APP = """
+data = open(sys.argv[-1], 'rb').read()
+sys.exit(0 if len(data) == 100 else 1)
+"""
+
+
+@pytest.mark.parametrize('delivery', sorted(DELIVERIES))
+def test_delivery(tmpdir, seed_file, delivery):
+    """Applications read their input from each delivery backend."""
+    if delivery == 'memfd' and not MemfdDelivery.available():
+        pytest.skip('memfd not available')
+    app = make_app(tmpdir, CHECK_INPUT_APP)
+    with FuzzExecutor([app], [seed_file], delivery) as executor:
+        executor.run_test(3)
+    assert executor.stats.cumulated_counts_for_status(Status.SUCCESS) == 3
+
+
+CHECK_STDIN_APP = """
+data = sys.stdin.buffer.read()
+sys.exit(0 if len(data) == 100 else 1)
+"""
+
+
+def test_input_from_stdin(tmpdir, seed_file):
+    """The fuzzed data is piped into the application."""
+    app = make_app(tmpdir, CHECK_STDIN_APP, 'input=stdin')
+    for executor_class in (FuzzExecutor, AsyncFuzzExecutor):
+        with executor_class([app], [seed_file]) as executor:
+            executor.run_test(3)
+        stats = executor.stats
+        assert stats.cumulated_counts_for_status(Status.SUCCESS) == 3
+
+
+def test_large_input_for_app_ignoring_stdin(tmpdir):
+    """Not reading the piped data does not block the executor."""
+    seed = tmpdir.join('large')
+    seed.write_binary(b'x' * 10 ** 6)
+    app = make_app(tmpdir, 'time.sleep(30)', 'input=stdin timeout=0.3')
+    with FuzzExecutor([app], [str(seed)]) as executor:
+        start = time.monotonic()
+        executor.run_test(1)
+    assert time.monotonic() - start < 5
+
+
+def test_input_path_replaces_placeholder(tmpdir, seed_file):
+    """With input=argv the path is passed in place of @@."""
+    code = 'sys.exit(0 if sys.argv[2] == "-v" and ' \
+        'len(open(sys.argv[1], "rb").read()) == 100 else 1)'
+    script = make_app(tmpdir, code).split('&')[1].strip()
+    app = '{} & {} @@ -v & input=argv'.format(sys.executable, script)
+    with FuzzExecutor([app], [seed_file]) as executor:
+        executor.run_test(2)
+    assert executor.stats.cumulated_counts_for_status(Status.SUCCESS) == 2
+    with pytest.raises(ValueError):
+        FuzzExecutor([app.replace('@@', '')], [])
+
+
+def test_async_executor_runs_concurrently(tmpdir, seed_file):
+    """Runs waiting for their timeout overlap."""
+    app = make_app(tmpdir, 'time.sleep(30)', 'timeout=0.5')
+    executor = AsyncFuzzExecutor([app], [seed_file], concurrency=8)
+    start = time.monotonic()
+    executor.run_test(8)
+    assert time.monotonic() - start < 4
+    assert executor.stats.cumulated_counts_for_status(Status.SUCCESS) == 8
+
+
+def test_async_executor_records_failures(tmpdir, seed_file):
+    """Failing runs are counted by the async executor."""
+    app = make_app(tmpdir, 'sys.exit(1)')
+    executor = AsyncFuzzExecutor([app], [seed_file], concurrency=2)
+    executor.run_test(5)
+    assert executor.stats.cumulated_counts() == 5
+    assert executor.stats.cumulated_counts_for_status(Status.FAILED) == 5
+
+
+FORK_SERVER_APP = """
+from fuzzing.forkserver import run
+def main(path):
+    data = open(path, 'rb').read()
+    assert 'FUZZING_FORKSERVER' not in os.environ
+    return EXIT_CODE
+sys.exit(run(main))
+"""
+
+
+@pytest.mark.parametrize('exit_code,status', [('0', Status.SUCCESS),
+                                              ('2', Status.FAILED),
+                                              ('1 / 0', Status.FAILED)])
+def test_fork_server(tmpdir, seed_file, exit_code, status):
+    """Runs are forked from a single server process."""
+    code = FORK_SERVER_APP.replace('EXIT_CODE', exit_code)
+    app = make_app(tmpdir, code, 'mode=forkserver')
+    with FuzzExecutor([app], [seed_file]) as executor:
+        executor.run_test(3)
+        fork_server = executor._fork_servers[sys.executable]
+        server_pid = fork_server.process.pid
+        executor.run_test(2)
+        assert fork_server.process.pid == server_pid
+    assert fork_server.process is None
+    assert executor.stats.cumulated_counts_for_status(status) == 5
+
+
+def test_async_executor_with_fork_server(tmpdir, seed_file):
+    """The async executor serializes runs of a fork server."""
+    code = FORK_SERVER_APP.replace('EXIT_CODE', '0')
+    app = make_app(tmpdir, code, 'mode=forkserver')
+    with AsyncFuzzExecutor([app], [seed_file], concurrency=4) as executor:
+        executor.run_test(6)
+    assert executor.stats.cumulated_counts_for_status(Status.SUCCESS) == 6
+
+
+def test_fork_server_limits_cpu_time_of_children(tmpdir, seed_file):
+    """Only the children get the CPU limit, not the fork server."""
+    code = FORK_SERVER_APP.replace(
+        'EXIT_CODE',
+        '0 if resource.getrlimit(resource.RLIMIT_CPU) == (1, 2) else 2')
+    code = 'import resource\n' + code
+    app = make_app(tmpdir, code, 'mode=forkserver cpu_limit=1')
+    with FuzzExecutor([app], [seed_file]) as executor:
+        executor.run_test(3)
+        server_pid = executor._fork_servers[sys.executable].process.pid
+        assert resource.prlimit(server_pid, resource.RLIMIT_CPU) == \
+            resource.getrlimit(resource.RLIMIT_CPU)
+    assert executor.stats.cumulated_counts_for_status(Status.SUCCESS) == 3
+
+
+def test_fork_server_dying_during_run(tmpdir, seed_file):
+    """A fork server dying while its child runs is restarted."""
+    # The child waits until the server reported its pid.
+    code = FORK_SERVER_APP.replace(
+        'EXIT_CODE', 'time.sleep(0.2) or '
+        'os.kill(os.getppid(), signal.SIGKILL) or time.sleep(2)')
+    code = 'import signal\n' + code
+    app = make_app(tmpdir, code, 'mode=forkserver timeout=10')
+    with FuzzExecutor([app], [seed_file]) as executor:
+        start = time.monotonic()
+        result = executor._execute(sys.executable, InputSlot(None, seed_file))
+        assert time.monotonic() - start < 2
+        assert result.status is Status.FAILED
+        assert executor._fork_servers[sys.executable].process is None
+
+
+def test_partial_status_is_not_a_timeout():
+    """Part of an integer read at timeout breaks the protocol."""
+    read_fd, write_fd = os.pipe()
+    try:
+        os.write(write_fd, b'\x00\x00')
+        with pytest.raises(EOFError):
+            forkserver._read_int(read_fd, 0.1)
+        assert forkserver._read_int(read_fd, 0.1) is None
+        os.close(write_fd)
+        write_fd = None
+        with pytest.raises(EOFError):
+            forkserver._read_int(read_fd, 0.1)
+    finally:
+        os.close(read_fd)
+        if write_fd is not None:
+            os.close(write_fd)
+
+
+def test_fork_server_terminates_child_at_timeout(tmpdir, seed_file):
+    """A child still running at timeout is terminated."""
+    code = 'from fuzzing.forkserver import serve\nserve()\ntime.sleep(30)'
+    app = make_app(tmpdir, code, 'mode=forkserver timeout=0.2')
+    with FuzzExecutor([app], [seed_file]) as executor:
+        result = executor._execute(sys.executable, InputSlot(None, seed_file))
+    assert result.status is Status.SUCCESS
+    assert result.returncode is None
+
+
+def test_batches_are_kept_within_budget(tmpdir):
+    """Partly used batches of many seeds do not pile up."""
+    seeds = []
+    for idx in range(20):
+        seed = tmpdir.join('seed{}'.format(idx))
+        seed.write_binary(bytes([idx]) * 1024)
+        seeds.append(str(seed))
+    executor = FuzzExecutor(['app'], seeds)
+    executor.batch_budget = 4 * 16 * 1024
+    for seed in seeds * 2:
+        variant = executor._next_variant(seed)
+        assert len(variant) == 1024
+        assert executor._batch_bytes <= executor.batch_budget
+    assert len(executor._batches) == 4
+    for _ in range(15):
+        executor._next_variant(seeds[-1])
+    assert seeds[-1] not in executor._batches
+    assert executor._batch_bytes == 3 * 16 * 1024
+
+
+def test_async_executor_collects_resource_usage(tmpdir, seed_file):
+    """Async runs are reaped with their resource usage."""
+    app = make_app(tmpdir, 'time.sleep(30)', 'wall_limit=0.3')
+    with AsyncFuzzExecutor([app], [seed_file], concurrency=2) as executor:
+        executor.run_test(2)
+    assert executor.stats.cumulated_counts_for_status(Status.HANG) == 2
+    usage = executor.stats.usage
+    (key,) = usage.keys
+    assert usage.histogram(key, MAXRSS).count == 2
@@ -0,0 +1,140 @@
+# coding=utf-8
+"""Test cases for the mutation engine."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import importlib
+import math
+import types
+
+import pytest
+
+# The package exports the function fuzzer(), which hides the module.
+fuzzer_module = importlib.import_module('fuzzing.fuzzer')
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def engine(request, monkeypatch):
+    """Run a test with and without the vectorized mutation engine."""
+    if request.param == 'python':
+        monkeypatch.setattr(fuzzer_module, 'numpy', None)
+    elif fuzzer_module.numpy is None:
+        pytest.skip('numpy not installed')
+    return request.param
+
+
+def test_fuzzer_keeps_length_and_seed(engine):
+    """Fuzzing returns a modified copy of same length."""
+    buf = bytearray(100000)
+    fuzzed = fuzzer_module.fuzzer(buf, 10)
+    assert len(fuzzed) == len(buf)
+    assert buf == bytearray(100000), 'Seed is not modified.'
+
+
+def test_fuzzer_respects_fuzz_factor(engine):
+    """Never modify more bytes than the fuzz factor allows."""
+    buf = bytearray(50000)
+    fuzz_factor = 7
+    max_modified = math.ceil(len(buf) / fuzz_factor)
+    for _ in range(5):
+        fuzzed = fuzzer_module.fuzzer(buf, fuzz_factor)
+        assert __number_of_modified_bytes(buf, fuzzed) <= max_modified
+
+
+def test_fuzzer_modifies_large_buffer(engine):
+    """A large buffer with a low fuzz factor gets modified."""
+    buf = bytearray(10000)
+    fuzzed = fuzzer_module.fuzzer(buf, 2)
+    assert __number_of_modified_bytes(buf, fuzzed) > 0
+
+
+def test_fuzz_batch_creates_variants(engine):
+    """A batch holds count variants of the seed's length."""
+    buf = bytearray(b'0123456789' * 100)
+    count = 12
+    batch = fuzzer_module.fuzz_batch(buf, count, 10)
+    assert len(batch) == count
+    for variant in batch:
+        assert isinstance(variant, memoryview)
+        assert len(variant) == len(buf)
+        assert 0 < __number_of_modified_bytes(buf, variant) <= 100
+    assert buf == bytearray(b'0123456789' * 100), 'Seed is not modified.'
+
+
+def test_fuzz_batch_shares_arena(engine):
+    """All variants of a batch are views into the same arena."""
+    batch = fuzzer_module.fuzz_batch(bytearray(64), 3, 4)
+    assert batch[0].obj is batch[1].obj is batch[2].obj
+
+
+def test_fuzz_empty_batch(engine):
+    """Asking for no variants returns an empty batch."""
+    assert fuzzer_module.fuzz_batch(bytearray(64), 0, 4) == []
+
+
+def test_fuzz_in_place_and_revert(engine):
+    """Fuzzing in place is undone by reverting the undo log."""
+    seed = bytes(range(256)) * 100
+    buf = bytearray(seed)
+    undo_log = fuzzer_module.fuzz_in_place(buf, 3)
+    assert 0 < len(undo_log) <= math.ceil(len(seed) / 3)
+    assert __number_of_modified_bytes(seed, buf) <= len(undo_log)
+    fuzzer_module.revert_fuzz(buf, undo_log)
+    assert buf == seed
+
+
+def test_iter_fuzz_string_is_lazy():
+    """Variants are generated on demand."""
+    variants = fuzzer_module.iter_fuzz_string('abc', 10 ** 9, 2)
+    assert isinstance(variants, types.GeneratorType)
+    assert len(next(variants)) == 3
+
+
+def test_iter_fuzz_string_decodes_bytes_to_characters():
+    """Each byte of the fuzzed UTF-8 seed becomes one character."""
+    seed = 'Gr\u00fc\u00dfe aus K\u00f6ln'
+    encoded = seed.encode('utf8')
+    variants = list(fuzzer_module.iter_fuzz_string(seed, 130, 5))
+    assert len(variants) == 130
+    for variant in variants:
+        assert len(variant) == len(encoded)
+        assert all(ord(char) < 256 for char in variant)
+
+
+def test_fuzz_string_without_modifications(monkeypatch):
+    """Unmodified variants match the old per byte conversion."""
+    monkeypatch.setattr(fuzzer_module, 'numpy', None)
+    monkeypatch.setattr(fuzzer_module, 'number_of_bytes_to_modify',
+                        lambda buf_len, fuzz_factor, rng=None: 0)
+    seed = 'Gr\u00fc\u00dfe'
+    expected = ''.join([chr(b) for b in bytearray(seed, encoding='utf8')])
+    assert fuzzer_module.fuzz_string(seed, 2) == [expected, expected]
+
+
+def __number_of_modified_bytes(buf, fuzzed_buf):
+    """Determine the number of differing bytes.
+
+    :param buf: original buffer.
+    :param fuzzed_buf: fuzzed buffer.
+    :return: number of different bytes.
+    """
+    return sum(1 for old, new in zip(buf, fuzzed_buf) if old != new)
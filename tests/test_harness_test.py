@@ -0,0 +1,157 @@
+# coding=utf-8
+"""Test cases for running Python callables with FuzzExecutor."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import os
+import sys
+import signal
+
+import pytest
+
+from fuzzing.fuzzer import FuzzExecutor, Status
+from fuzzing.harness import load_callable, IsolatedWorker
+
+
+def accept(data):
+    """Accept any input."""
+    assert isinstance(data, bytes)
+
+
+def reject(data):
+    """Fail on any input."""
+    raise ValueError(len(data))
+
+
+def leave(data):
+    """Exit like a command line parser rejecting its input."""
+    sys.exit(2)
+
+
+def finish(data):
+    """Exit successfully, as a command line tool does."""
+    sys.exit(0 if data[:1] == b'0' else None)
+
+
+def crash(data):
+    """Kill the process running the callable."""
+    os.kill(os.getpid(), signal.SIGSEGV)
+
+
+def report_pid(data):
+    """Fail with the pid of the running process."""
+    raise RuntimeError(os.getpid())
+
+
+def test_load_callable():
+    """Callable specs are resolved by module and name."""
+    assert load_callable('callable:os.path:basename') is os.path.basename
+    assert load_callable(accept) is accept
+    with pytest.raises(ValueError):
+        load_callable('callable:os.path')
+
+
+def test_callables_are_called_in_process(seed_file):
+    """Exceptions are failures, results go into the statistics."""
+    spec = 'callable:{}:reject'.format(__name__)
+    with FuzzExecutor([accept, spec], [seed_file]) as executor:
+        executor.run_test(20)
+        stats = executor.stats
+        assert stats.cumulated_counts() == 20
+        assert stats.retrieve_count(spec, Status.SUCCESS) == 0
+        assert stats.retrieve_count('accept', Status.FAILED) == 0
+        result = executor._execute_callable(spec, seed_file)
+    assert result.status is Status.FAILED
+    assert 'ValueError: 100' in result.error
+
+
+@pytest.mark.parametrize('isolate', ['false', 'true'])
+def test_exit_is_a_failure(seed_file, isolate):
+    """A callable calling sys.exit() fails, the fuzzer carries on."""
+    spec = 'callable:{}:leave & & isolate={}'.format(__name__, isolate)
+    with FuzzExecutor([spec], [seed_file]) as executor:
+        executor.run_test(3)
+        assert executor.stats.cumulated_counts_for_status(Status.FAILED) == 3
+        result = executor._execute_callable(executor.apps[0], seed_file)
+    assert 'SystemExit: 2' in result.error
+
+
+@pytest.mark.parametrize('isolate', ['false', 'true'])
+def test_successful_exit(seed_file, isolate):
+    """sys.exit() with code 0 or None is a success."""
+    spec = 'callable:{}:finish & & isolate={}'.format(__name__, isolate)
+    with FuzzExecutor([spec], [seed_file]) as executor:
+        for data in (b'0', b'1'):
+            result = executor.run_input(executor.apps[0], data)
+            assert result.status is Status.SUCCESS
+
+
+@pytest.mark.parametrize('options', ['isolate=yes', 'mode=forksrv'])
+def test_invalid_isolation_is_rejected(options):
+    """Options isolate and mode are checked."""
+    spec = 'callable:{}:accept & & {}'.format(__name__, options)
+    with pytest.raises(ValueError):
+        FuzzExecutor([spec], [])
+
+
+def test_isolated_callable_crash_is_a_failure(seed_file):
+    """A worker dying by a signal fails the run and is replaced."""
+    spec = 'callable:{}:crash & & isolate=true'.format(__name__)
+    with FuzzExecutor([spec], [seed_file]) as executor:
+        executor.run_test(2)
+        assert executor.stats.cumulated_counts_for_status(Status.SIGNAL) == 2
+        app = executor.apps[0]
+        result = executor._execute_callable(app, seed_file)
+    assert result.signal == signal.SIGSEGV
+
+
+def test_isolated_worker_is_recycled():
+    """The worker process is replaced after recycle runs."""
+    worker = IsolatedWorker(report_pid, recycle=2)
+    pids = []
+    for _ in range(4):
+        returncode, error = worker.run(b'data')
+        assert returncode == 1
+        pids.append(error.strip().rsplit(' ', 1)[-1])
+    worker.stop()
+    assert pids[0] == pids[1] != pids[2] == pids[3]
+    assert str(os.getpid()) not in pids
+
+
+def test_isolated_worker_died_between_runs():
+    """A worker killed while idle is replaced for the next run."""
+    worker = IsolatedWorker(report_pid)
+    pid = worker.run(b'data')[1].strip().rsplit(' ', 1)[-1]
+    worker.process.kill()
+    worker.process.join()
+    returncode, error = worker.run(b'data')
+    worker.stop()
+    assert returncode == 1
+    assert error.strip().rsplit(' ', 1)[-1] != pid
+
+
+def test_isolated_worker_is_killed_at_timeout():
+    """A callable running too long is stopped with its worker."""
+    worker = IsolatedWorker(lambda data: __import__('time').sleep(30))
+    assert worker.run(b'data', timeout=0.2) == (None, None)
+    assert worker.process is None
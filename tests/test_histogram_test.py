@@ -0,0 +1,111 @@
+# coding=utf-8
+"""Test cases for the resource usage histograms."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import sys
+import pickle
+import resource
+
+import pytest
+
+from fuzzing.fuzzer import FuzzExecutor, TestStatCounter, Status
+from fuzzing.histogram import Histogram, UsageStats, WALL, USER, MAXRSS
+
+
+def test_percentiles_are_close():
+    """Percentiles deviate by less than the bucket width."""
+    histogram = Histogram()
+    for value in range(1, 1001):
+        histogram.add(value / 1000.0)
+    assert histogram.percentile(50) == pytest.approx(0.5, rel=0.19)
+    assert histogram.percentile(99) == pytest.approx(0.99, rel=0.19)
+    assert histogram.percentile(100) == 1.0
+    assert histogram.mean() == pytest.approx(0.5005)
+
+
+def test_values_out_of_range():
+    """Tiny and huge values are counted in the outer buckets."""
+    histogram = Histogram(lowest=1.0, octaves=2)
+    histogram.add(0)
+    histogram.add(1e9)
+    assert histogram.counts_[0] == 1
+    assert histogram.counts_[-1] == 1
+    assert histogram.percentile(100) == 1e9
+
+
+def test_size_does_not_grow():
+    """Memory use is fixed."""
+    histogram = Histogram()
+    size = len(pickle.dumps(histogram))
+    for value in range(10000):
+        histogram.add(value * 1e-3)
+    assert len(histogram.counts_) == len(Histogram().counts_)
+    assert len(pickle.dumps(histogram)) <= size + 64
+
+
+def test_merge():
+    """Merged histograms hold the values of both."""
+    first, second = Histogram(), Histogram()
+    first.add(0.001)
+    second.add(2.0)
+    merged = first + second
+    assert (merged.count, merged.maximum) == (2, 2.0)
+    assert first.count == 1
+    first += second
+    assert first.percentile(100) == 2.0
+
+
+def test_usage_stats():
+    """CPU time and memory are recorded if the resource usage is known."""
+    usage = UsageStats()
+    usage.add('app', 0.5, resource.getrusage(resource.RUSAGE_SELF))
+    usage.add('app', 0.25)
+    assert usage.histogram('app', WALL).count == 2
+    assert usage.histogram('app', USER).count == 1
+    assert usage.histogram('app', MAXRSS).maximum > 1024
+    assert usage.histogram('other', WALL).count == 0
+    assert 'wall p50/p99/max' in repr(usage)
+
+
+def test_usage_is_merged_with_stats():
+    """Histograms travel with the statistic counters."""
+    tsc_1, tsc_2 = TestStatCounter(['app']), TestStatCounter(['app'])
+    tsc_1.usage.add('app', 0.5)
+    tsc_2.usage.add('app', 1.5)
+    assert (tsc_1 + tsc_2).usage.histogram('app', WALL).count == 2
+    tsc_1 += tsc_2
+    assert tsc_1.usage.histogram('app', WALL).maximum == 1.5
+
+
+def test_executor_records_rusage(tmpdir):
+    """Runs of processes are reaped with their resource usage."""
+    seed = tmpdir.join('seed')
+    seed.write_binary(b'seed')
+    app = '{} & -c pass'.format(sys.executable)
+    with FuzzExecutor([app], [str(seed)]) as executor:
+        executor.run_test(2)
+    stats = executor.stats
+    assert stats.cumulated_counts_for_status(Status.SUCCESS) == 2
+    name = stats.usage.keys.pop()
+    assert stats.usage.histogram(name, MAXRSS).count == 2
+    assert stats.usage.histogram(name, USER).maximum > 0
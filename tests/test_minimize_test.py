@@ -0,0 +1,141 @@
+# coding=utf-8
+"""Test cases for the minimization of failing inputs."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import tracemalloc
+
+import pytest
+
+from fuzzing.minimize import Minimizer, ddmin
+
+SEED = b'abcdefghij' * 20
+
+
+def fail_on_marker(data):
+    """Fail if the input holds X and two Y."""
+    if b'X' in data and data.count(b'Y') >= 2:
+        raise ValueError('marker')
+
+
+def fail_on_long_marker(data):
+    """Fail if X is at offset 10 of an input of 200 bytes."""
+    if len(data) == 200 and data[10:11] == b'X':
+        raise ValueError('long marker')
+
+
+def mutate(positions):
+    """Create a fuzzed variant of SEED."""
+    data = bytearray(SEED)
+    for pos, value in positions.items():
+        data[pos] = ord(value)
+    return bytes(data)
+
+
+def test_ddmin_finds_minimal_units():
+    """Only the units needed for the failure are left."""
+    def search(candidates):
+        for index, units in enumerate(candidates):
+            if {3, 11} <= set(units):
+                return index
+        return None
+    assert ddmin(range(16), search) == [3, 11]
+
+
+def test_candidates_are_generated_lazily():
+    """Fine granularity on a large input does not hold all complements."""
+    size = 4096
+    half = size // 2
+    steps = []
+
+    def search(candidates):
+        """Keep the first half and the last unit."""
+        steps.append(0)
+        for index, units in enumerate(candidates):
+            steps[-1] = index + 1
+            if len(units) > half and units[half - 1] == half - 1 and \
+                    units[-1] == size - 1:
+                return index
+        return None
+    tracemalloc.start()
+    try:
+        units = ddmin(range(size), search)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert units == list(range(half)) + [size - 1]
+    # The last step tried every unit and its complement.
+    assert max(steps) >= 2 * half
+    # All complements at once would take more than 30 MB.
+    assert peak < 2 * 1024 * 1024
+
+
+def test_chunks_are_removed():
+    """Bytes not needed for the failure are removed."""
+    data = mutate({10: 'X', 50: 'Y', 150: 'Y', 70: 'Z'})
+    with Minimizer(fail_on_marker, SEED) as minimizer:
+        assert minimizer.minimize(data) == b'XYY'
+        assert minimizer.signature.startswith('FAILED exit 1')
+
+
+def test_mutations_are_reverted():
+    """Mutations not needed for the failure are reverted."""
+    data = mutate({10: 'X', 50: 'Y', 150: 'Y', 70: 'Z'})
+    with Minimizer(fail_on_long_marker, SEED) as minimizer:
+        assert minimizer.minimize(data) == mutate({10: 'X'})
+
+
+def test_candidates_run_in_parallel():
+    """Worker processes give the same result."""
+    data = mutate({10: 'X', 50: 'Y', 150: 'Y'})
+    with Minimizer(fail_on_marker, SEED, processes=2) as minimizer:
+        assert minimizer.minimize(data) == b'XYY'
+
+
+def test_results_are_cached():
+    """No input is run twice."""
+    data = mutate({10: 'X', 50: 'Y', 150: 'Y'})
+    with Minimizer(fail_on_marker) as minimizer:
+        minimizer.minimize(data)
+        executions = minimizer.executions
+        minimizer.minimize(data)
+        assert minimizer.executions == executions
+        assert minimizer.cache_hits > 0
+
+
+def test_other_failure_is_not_taken():
+    """Candidates failing differently do not reproduce the failure."""
+    def fail_differently(data):
+        if b'XY' in data:
+            raise ValueError('XY')
+        if b'Y' in data:
+            raise KeyError('Y')
+    with Minimizer(fail_differently) as minimizer:
+        assert minimizer.minimize(b'aaXYaa') == b'XY'
+
+
+def test_input_must_fail():
+    """A passing input can not be minimized."""
+    with Minimizer(fail_on_marker) as minimizer:
+        with pytest.raises(ValueError):
+            minimizer.minimize(SEED)
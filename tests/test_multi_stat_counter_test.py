@@ -0,0 +1,108 @@
+# coding=utf-8
+"""Test cases for the multi-dimensional statistics."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import pickle
+
+import pytest
+
+from fuzzing.fuzzer import FuzzExecutor, TestStatCounter
+from fuzzing.stats import MultiStatCounter
+
+
+def make_counter():
+    """Provide a counter with some runs."""
+    runs = MultiStatCounter()
+    runs.add('/bin/a', 'seed1', 'm', 'FAILED')
+    runs.add('/bin/a', 'seed1', 'm', 'SUCCESS', count=3)
+    runs.add('/opt/a', 'seed2', 'm', 'FAILED', count=2)
+    runs.add('/opt/a', 'seed1', 'm', 'SUCCESS')
+    return runs
+
+
+def test_count():
+    """Runs are counted by any selection of dimensions."""
+    runs = make_counter()
+    assert len(runs) == 4
+    assert runs.count() == 7
+    assert runs.count(status='FAILED') == 3
+    assert runs.count(app='/opt/a', seed='seed1') == 1
+    assert runs.values('app') == {'/bin/a', '/opt/a'}
+
+
+def test_group_by():
+    """Projections sum up the other dimensions."""
+    per_seed = make_counter().group_by('seed', 'status')
+    assert per_seed.dimensions == ('seed', 'status')
+    assert dict(per_seed.items()) == {('seed1', 'FAILED'): 1,
+                                      ('seed1', 'SUCCESS'): 4,
+                                      ('seed2', 'FAILED'): 2}
+    per_app = make_counter().group_by('app')
+    assert dict(per_app.items()) == {('/bin/a',): 4, ('/opt/a',): 3}
+
+
+def test_unknown_dimension():
+    """Selecting an unknown dimension is an error."""
+    with pytest.raises(ValueError):
+        make_counter().group_by('file')
+
+
+def test_merge():
+    """Merging adds the counts of equal combinations."""
+    runs = make_counter()
+    merged = runs + make_counter()
+    assert merged.count() == 14
+    assert len(merged) == 4
+    assert runs.count() == 7
+    runs += MultiStatCounter()
+    assert runs.count() == 7
+    assert pickle.loads(pickle.dumps(runs)).count(seed='seed2') == 2
+
+
+def test_runs_are_merged_with_stats():
+    """The runs travel with the statistic counters."""
+    tsc_1, tsc_2 = TestStatCounter([]), TestStatCounter([])
+    tsc_1.runs.add('app', 'seed', 'm', 'FAILED')
+    tsc_2.runs.add('app', 'seed', 'm', 'FAILED')
+    assert (tsc_1 + tsc_2).runs.count() == 2
+
+
+def accept(data):
+    """Accept any input."""
+
+
+def test_executor_counts_seed_and_mutator(tmpdir):
+    """Runs are counted per seed file and mutator."""
+    seeds = []
+    for name in ('one', 'two'):
+        seed = tmpdir.join(name)
+        seed.write_binary(b'seed data')
+        seeds.append(str(seed))
+    executor = FuzzExecutor([accept], seeds)
+    executor.run_test(20)
+    runs = executor.stats.runs
+    assert runs.count() == 20
+    assert runs.values('seed') == set(seeds)
+    assert runs.values('mutator') == {'replace_bytes/251'}
+    assert runs.values('app') == {__name__ + ':accept'}
+    assert runs.count(status='SUCCESS') == 20
@@ -0,0 +1,202 @@
+# coding=utf-8
+"""Test cases for mutators and havoc scheduling."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import random
+
+import pytest
+
+from fuzzing import mutators
+from fuzzing.mutators import (Havoc, MUTATORS, HAVOC_PREFIX,
+                              MIN_LENGTH_LIMIT, stack_names)
+from fuzzing.fuzzer import FuzzExecutor
+from fuzzing.crashes import CrashStore
+
+SEED = bytes(range(64))
+
+
+def mutate(name, data=SEED, donor=None, seed=0):
+    """Apply a single mutator to a copy of data."""
+    buf = bytearray(data)
+    MUTATORS[name](buf, random.Random(seed), donor)
+    return buf
+
+
+@pytest.mark.parametrize('name', sorted(MUTATORS))
+@pytest.mark.parametrize('data', [b'', b'x', b'xy'])
+def test_mutators_take_short_inputs(name, data):
+    """Inputs too short for a mutation are left alone or mutated."""
+    buf = mutate(name, data, donor=lambda: b'')
+    assert len(buf) <= 2 * len(data)
+
+
+def test_flip_bit():
+    """Exactly one bit differs."""
+    buf = mutate('flip_bit')
+    diff = [a ^ b for a, b in zip(buf, SEED) if a != b]
+    assert len(diff) == 1
+    assert bin(diff[0]).count('1') == 1
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_arithmetic(seed):
+    """At most 4 adjacent bytes change, the length stays."""
+    buf = mutate('arithmetic', seed=seed)
+    changed = [idx for idx in range(len(SEED)) if buf[idx] != SEED[idx]]
+    assert len(buf) == len(SEED)
+    assert changed
+    assert changed[-1] - changed[0] < 4
+
+
+def test_interesting_values_are_written():
+    """Boundary values show up in the input."""
+    values = set()
+    written = set()
+    for seed in range(50):
+        buf = mutate('interesting', b'\x42' * 4, seed=seed)
+        values.add(int.from_bytes(buf, 'little'))
+        written.update(buf)
+    assert 0xFFFFFFFF in values
+    assert {0x00, 0x7F, 0x80, 0xFF} <= written
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_blocks(seed):
+    """Blocks are deleted, duplicated and swapped."""
+    assert 1 <= len(mutate('delete_block', seed=seed)) < len(SEED)
+    duplicated = mutate('duplicate_block', seed=seed)
+    assert len(duplicated) > len(SEED)
+    swapped = mutate('swap_blocks', seed=seed)
+    assert sorted(swapped) == sorted(SEED)
+
+
+def test_splice():
+    """The tail of the input comes from the donor."""
+    buf = mutate('splice', donor=lambda: b'\xff' * 8)
+    assert buf.endswith(b'\xff')
+    assert SEED.startswith(bytes(buf).rstrip(b'\xff'))
+    assert mutate('splice') == bytearray(SEED)
+
+
+def test_mutation_is_in_place():
+    """Havoc modifies the given buffer and names the stack."""
+    buf = bytearray(SEED)
+    name = Havoc().mutate(buf, random.Random(1), lambda: SEED)
+    assert buf != bytearray(SEED)
+    names = stack_names(name)
+    assert name.startswith(HAVOC_PREFIX)
+    assert names and set(names) <= set(MUTATORS)
+
+
+def test_havoc_is_reproducible():
+    """Same random stream, same mutations."""
+    results = []
+    for _ in range(2):
+        havoc, rng = Havoc(), random.Random(7)
+        bufs = [bytearray(SEED) for _ in range(20)]
+        names = [havoc.mutate(buf, rng, lambda: SEED) for buf in bufs]
+        results.append((bufs, names))
+    assert results[0] == results[1]
+
+
+def test_growth_is_limited():
+    """Inputs are cut at their length limit."""
+    havoc = Havoc(['duplicate_block'], max_stack_power=12)
+    rng = random.Random(3)
+    lengths = set()
+    for _ in range(20):
+        buf = bytearray(b'ab')
+        havoc.mutate(buf, rng)
+        lengths.add(len(buf))
+    assert max(lengths) == MIN_LENGTH_LIMIT
+    assert min(lengths) > 2
+
+
+def test_reward_prefers_successful_mutators():
+    """Mutators finding new failures are chosen more often."""
+    havoc = Havoc(['flip_bit', 'splice'])
+    for idx in range(10):
+        havoc.reward(HAVOC_PREFIX + 'splice', 'new {}'.format(idx))
+    havoc.reward(HAVOC_PREFIX + 'splice', 'new 0')
+    havoc.reward('replace_bytes/251', 'other')
+    havoc.reward(HAVOC_PREFIX + 'unknown', 'unknown')
+    assert havoc.finds == [0, 10]
+    assert havoc.weights[1] > havoc.weights[0] == 1.0
+    rng = random.Random(0)
+    for _ in range(100):
+        havoc.mutate(bytearray(SEED), rng, lambda: SEED)
+    assert havoc.uses[1] > havoc.uses[0]
+    for idx in range(1000):
+        havoc.reward(HAVOC_PREFIX + 'splice', 'more {}'.format(idx))
+    assert havoc.weights[1] == mutators.MAX_WEIGHT
+    assert 'splice' in repr(havoc)
+
+
+def test_unknown_mutator():
+    """Only registered mutators are accepted."""
+    with pytest.raises(ValueError):
+        Havoc(['flip_bit', 'unknown'])
+    with pytest.raises(ValueError):
+        Havoc([])
+
+
+def reject_long(data):
+    """Callable under test, failing on inputs longer than the seed."""
+    if len(data) > len(SEED):
+        raise ValueError('too long')
+
+
+def test_executor_with_havoc(tmpdir):
+    """Failing stacks are named in the metadata and rewarded."""
+    seed_file = tmpdir.join('seed')
+    seed_file.write_binary(SEED)
+    app = 'callable:{}:reject_long'.format(__name__)
+    with FuzzExecutor([app], [str(seed_file)]) as executor:
+        executor.havoc = Havoc()
+        executor.crash_store = CrashStore(str(tmpdir.join('crashes')))
+        executor.run_test(50)
+    runs = executor.stats.runs
+    assert all(name.startswith(HAVOC_PREFIX)
+               for name in runs.values('mutator'))
+    assert len(executor.stats.buckets) == 1
+    assert sum(executor.havoc.finds) >= 1
+    assert max(executor.havoc.weights) > 1.0
+    for digest in executor.crash_store:
+        metadata = executor.crash_store.metadata(digest)
+        assert metadata['mutator'].startswith(HAVOC_PREFIX)
+
+
+def test_known_failures_are_not_rewarded_again(tmpdir):
+    """Signatures stay known when the statistics are reset per chunk."""
+    seed_file = tmpdir.join('seed')
+    seed_file.write_binary(SEED)
+    app = 'callable:{}:reject_long'.format(__name__)
+    with FuzzExecutor([app], [str(seed_file)]) as executor:
+        executor.havoc = Havoc()
+        for index in range(20):
+            executor.reseed(random.Random(index))
+            executor.run_test(10)
+            executor.reset_stats()
+    assert max(executor.havoc.finds) == 1
+    assert max(executor.havoc.weights) == 1.0 + mutators.REWARD
@@ -0,0 +1,94 @@
+# coding=utf-8
+"""Test cases for the progress reporting."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import io
+import json
+import queue
+import signal
+
+from fuzzing.fuzzer import FuzzExecutor, RunResult, Status
+from fuzzing.progress import ProgressReporter, ProgressMonitor
+
+
+def test_reporter_publishes_deltas():
+    """Runs are counted per application and published on flush."""
+    deltas = queue.Queue()
+    reporter = ProgressReporter(deltas, interval=3600)
+    reporter(RunResult('/bin/app', Status.SUCCESS, 0))
+    reporter(RunResult('/bin/app', Status.FAILED, -11))
+    reporter(RunResult('/bin/app', Status.SUCCESS, None))
+    assert deltas.empty()
+    reporter.flush()
+    assert deltas.get_nowait() == {'app': [3, 1, 1]}
+    reporter.flush()
+    assert deltas.empty()
+
+
+def test_reporter_counts_hangs_as_timeouts():
+    """Hangs and timeouts are failures and timeouts."""
+    deltas = queue.Queue()
+    reporter = ProgressReporter(deltas, interval=3600)
+    reporter(RunResult('/bin/app', Status.HANG, None))
+    reporter(RunResult('/bin/app', Status.TIMEOUT, -signal.SIGXCPU))
+    reporter(RunResult('/bin/app', Status.OOM, -signal.SIGKILL))
+    reporter.flush()
+    assert deltas.get_nowait() == {'app': [3, 3, 2]}
+
+
+def test_reporter_publishes_after_interval():
+    """Deltas are published once the interval has passed."""
+    deltas = queue.Queue()
+    reporter = ProgressReporter(deltas, interval=0)
+    reporter(RunResult('app', Status.SUCCESS, 0))
+    assert deltas.get_nowait() == {'app': [1, 0, 0]}
+
+
+def test_executor_calls_listeners(tmpdir):
+    """The reporter gets the result of each run."""
+    seed = tmpdir.join('seed')
+    seed.write_binary(b'seed')
+    deltas = queue.Queue()
+    executor = FuzzExecutor([len], [str(seed)])
+    executor.listeners.append(ProgressReporter(deltas))
+    executor.run_test(4)
+    executor.listeners[0].flush()
+    assert deltas.get_nowait() == {'len': [4, 0, 0]}
+
+
+def test_monitor_reports_totals(tmpdir):
+    """Deltas of all workers are merged into status line and metrics."""
+    deltas = queue.Queue()
+    stream = io.StringIO()
+    metrics = tmpdir.join('metrics.jsonl')
+    monitor = ProgressMonitor(deltas, interval=3600,
+                              metrics_path=str(metrics), stream=stream)
+    monitor.start()
+    deltas.put({'app': [3, 1, 0]})
+    deltas.put({'app': [2, 0, 1], 'other': [1, 1, 0]})
+    monitor.stop()
+    assert 'execs: 6' in stream.getvalue()
+    assert 'failed: 2 timeouts: 1' in stream.getvalue()
+    record = json.loads(metrics.readlines()[-1])
+    assert record['apps']['app']['execs'] == 5
+    assert record['apps']['other']['failed'] == 1
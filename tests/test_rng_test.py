@@ -0,0 +1,63 @@
+# coding=utf-8
+"""Test cases for the random number streams."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from fuzzing import fuzz_batch, fuzzer, fuzz_string
+from fuzzing import rng as rng_module
+from fuzzing.rng import make_rng
+
+SEED = bytearray(b'0123456789abcdef' * 256)
+
+
+def variants(rng):
+    """Draw some fuzzed data from rng, covering all code paths."""
+    return ([bytes(fuzzer(SEED, 2, rng)), bytes(fuzzer(SEED, 4096, rng))] +
+            [bytes(view) for view in fuzz_batch(SEED, 4, 101, rng)] +
+            fuzz_string('some string', 3, 5, rng))
+
+
+def test_same_seed_and_stream_reproduce_data():
+    """A stream can be replayed from master seed and stream number."""
+    assert variants(make_rng(4711, 3)) == variants(make_rng(4711, 3))
+
+
+def test_streams_differ():
+    """Different streams or seeds provide different data."""
+    data = variants(make_rng(4711, 0))
+    assert variants(make_rng(4711, 1)) != data
+    assert variants(make_rng(4712, 0)) != data
+
+
+def test_fresh_seed_is_remembered():
+    """A generator without given seed knows its master seed."""
+    rng = make_rng(stream=2)
+    assert (rng.master_seed, rng.stream) == (make_rng(rng.master_seed,
+                                                      2).master_seed, 2)
+    assert rng.random() == make_rng(rng.master_seed, 2).random()
+
+
+def test_streams_without_numpy(monkeypatch):
+    """Streams are reproducible if numpy is not installed."""
+    monkeypatch.setattr(rng_module, 'numpy', None)
+    assert make_rng(7, 1).random() == make_rng(7, 1).random()
+    assert make_rng(7, 1).random() != make_rng(7, 2).random()
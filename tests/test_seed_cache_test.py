@@ -0,0 +1,74 @@
+# coding=utf-8
+"""Test cases for the seed file cache."""
+# Copyright (c) 2015-2018 Stefan Braun
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import mmap
+
+from fuzzing.fuzzer import fuzz_in_place, revert_fuzz
+from fuzzing.seeds import SeedCache
+
+
+def test_seed_is_loaded_once(tmpdir):
+    """Subsequent requests are served from the cache."""
+    seed_file = tmpdir.join('seed')
+    seed_file.write_binary(b'seed data')
+    cache = SeedCache()
+    assert cache.get(str(seed_file)) == b'seed data'
+    assert cache.get(str(seed_file)) == b'seed data'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_seed_is_evicted(tmpdir):
+    """Seeds exceeding the budget are evicted in LRU order."""
+    paths = []
+    for name in 'abc':
+        seed_file = tmpdir.join(name)
+        seed_file.write_binary(name.encode() * 10)
+        paths.append(str(seed_file))
+    cache = SeedCache(budget=20)
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])
+    cache.get(paths[2])
+    assert len(cache) == 2
+    cache.get(paths[0])
+    assert (cache.hits, cache.misses) == (2, 3)
+    cache.get(paths[1])
+    assert cache.misses == 4
+
+
+def test_large_seed_is_mapped(tmpdir):
+    """Large seeds are mapped, modifications do not reach the file."""
+    seed_file = tmpdir.join('large')
+    seed_file.write_binary(b'x' * 4096)
+    cache = SeedCache(mmap_threshold=1024)
+    seed = cache.get(str(seed_file))
+    assert isinstance(seed, mmap.mmap)
+    undo_log = fuzz_in_place(seed, 2)
+    revert_fuzz(seed, undo_log)
+    assert seed[:] == b'x' * 4096
+    seed[0] = ord('y')
+    assert seed_file.read_binary() == b'x' * 4096
+    cache.clear()
+    assert len(cache) == 0
@@ -23,7 +23,9 @@
 # DEALINGS IN THE SOFTWARE.
 
 
-from fuzzing.fuzzer import TestStatCounter, Status
+import pickle
+
+from fuzzing.fuzzer import TestStatCounter, Status, RunResult
 
 
 def test_create_empty_instance():
@@ -121,6 +123,51 @@ def test_retrieve_count():
     assert counts[1] == tsc.retrieve_count(keys[0], Status.SUCCESS)
 
 
+def test_merge_in_place():
+    """Merging in place adds missing keys and keeps totals."""
+    tsc_1 = TestStatCounter(['a', 'b'])
+    __increment_counter(tsc_1, ['a', 'b'], [1, 2, 3, 4])
+    tsc_2 = TestStatCounter(['c', 'a'])
+    __increment_counter(tsc_2, ['c', 'a'], [5, 6, 7, 8])
+    merged = tsc_1
+    merged += tsc_2
+    assert merged is tsc_1
+    assert merged.keys == {'a', 'b', 'c'}
+    assert merged.retrieve_count('a', Status.FAILED) == 8
+    assert merged.retrieve_count('c', Status.SUCCESS) == 6
+    assert merged.cumulated_counts_for_status(Status.SUCCESS) == 20
+    assert merged.cumulated_counts() == 36
+
+
+def test_merge_does_not_modify_operands():
+    """Adding statistics creates a new instance."""
+    tsc_1 = TestStatCounter(['a'])
+    tsc_1.add('a', Status.SUCCESS)
+    tsc_2 = TestStatCounter(['a'])
+    tsc_2.add('a', Status.SUCCESS)
+    tsc = tsc_1 + tsc_2
+    tsc.add('a', Status.FAILED)
+    assert tsc.cumulated_counts() == 3
+    assert tsc_1.cumulated_counts() == 1
+    assert tsc_2.cumulated_counts() == 1
+
+
+def test_keys_are_a_copy():
+    """Modifying the retrieved keys does not change the statistics."""
+    tsc = TestStatCounter(['a'])
+    tsc.keys.add('b')
+    assert tsc.keys == {'a'}
+
+
+def test_pickle():
+    """Statistics are sent between processes."""
+    tsc = TestStatCounter(['a', 'b'])
+    __increment_counter(tsc, ['a', 'b'], [1, 2, 3, 4])
+    copy = pickle.loads(pickle.dumps(tsc))
+    assert copy.retrieve_count('b', Status.SUCCESS) == 4
+    assert copy.cumulated_counts() == 10
+
+
 def __increment_counter(tsc, keys, counts):
     """Increment counters for each key/status pair.
 
@@ -136,3 +183,15 @@ def __increment_counter(tsc, keys, counts):
             tsc.add(key, Status.FAILED)
         for _ in range(counts[2 * i + 1]):
             tsc.add(key, Status.SUCCESS)
+
+
+def test_merge_buckets():
+    """Failure buckets are merged with the counts."""
+    tsc_1 = TestStatCounter(['a'])
+    tsc_1.buckets.add('a', RunResult('a', Status.FAILED, 1))
+    tsc_2 = TestStatCounter(['a'])
+    tsc_2.buckets.add('a', RunResult('a', Status.FAILED, 1))
+    merged = tsc_1 + tsc_2
+    assert merged.buckets['FAILED exit 1 - a'].count == 2
+    tsc_1 += tsc_2
+    assert tsc_1.buckets['FAILED exit 1 - a'].count == 2